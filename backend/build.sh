@@ -6,3 +6,4 @@ pip install -r requirements-production.txt
 
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py createcachetable
@@ -0,0 +1,86 @@
+"""
+Read replica routing.
+
+Replicas come from settings.DATABASE_REPLICAS (aliases in DATABASES). Reads go
+to a replica only while ReplicaRoutingMiddleware has marked the current request
+as eligible: a safe method on a catalog/reporting path from a client that has
+not written recently. Replicas lagging more than REPLICA_MAX_LAG_SECONDS (or
+failing the lag probe, or not streaming WAL) are skipped, falling back to the
+primary.
+"""
+from contextvars import ContextVar
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+use_replica = ContextVar('use_replica', default=False)
+
+# alias -> (checked_at, healthy)
+_health = {}
+
+
+def replica_lag(alias):
+    """
+    Seconds the replica is behind the primary (0 for backends without
+    replication). A replica that has replayed the primary's current WAL
+    position is caught up, however long ago the last transaction was: the
+    replay timestamp only moves when the primary writes, so an idle primary
+    would otherwise read as lag. Comparing with the primary, rather than with
+    what the replica received, keeps a replica whose WAL receiver stalled from
+    reading as caught up; one without a streaming receiver is infinitely behind.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    with connections['default'].cursor() as cursor:
+        cursor.execute('SELECT pg_current_wal_lsn()')
+        primary_lsn = cursor.fetchone()[0]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status IS NULL OR status = 'streaming'), "
+            'pg_last_wal_replay_lsn() >= %s::pg_lsn, '
+            'COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)',
+            [primary_lsn]
+        )
+        streaming, caught_up, lag = cursor.fetchone()
+    if not streaming:
+        return float('inf')
+    return 0 if caught_up else float(lag)
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (0, True))
+    if now - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return healthy
+    
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    except Exception as e:
+        logger.warning(f'Replica {alias} lag check failed: {str(e)}')
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not use_replica.get():
+            return 'default'
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+        return random.choice(replicas) if replicas else 'default'
+    
+    def db_for_write(self, model, **hints):
+        return 'default'
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
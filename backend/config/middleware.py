@@ -0,0 +1,60 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from .db_router import use_replica
+
+STICKY_COOKIE = 'primary_pin'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route safe reads on REPLICA_READ_PATHS to replicas, with read-your-writes
+    stickiness: after a client writes, its reads stay on the primary for
+    REPLICA_STICKY_SECONDS (tracked by cookie and by bearer token)
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            token = use_replica.set(self.can_use_replica(request))
+            try:
+                return self.get_response(request)
+            finally:
+                use_replica.reset(token)
+        
+        response = self.get_response(request)
+        if response.status_code < 400:
+            self.pin_to_primary(request, response)
+        return response
+    
+    def can_use_replica(self, request):
+        if not request.path.startswith(tuple(settings.REPLICA_READ_PATHS)):
+            return False
+        if request.COOKIES.get(STICKY_COOKIE):
+            return False
+        key = self.client_key(request)
+        return not (key and cache.get(key))
+    
+    def pin_to_primary(self, request, response):
+        response.set_cookie(
+            STICKY_COOKIE, '1',
+            max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite='Lax',
+            secure=request.is_secure()
+        )
+        key = self.client_key(request)
+        if key:
+            cache.set(key, True, timeout=settings.REPLICA_STICKY_SECONDS)
+    
+    def client_key(self, request):
+        # API clients authenticate with bearer tokens and may not send cookies
+        authorization = request.headers.get('Authorization')
+        if not authorization:
+            return None
+        return f'primary-pin:{hashlib.sha256(authorization.encode()).hexdigest()}'
@@ -19,20 +19,20 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
-    'cloudinary_storage',
-    'cloudinary',
     'products',
     'orders',
     'users',
     'wishlist',
     'reviews',
     'coupons',
+    'maintenance',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
     'corsheaders.middleware.CorsMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,6 +60,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+# Served by uvicorn workers under gunicorn: gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database configuration
 # Use PostgreSQL in production (when DATABASE_URL is set), SQLite in development
@@ -83,6 +85,50 @@ else:
         }
     }
 
+# Cache: Redis when REDIS_URL is set; otherwise the database cache in production
+# (shared across gunicorn workers, `manage.py createcachetable`) and local memory in development
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL'),
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
+# Read replicas: comma-separated database URLs (postgres://... or sqlite:////path/replica.db)
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(filter(None, config('DATABASE_REPLICA_URLS', default='').split(','))):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = dj_database_url.parse(replica_url.strip(), conn_max_age=600, conn_health_checks=True)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+
+# Safe requests under these prefixes may read from a replica
+REPLICA_READ_PATHS = [
+    '/api/products/',
+    '/api/reviews/',
+    '/api/orders/stats/',
+]
+REPLICA_STICKY_SECONDS = 10
+REPLICA_MAX_LAG_SECONDS = 5
+REPLICA_LAG_CHECK_SECONDS = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -104,13 +150,65 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-# Cloudinary (optional - comment out if not configured)
-# DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
-# CLOUDINARY_STORAGE = {
-#     'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME', default=''),
-#     'API_KEY': config('CLOUDINARY_API_KEY', default=''),
-#     'API_SECRET': config('CLOUDINARY_API_SECRET', default=''),
-# }
+# Threads encoding product image derivatives (products.images) in each process
+IMAGE_DERIVATIVE_WORKERS = config('IMAGE_DERIVATIVE_WORKERS', default=2, cast=int)
+
+# Bulk gallery upload (POST /api/products/<slug>/images/bulk/)
+GALLERY_UPLOAD_WORKERS = 4
+GALLERY_UPLOAD_MAX_FILES = 20
+PRODUCT_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+
+# Async catalog (GET /api/products/async/): products per page, and the most ?page_size= may ask for
+PRODUCT_LIST_PAGE_SIZE = 50
+PRODUCT_LIST_MAX_PAGE_SIZE = 200
+
+# Payment receipts (orders.receipts): larger ones are downscaled to JPEG in the background
+RECEIPT_WORKERS = 2
+RECEIPT_MAX_DIMENSION = 2000
+RECEIPT_MAX_BYTES = 1024 * 1024
+RECEIPT_JPEG_QUALITY = 85
+# Similar receipts (orders.fingerprints). `manage.py match_receipts` looks each new receipt's
+# text-line layout up in the band index over all receipts, leaving out bands more than
+# MAX_POSTINGS receipts share (a template's fixed lines), and compares the CANDIDATES with the
+# closest layout with it pixel by pixel (about 2ms each), matching those with under
+# MAX_DIFFERENCE of their content differing. Two receipts of one wallet template differing
+# only in amount, reference or time differ by 0.0012 or more; a re-encoded, rescaled or
+# slightly cropped copy of one receipt by 0.0007 or less.
+RECEIPT_SIMILARITY_CANDIDATES = 500
+RECEIPT_SIMILARITY_MAX_POSTINGS = 5000
+RECEIPT_SIMILARITY_MAX_DIFFERENCE = 0.00095
+RECEIPT_SIMILAR_ORDERS_LIMIT = 20
+
+# Live admin order feed (orders.events, /api/orders/events/). One watcher per process checks
+# the cached latest event id every POLL seconds for all of its open streams; the cached
+# value is invalidated on each write and otherwise refreshed from the database every CACHE seconds
+ORDER_FEED_POLL_SECONDS = 1
+ORDER_FEED_CACHE_SECONDS = 5
+ORDER_FEED_HEARTBEAT_SECONDS = 15
+# Streams end after this long and the browser reconnects with Last-Event-ID
+ORDER_FEED_MAX_SECONDS = 300
+ORDER_FEED_RETRY_MS = 3000
+# A client further behind than this gets a `reset` event and reloads instead
+ORDER_FEED_BACKLOG = 500
+# How long a stream waits for an event id that was skipped (its transaction not yet
+# committed) before treating it as rolled back
+ORDER_FEED_GAP_SECONDS = 30
+
+# Cloudinary (optional) - the SDK and its apps are only loaded when enabled, so
+# workers and management commands don't import them otherwise
+USE_CLOUDINARY = config('USE_CLOUDINARY', default=False, cast=bool)
+if USE_CLOUDINARY:
+    INSTALLED_APPS += ['cloudinary_storage', 'cloudinary']
+    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+    CLOUDINARY_STORAGE = {
+        'CLOUD_NAME': config('CLOUDINARY_CLOUD_NAME', default=''),
+        'API_KEY': config('CLOUDINARY_API_KEY', default=''),
+        'API_SECRET': config('CLOUDINARY_API_SECRET', default=''),
+    }
+
+# `manage.py importtime --check` fails when django.setup() exceeds this or imports these
+STARTUP_BUDGET_MS = config('STARTUP_BUDGET_MS', default=600, cast=int)
+LAZY_IMPORTS = ['twilio', 'cloudinary', 'cloudinary_storage', 'PIL', 'aiohttp', 'phonenumbers']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -118,24 +216,30 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'config.throttling.AnonSlidingThrottle',
+        'config.throttling.UserSlidingThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        'otp': '5/hour',
+        'otp_phone': '5/hour'
     }
 }
 
+# Cache alias holding throttle counters; must be shared across workers in production
+THROTTLE_CACHE = 'default'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ClaimsTokenObtainPairSerializer',
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -170,6 +274,53 @@ TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='+251929509800')
 # OTP Settings
 OTP_EXPIRY_MINUTES = 5
 OTP_MAX_ATTEMPTS = 3
+# Codes live in the cache; the OTP table only records issued codes (masked) for auditing
+OTP_AUDIT_ENABLED = config('OTP_AUDIT_ENABLED', default=True, cast=bool)
+
+# SMS transport: users.sms.TwilioBackend, ConsoleBackend, or HTTPBackend (with `manage.py fake_sms_server`)
+SMS_BACKEND = config(
+    'SMS_BACKEND',
+    default='users.sms.ConsoleBackend' if DEBUG else 'users.sms.TwilioBackend'
+)
+SMS_HTTP_URL = config('SMS_HTTP_URL', default='http://127.0.0.1:8025/')
+SMS_TIMEOUT_SECONDS = 10
+SMS_CIRCUIT_FAILURE_THRESHOLD = 5
+SMS_CIRCUIT_RESET_SECONDS = 30
+
+# SMS outbox (drained by `manage.py send_sms_outbox`)
+# Inline mode delivers right after commit, so development works without a worker
+SMS_OUTBOX_INLINE = config('SMS_OUTBOX_INLINE', default=DEBUG, cast=bool)
+SMS_OUTBOX_MAX_ATTEMPTS = 5
+SMS_OUTBOX_BACKOFF_SECONDS = 10
+SMS_OUTBOX_LEASE_SECONDS = 120
+
+# Back-in-stock notifications (drained by `manage.py send_restock_notifications`)
+RESTOCK_NOTIFICATION_SENDER = config(
+    'RESTOCK_NOTIFICATION_SENDER',
+    default='wishlist.restock.ConsoleSender' if DEBUG else 'wishlist.restock.SMSSender'
+)
+RESTOCK_NOTIFICATION_FILE = config('RESTOCK_NOTIFICATION_FILE', default=str(BASE_DIR / 'restock_notifications.log'))
+RESTOCK_BATCH_SIZE = 500
+RESTOCK_DEDUP_HOURS = 24
+RESTOCK_USER_DAILY_LIMIT = 3
+# Workers renew their claim on an event after every batch; an event unprocessed and not
+# renewed for this long (its worker died, or its fanout failed) is claimed again
+RESTOCK_CLAIM_LEASE_SECONDS = 600
+
+# Data janitor (`manage.py janitor`): days to keep rows past each policy's cutoff
+JANITOR_BATCH_SIZE = 1000
+JANITOR_RETENTION_DAYS = {
+    'expired_otps': 1,
+    'used_otps': 1,
+    'delivered_sms': 7,
+    'dead_sms': 30,
+    'stale_coupons': 180,
+    'order_audit_logs': 730,
+    'restock_events': 30,
+    'order_events': 2,
+    # Only has to outlast a checkout that picked up the original before it was recompressed
+    'replaced_receipts': 1,
+}
 
 # Security settings for production
 if not DEBUG:
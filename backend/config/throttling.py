@@ -0,0 +1,161 @@
+"""
+Sliding-window-counter throttles over a shared cache.
+
+DRF's SimpleRateThrottle keeps a full timestamp list per client in the
+per-process default cache. These throttles keep two integer counters per
+client (current and previous window) in settings.THROTTLE_CACHE, so limits
+hold across gunicorn workers and each request costs one get_many and one incr.
+The OTP scopes count with one cache.add slot per request instead
+(SlottedWindowThrottle), which stays exact under concurrency on every backend.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+from users.utils import normalize_phone
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    
+    def __init__(self):
+        super().__init__()
+        self.cache = caches[settings.THROTTLE_CACHE]
+        self._wait = None
+    
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        
+        now = self.timer()
+        window = int(now // self.duration)
+        elapsed = now - window * self.duration
+        current, previous = self.get_counts(window)
+        
+        # Weight the previous window by how much of it still overlaps the sliding window
+        weighted = previous * (1 - elapsed / self.duration) + current
+        if weighted >= self.num_requests:
+            self._wait = self._wait_time(current, previous, elapsed)
+            return False
+        
+        # Requests the current window may still take alongside the overlapping part of the previous one
+        counted = self.count_request(window, self.num_requests - previous * (1 - elapsed / self.duration))
+        if counted is not True:
+            self._wait = self._wait_time(counted, previous, elapsed)
+            return False
+        return True
+    
+    def get_counts(self, window):
+        """(current, previous) window counts"""
+        current_key, previous_key = f'{self.key}:{window}', f'{self.key}:{window - 1}'
+        counts = self.cache.get_many([current_key, previous_key])
+        return counts.get(current_key, 0), counts.get(previous_key, 0)
+    
+    def count_request(self, window, allowed):
+        """
+        Count this request in the current window; True, or the window's count
+        if `allowed` requests are already counted there
+        """
+        current_key = f'{self.key}:{window}'
+        # Counters outlive their window by one period so the next window can read them
+        if not self.cache.add(current_key, 1, timeout=self.duration * 2):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                self.cache.set(current_key, 1, timeout=self.duration * 2)
+        return True
+    
+    def _wait_time(self, current, previous, elapsed):
+        if current >= self.num_requests or not previous:
+            return self.duration - elapsed
+        # Solve previous * (1 - (elapsed + t) / duration) + current < num_requests for t
+        wait = self.duration * (1 - (self.num_requests - current) / previous) - elapsed
+        return max(wait, 0)
+    
+    def wait(self):
+        return self._wait
+
+
+class SlottedWindowThrottle(SlidingWindowThrottle):
+    """
+    A sliding window counted exactly under concurrency, for limits that guard
+    security (OTP sends). SlidingWindowThrottle's incr is a non-atomic
+    get-then-set on DatabaseCache, so parallel requests can lose counts. Here
+    each request claims the next numbered slot of its window with cache.add,
+    atomic on every backend (as in users.otp_store), and no more slots are
+    claimed than the limit allows. One key per request: for small limits only.
+    """
+    
+    def _slots(self, window):
+        return [f'{self.key}:{window}:{slot}' for slot in range(1, self.num_requests + 1)]
+    
+    def get_counts(self, window):
+        current_slots, previous_slots = self._slots(window), self._slots(window - 1)
+        taken = self.cache.get_many(current_slots + previous_slots)
+        self._free = [key for key in current_slots if key not in taken]
+        return self.num_requests - len(self._free), sum(1 for key in previous_slots if key in taken)
+    
+    def count_request(self, window, allowed):
+        for key in self._free:
+            slot = int(key.rsplit(':', 1)[1])
+            if slot - 1 >= allowed:
+                return slot - 1
+            # Taken by a concurrent request since get_counts: try the next one
+            if self.cache.add(key, True, timeout=self.duration * 2):
+                return True
+        return self.num_requests
+
+
+class AnonSlidingThrottle(SlidingWindowThrottle):
+    """Per-IP limit for anonymous requests"""
+    scope = 'anon'
+    
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserSlidingThrottle(SlidingWindowThrottle):
+    """Per-user limit for authenticated requests, per-IP otherwise"""
+    scope = 'user'
+    
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class OTPRateThrottle(SlottedWindowThrottle):
+    """Per-IP limit on endpoints that send an OTP"""
+    scope = 'otp'
+    
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class OTPPhoneThrottle(SlottedWindowThrottle):
+    """Per-phone limit on endpoints that send an OTP, whatever IP the requests come from"""
+    scope = 'otp_phone'
+    
+    def get_cache_key(self, request, view):
+        phone = request.data.get('phone') if hasattr(request.data, 'get') else None
+        if not phone:
+            return None
+        ident = normalize_phone(phone) or re.sub(r'\D', '', str(phone))
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class AnonymousIPThrottle(SlidingWindowThrottle):
+    """The anon limit by IP alone, for async views that don't authenticate the request"""
+    scope = 'anon'
+    
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
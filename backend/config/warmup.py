@@ -0,0 +1,90 @@
+"""
+Process warmup for gunicorn (see gunicorn.conf.py).
+
+Builds the lazily-populated structures the first request in a worker would
+otherwise pay for: URL resolver tables, DRF's lazily imported settings classes
+and every project serializer's field tree (which also fills the model _meta
+caches). Run in the master after preload these pages are shared copy-on-write
+with every worker; running it again after fork is then cheap.
+"""
+from importlib import import_module
+import inspect
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DRF_LAZY_SETTINGS = [
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_THROTTLE_CLASSES',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    'DEFAULT_PAGINATION_CLASS',
+    'DEFAULT_FILTER_BACKENDS',
+]
+
+
+def warm_urls():
+    from django.urls import get_resolver
+    resolver = get_resolver()
+    # Touching reverse_dict populates the whole resolver tree, including included URLconfs
+    resolver.reverse_dict
+    for url_pattern in resolver.url_patterns:
+        if hasattr(url_pattern, 'reverse_dict'):
+            url_pattern.reverse_dict
+
+
+def warm_drf():
+    from rest_framework.settings import api_settings
+    for name in DRF_LAZY_SETTINGS:
+        getattr(api_settings, name)
+
+
+def project_serializers():
+    from rest_framework import serializers
+    base_dir = str(settings.BASE_DIR)
+    for app_config in apps.get_app_configs():
+        if not app_config.path.startswith(base_dir):
+            continue
+        try:
+            module = import_module(f'{app_config.name}.serializers')
+        except ImportError:
+            continue
+        for obj in vars(module).values():
+            if (inspect.isclass(obj) and issubclass(obj, serializers.BaseSerializer)
+                    and obj.__module__ == module.__name__):
+                yield obj
+
+
+def _walk_fields(serializer):
+    for field in serializer.fields.values():
+        child = getattr(field, 'child', field)
+        if hasattr(child, 'fields'):
+            _walk_fields(child)
+
+
+def warm_serializers():
+    count = 0
+    for serializer_class in project_serializers():
+        try:
+            _walk_fields(serializer_class())
+            count += 1
+        except Exception as e:
+            logger.debug(f'Skipped warming {serializer_class.__name__}: {str(e)}')
+    return count
+
+
+def warm_up():
+    """Returns the seconds spent, for the gunicorn log"""
+    started = time.monotonic()
+    warm_urls()
+    warm_drf()
+    count = warm_serializers()
+    elapsed = time.monotonic() - started
+    logger.info(f'Warmed URL resolvers and {count} serializers in {elapsed * 1000:.0f}ms')
+    return elapsed
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("coupons", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="coupon",
+            index=models.Index(
+                fields=["active", "expiry_date"], name="coupon_active_expiry_idx"
+            ),
+        ),
+    ]
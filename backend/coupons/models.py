@@ -3,6 +3,42 @@ from django.core.validators import MinValueValidator
 from django.utils import timezone
 
 
+class CouponQuerySet(models.QuerySet):
+    VALIDITY_MESSAGES = {
+        'inactive': 'Coupon is inactive',
+        'expired': 'Coupon has expired',
+        'exhausted': 'Coupon usage limit reached',
+        'valid': 'Valid',
+    }
+    
+    def with_validity(self):
+        """Annotate each coupon with its validity state, mirroring Coupon.is_valid"""
+        now = timezone.now()
+        return self.annotate(
+            validity=models.Case(
+                models.When(active=False, then=models.Value('inactive')),
+                models.When(expiry_date__lt=now, then=models.Value('expired')),
+                models.When(used_count__gte=models.F('usage_limit'), then=models.Value('exhausted')),
+                default=models.Value('valid'),
+                output_field=models.CharField(max_length=10),
+            )
+        )
+    
+    def filter_validity(self, state):
+        """Filter by validity state using plain column predicates so indexes apply"""
+        now = timezone.now()
+        exhausted = models.Q(used_count__gte=models.F('usage_limit'))
+        if state == 'inactive':
+            return self.filter(active=False)
+        if state == 'expired':
+            return self.filter(active=True, expiry_date__lt=now)
+        if state == 'exhausted':
+            return self.filter(exhausted, active=True, expiry_date__gte=now)
+        if state == 'valid':
+            return self.filter(~exhausted, active=True, expiry_date__gte=now)
+        return self.none()
+
+
 class Coupon(models.Model):
     TYPE_CHOICES = [
         ('percentage', 'Percentage'),
@@ -20,8 +56,13 @@ class Coupon(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CouponQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['active', 'expiry_date'], name='coupon_active_expiry_idx'),
+        ]
     
     def __str__(self):
         return f'{self.code} ({self.get_type_display()})'
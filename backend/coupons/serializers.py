@@ -1,18 +1,31 @@
 from rest_framework import serializers
-from .models import Coupon
+from .models import Coupon, CouponQuerySet
 from django.utils import timezone
 
 
 class CouponSerializer(serializers.ModelSerializer):
+    validity = serializers.SerializerMethodField()
     is_valid_status = serializers.SerializerMethodField()
     
     class Meta:
         model = Coupon
         fields = ['id', 'code', 'type', 'value', 'expiry_date', 'usage_limit', 
-                  'used_count', 'active', 'min_purchase_amount', 'is_valid_status', 'created_at']
+                  'used_count', 'active', 'min_purchase_amount', 'validity', 'is_valid_status', 'created_at']
         read_only_fields = ['id', 'used_count', 'created_at']
     
+    def get_validity(self, obj):
+        validity = getattr(obj, 'validity', None)
+        if validity is None:
+            # Freshly created/updated instances are not annotated
+            _, message = obj.is_valid()
+            validity = next(k for k, v in CouponQuerySet.VALIDITY_MESSAGES.items() if v == message)
+        return validity
+    
     def get_is_valid_status(self, obj):
+        # Use the SQL annotation when the queryset provides it
+        validity = getattr(obj, 'validity', None)
+        if validity is not None:
+            return {'valid': validity == 'valid', 'message': CouponQuerySet.VALIDITY_MESSAGES[validity]}
         is_valid, message = obj.is_valid()
         return {'valid': is_valid, 'message': message}
 
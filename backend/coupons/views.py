@@ -1,19 +1,44 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from .models import Coupon
+from .models import Coupon, CouponQuerySet
 from .serializers import CouponSerializer, CouponValidationSerializer
 
 
+class CouponPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
 class CouponViewSet(viewsets.ModelViewSet):
-    queryset = Coupon.objects.all()
     serializer_class = CouponSerializer
+    pagination_class = CouponPagination
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['code']
+    ordering_fields = ['created_at', 'expiry_date', 'used_count', 'value', 'validity']
+    ordering = ['-created_at']
     
     def get_permissions(self):
         if self.action in ['validate']:
             return [permissions.IsAuthenticated()]
         return [permissions.IsAdminUser()]
     
+    def get_queryset(self):
+        queryset = Coupon.objects.with_validity()
+        
+        # Filter by validity state (inactive / expired / exhausted / valid)
+        validity = self.request.query_params.get('validity', None)
+        if validity in CouponQuerySet.VALIDITY_MESSAGES:
+            queryset = queryset.filter_validity(validity)
+        
+        coupon_type = self.request.query_params.get('type', None)
+        if coupon_type:
+            queryset = queryset.filter(type=coupon_type)
+        
+        return queryset
+    
     @action(detail=False, methods=['post'])
     def validate(self, request):
         """Validate a coupon code and calculate discount"""
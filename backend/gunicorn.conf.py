@@ -0,0 +1,49 @@
+"""
+Production gunicorn profile; picked up automatically when gunicorn starts in
+backend/ (start command: gunicorn config.asgi:application).
+
+The app is preloaded in the master so Django, DRF and the SDKs are imported
+once and shared copy-on-write, then warmed before the first worker forks.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# WEB_CONCURRENCY is set by Render from the instance size; otherwise 2 x cores + 1, capped
+# because each worker holds its own DB connections
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Requests are short API calls; anything past 30s is stuck on an upstream and better recycled
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 20
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    if preload_app:
+        from config.warmup import warm_up
+        server.log.info(f'Warmed master in {warm_up() * 1000:.0f}ms')
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from django.db import connections
+        # Connections opened in the master must not be shared across processes
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    # Runs after the worker has the app loaded, with or without preload
+    from config.warmup import warm_up
+    worker.log.info(f'Worker {worker.pid} warmed in {warm_up() * 1000:.0f}ms')
@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _children(pid):
+    try:
+        return [int(child) for child in Path(f'/proc/{pid}/task/{pid}/children').read_text().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid):
+    """(rss, pss) from smaps_rollup; pss splits shared pages between the processes mapping them"""
+    values = {}
+    try:
+        for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+class Command(BaseCommand):
+    help = 'Start gunicorn with gunicorn.conf.py and report time-to-first-response and memory per worker'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8097)
+        parser.add_argument('--path', default='/api/products/', help='Endpoint polled for the first response')
+        parser.add_argument('--compare', action='store_true', help='Also run without preload_app')
+        parser.add_argument('--boot-timeout', type=float, default=60)
+    
+    def handle(self, *args, **options):
+        if not Path('/proc/self/smaps_rollup').exists():
+            raise CommandError('Memory figures need Linux /proc')
+        modes = [True, False] if options['compare'] else [True]
+        for preload in modes:
+            self.run(preload, options)
+    
+    def run(self, preload, options):
+        env = dict(
+            os.environ,
+            PORT=str(options['port']),
+            WEB_CONCURRENCY=str(options['workers']),
+            GUNICORN_PRELOAD='true' if preload else 'false',
+            GUNICORN_LOG_LEVEL='warning',
+        )
+        url = f"http://127.0.0.1:{options['port']}{options['path']}"
+        started = time.monotonic()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'config.asgi:application'],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            first_response = self.wait_for_response(url, process, started, options['boot_timeout'])
+            workers = self.wait_for_workers(process.pid, options['workers'], options['boot_timeout'])
+            # Give booted workers a moment to finish warmup before sampling memory
+            time.sleep(1)
+            master_rss, master_pss = _memory_kb(process.pid)
+            memory = [_memory_kb(pid) for pid in workers]
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+        
+        label = 'preload' if preload else 'no-preload'
+        self.stdout.write(f'{label}: first response after {first_response * 1000:.0f}ms')
+        self.stdout.write(f'  master   rss={master_rss / 1024:.1f}MB pss={master_pss / 1024:.1f}MB')
+        for pid, (rss, pss) in zip(workers, memory):
+            self.stdout.write(f'  worker {pid} rss={rss / 1024:.1f}MB pss={pss / 1024:.1f}MB')
+        if memory:
+            total_pss = master_pss + sum(pss for _, pss in memory)
+            self.stdout.write(f'  total pss={total_pss / 1024:.1f}MB')
+    
+    def wait_for_response(self, url, process, started, boot_timeout):
+        while time.monotonic() - started < boot_timeout:
+            if process.poll() is not None:
+                raise CommandError(f'gunicorn exited with status {process.returncode}')
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    response.read()
+                return time.monotonic() - started
+            except urllib.error.HTTPError:
+                # Any status means a worker answered
+                return time.monotonic() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        raise CommandError(f'No response from {url} within {boot_timeout}s')
+    
+    def wait_for_workers(self, pid, count, boot_timeout):
+        deadline = time.monotonic() + boot_timeout
+        while time.monotonic() < deadline:
+            workers = _children(pid)
+            if len(workers) >= count:
+                return workers
+            time.sleep(0.05)
+        return _children(pid)
@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter so nothing is imported already
+SETUP_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+{extra}
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+'''
+
+URLCONF_IMPORT = '''
+from django.urls import get_resolver
+get_resolver().url_patterns
+'''
+
+
+class Command(BaseCommand):
+    help = 'Profile imports during django.setup() with -X importtime and report the slowest modules'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Number of modules to list')
+        parser.add_argument('--urls', action='store_true', help='Also import the URLconf (views, serializers)')
+        parser.add_argument('--self', dest='sort_self', action='store_true',
+                            help='Sort by self time instead of cumulative time')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if setup exceeds STARTUP_BUDGET_MS or loads a LAZY_IMPORTS module')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs for the budget (best is used)')
+    
+    def handle(self, *args, **options):
+        script = SETUP_SCRIPT.format(
+            extra=URLCONF_IMPORT if options['urls'] else '',
+            lazy=list(settings.LAZY_IMPORTS)
+        )
+        self.report_profile(script, options)
+        
+        # Timed without -X importtime, which adds its own overhead
+        runs = [self.run(script) for _ in range(max(options['repeat'], 1))]
+        best = min(run['ms'] for run in runs)
+        loaded = runs[0]['loaded']
+        self.stdout.write(f'django.setup(){" + URLconf" if options["urls"] else ""}: {best:.0f}ms '
+                          f'(budget {settings.STARTUP_BUDGET_MS}ms)')
+        if loaded:
+            self.stdout.write(f'Eagerly imported: {", ".join(loaded)}')
+        
+        if options['check']:
+            problems = []
+            if best > settings.STARTUP_BUDGET_MS:
+                problems.append(f'startup took {best:.0f}ms, budget is {settings.STARTUP_BUDGET_MS}ms')
+            if loaded:
+                problems.append(f'{", ".join(loaded)} should be imported lazily')
+            if problems:
+                raise CommandError('; '.join(problems))
+            self.stdout.write(self.style.SUCCESS('Startup within budget'))
+    
+    def run(self, script, *flags):
+        result = subprocess.run(
+            [sys.executable, *flags, '-c', script],
+            cwd=settings.BASE_DIR, env=dict(os.environ), capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else 'setup failed')
+        return {**json.loads(result.stdout.strip().splitlines()[-1]), 'stderr': result.stderr}
+    
+    def report_profile(self, script, options):
+        rows = []
+        for line in self.run(script, '-X', 'importtime')['stderr'].splitlines():
+            # "import time:  self [us] | cumulative | imported package"
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|')
+            rows.append((int(self_us), int(cumulative_us), module.strip()))
+        
+        key = 0 if options['sort_self'] else 1
+        rows.sort(key=lambda row: row[key], reverse=True)
+        self.stdout.write(f'{"self ms":>8} {"cumul ms":>9}  module')
+        for self_us, cumulative_us, module in rows[:options['limit']]:
+            self.stdout.write(f'{self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}  {module}')
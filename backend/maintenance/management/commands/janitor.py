@@ -0,0 +1,51 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from maintenance.retention import REGISTRY
+
+
+class Command(BaseCommand):
+    help = 'Delete rows past their retention period in small primary-key batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('policies', nargs='*', help=f'Policies to run (default: all of {", ".join(REGISTRY)})')
+        parser.add_argument('--batch-size', type=int, default=settings.JANITOR_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count rows that would be deleted')
+        parser.add_argument('--loop', action='store_true', help='Keep running every --interval seconds')
+        parser.add_argument('--interval', type=float, default=3600)
+    
+    def handle(self, *args, **options):
+        unknown = set(options['policies']) - set(REGISTRY)
+        if unknown:
+            raise CommandError(f'Unknown policies: {", ".join(sorted(unknown))}')
+        policies = [REGISTRY[name] for name in options['policies'] or REGISTRY]
+        
+        while True:
+            self.run_once(policies, options)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+    
+    def run_once(self, policies, options):
+        # Only one janitor at a time across hosts sharing the cache
+        lock_timeout = int(options['interval']) if options['loop'] else 3600
+        if not cache.add('janitor:lock', True, timeout=lock_timeout):
+            self.stdout.write(self.style.WARNING('Another janitor is running; skipping'))
+            return
+        
+        try:
+            for policy in policies:
+                deleted, seconds = policy.purge(
+                    options['batch_size'],
+                    pause=options['pause'],
+                    dry_run=options['dry_run']
+                )
+                rate = deleted / seconds if seconds else 0
+                verb = 'would delete' if options['dry_run'] else 'deleted'
+                self.stdout.write(
+                    f'{policy.name}: {verb} {deleted} rows in {seconds:.2f}s ({rate:.0f} rows/s)'
+                )
+        finally:
+            cache.delete('janitor:lock')
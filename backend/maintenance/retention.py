@@ -0,0 +1,109 @@
+"""
+Retention policies for tables that otherwise only grow.
+
+Each policy names a model and a filter for rows past retention. The janitor
+deletes matching rows in bounded primary-key windows, one short transaction
+per window, so it never holds long locks on SQLite or Postgres.
+"""
+from datetime import timedelta
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+from django.utils import timezone
+
+REGISTRY = {}
+
+
+class RetentionPolicy:
+    def __init__(self, name, model, condition, description=''):
+        self.name = name
+        self.model_label = model
+        self.condition = condition
+        self.description = description
+    
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+    
+    def days(self):
+        return settings.JANITOR_RETENTION_DAYS[self.name]
+    
+    def queryset(self, now):
+        cutoff = now - timedelta(days=self.days())
+        return self.model._default_manager.filter(self.condition(cutoff, now))
+    
+    def purge(self, batch_size, now=None, pause=0, dry_run=False):
+        """Delete expired rows window by window; returns (rows_deleted, seconds)"""
+        now = now or timezone.now()
+        started = time.monotonic()
+        expired = self.queryset(now)
+        bounds = expired.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return 0, 0.0
+        if dry_run:
+            return expired.count(), time.monotonic() - started
+        
+        deleted = 0
+        low = bounds['low']
+        while low <= bounds['high']:
+            with transaction.atomic():
+                count, _ = expired.filter(pk__gte=low, pk__lt=low + batch_size).delete()
+            deleted += count
+            low += batch_size
+            if pause:
+                time.sleep(pause)
+        return deleted, time.monotonic() - started
+
+
+def register(name, model, condition, description=''):
+    REGISTRY[name] = RetentionPolicy(name, model, condition, description)
+
+
+register(
+    'expired_otps', 'users.OTP',
+    lambda cutoff, now: Q(expires_at__lt=cutoff),
+    'OTP audit rows past their expiry'
+)
+register(
+    'used_otps', 'users.OTP',
+    lambda cutoff, now: Q(is_used=True, created_at__lt=cutoff),
+    'Consumed OTP rows'
+)
+register(
+    'delivered_sms', 'users.SMSOutbox',
+    lambda cutoff, now: Q(status='sent', sent_at__lt=cutoff),
+    'Delivered outbox messages'
+)
+register(
+    'dead_sms', 'users.SMSOutbox',
+    lambda cutoff, now: Q(status='dead', created_at__lt=cutoff),
+    'Dead-lettered outbox messages'
+)
+register(
+    'stale_coupons', 'coupons.Coupon',
+    lambda cutoff, now: Q(expiry_date__lt=cutoff) | Q(used_count__gte=F('usage_limit'), updated_at__lt=cutoff),
+    'Coupons expired or exhausted long ago (orders keep their amounts; coupon link is nulled)'
+)
+register(
+    'order_audit_logs', 'orders.AuditLog',
+    lambda cutoff, now: Q(timestamp__lt=cutoff),
+    'Order audit history'
+)
+register(
+    'restock_events', 'wishlist.RestockEvent',
+    lambda cutoff, now: Q(processed_at__lt=cutoff),
+    'Processed restock events and their notification records'
+)
+register(
+    'replaced_receipts', 'orders.ReplacedReceipt',
+    lambda cutoff, now: Q(created_at__lt=cutoff),
+    'Receipt files superseded by a recompressed copy (orders still pointing at one are moved to the copy first)'
+)
+register(
+    'order_events', 'orders.OrderEvent',
+    lambda cutoff, now: Q(created_at__lt=cutoff),
+    'Live admin feed change log (clients further behind reload instead of resuming)'
+)
@@ -1,18 +1,61 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html_join
+from .fingerprints import similar_orders
 from .models import Order, OrderItem, AuditLog
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
 
+class SharedReceiptFilter(admin.SimpleListFilter):
+    title = 'receipt'
+    parameter_name = 'shared_receipt'
+    
+    def lookups(self, request, model_admin):
+        return [('yes', 'Used by other orders')]
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(receipt_duplicate_count__gt=0)
+        return queryset
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['order_id', 'full_name', 'phone', 'delivery_method', 
-                    'payment_method', 'status', 'total_amount', 'created_at']
-    list_filter = ['status', 'payment_method', 'delivery_method']
-    search_fields = ['order_id', 'full_name', 'phone']
+                    'payment_method', 'status', 'total_amount', 'receipt_duplicates', 'created_at']
+    list_filter = ['status', 'payment_method', 'delivery_method', SharedReceiptFilter]
+    search_fields = ['order_id', 'full_name', 'phone', 'receipt_sha256']
     inlines = [OrderItemInline]
-    readonly_fields = ['order_id', 'created_at', 'updated_at']
+    readonly_fields = ['order_id', 'transaction_reference_normalized', 'receipt_sha256', 'similar_receipts',
+                       'created_at', 'updated_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_receipt_duplicates()
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Order ID, phone, name, receipt hash or transaction reference, each via its index.
+        # Imported here: orders.search pulls in DRF's filters, too heavy for every django.setup()
+        from .search import search_orders
+        return search_orders(queryset, search_term), False
+    
+    @admin.display(description='Shared receipt', ordering='receipt_duplicate_count')
+    def receipt_duplicates(self, obj):
+        return obj.receipt_duplicate_count or ''
+    
+    @admin.display(description='Similar receipts')
+    def similar_receipts(self, obj):
+        matches = similar_orders(obj) if obj.pk else []
+        if not matches:
+            return '-'
+        return format_html_join(', ', '<a href="{}">{}</a> ({})', (
+            (
+                reverse('admin:orders_order_change', args=[match['id']]),
+                match['order_id'],
+                'same file' if match['same_file'] else f"{match['difference']:.2%} differs",
+            )
+            for match in matches
+        ))
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
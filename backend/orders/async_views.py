@@ -0,0 +1,40 @@
+"""
+Live admin order feed (server-sent events) for the ASGI deployment.
+Under WSGI the stream would hold a worker thread, so serve it from the
+gunicorn/uvicorn setup in gunicorn.conf.py.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from users.authentication import StatelessJWTAuthentication
+from .events import alatest_event_id, stream
+
+
+@require_GET
+async def order_feed(request):
+    """
+    Stream order created / status_changed / deleted events to admins
+    Resumes after the Last-Event-ID header (or ?last_event_id=) when given
+    """
+    try:
+        # Claims-based: no user query, only the cached token version
+        result = await sync_to_async(StatelessJWTAuthentication().authenticate)(request)
+    except APIException:
+        return JsonResponse({'error': 'Invalid or expired token'}, status=401)
+    if result is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+    if not result[0].is_staff:
+        return JsonResponse({'error': 'Admin access required'}, status=403)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else await alatest_event_id()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid Last-Event-ID'}, status=400)
+    
+    response = StreamingHttpResponse(stream(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx-style proxies not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,200 @@
+"""
+Live admin order feed.
+
+Write paths call record() / record_status_changes() inside their transaction;
+each change becomes an OrderEvent row whose id is the server-sent event id.
+Open feeds don't poll the order tables: one watcher per process (event loop)
+polls a cached high-water mark (the latest event id), which writers invalidate
+on commit, and wakes the streams to read OrderEvent rows past their last id
+when it moves. However many tabs are open, a process reads the cache once per
+ORDER_FEED_POLL_SECONDS; with a shared cache (Redis) an idle admin dashboard
+costs no database queries at all. A reconnecting client sends Last-Event-ID
+and is replayed what it missed.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Order, OrderEvent
+
+logger = logging.getLogger(__name__)
+
+LATEST_EVENT_KEY = 'order-events:latest'
+ROW_FIELDS = ['id', 'order_id', 'full_name', 'phone', 'delivery_method', 'selected_date',
+              'payment_method', 'total_amount', 'status', 'created_at']
+
+
+def _row(values):
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def _invalidate():
+    transaction.on_commit(lambda: cache.delete(LATEST_EVENT_KEY))
+
+
+def record(order, kind, previous_status=None):
+    """Log one change to `order` for the feed"""
+    # Read back rather than taken from the instance, whose fields may still hold raw input
+    data = _row(Order.objects.filter(pk=order.pk).values(*ROW_FIELDS).get())
+    data['previous_status'] = previous_status
+    event = OrderEvent.objects.create(order=order, kind=kind, data=data)
+    _invalidate()
+    return event
+
+
+def record_status_changes(pks, previous_status):
+    """Log a bulk status update (e.g. statement reconciliation) with one read and one insert"""
+    rows = Order.objects.filter(pk__in=pks).values(*ROW_FIELDS)
+    events = OrderEvent.objects.bulk_create([
+        OrderEvent(order_id=row['id'], kind='status_changed', data={**_row(row), 'previous_status': previous_status})
+        for row in rows
+    ])
+    if events:
+        _invalidate()
+    return events
+
+
+def latest_event_id():
+    latest = cache.get(LATEST_EVENT_KEY)
+    if latest is None:
+        latest = OrderEvent.objects.aggregate(latest=Max('pk'))['latest'] or 0
+        cache.set(LATEST_EVENT_KEY, latest, timeout=settings.ORDER_FEED_CACHE_SECONDS)
+    return latest
+
+
+async def alatest_event_id():
+    latest = await cache.aget(LATEST_EVENT_KEY)
+    if latest is None:
+        latest = (await OrderEvent.objects.aaggregate(latest=Max('pk')))['latest'] or 0
+        await cache.aset(LATEST_EVENT_KEY, latest, timeout=settings.ORDER_FEED_CACHE_SECONDS)
+    return latest
+
+
+class _Watcher:
+    """Polls the latest event id for every stream on one event loop"""
+    
+    def __init__(self):
+        self.latest = None  # until the first poll
+        self.changed = asyncio.Event()
+        self.streams = 0
+        self.task = None
+    
+    async def poll(self):
+        while True:
+            try:
+                latest = await alatest_event_id()
+            except Exception:
+                logger.exception('Order feed poll failed')
+            else:
+                if latest != self.latest:
+                    self.latest = latest
+                    # Wake the waiting streams; later waits use a fresh event
+                    self.changed.set()
+                    self.changed = asyncio.Event()
+            await asyncio.sleep(settings.ORDER_FEED_POLL_SECONDS)
+    
+    async def wait(self, timeout):
+        """Until the latest event id moves, or `timeout` seconds"""
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+_watchers = {}  # event loop -> _Watcher, while it has streams
+
+
+@contextlib.asynccontextmanager
+async def _watch():
+    loop = asyncio.get_running_loop()
+    watcher = _watchers.get(loop)
+    if watcher is None:
+        watcher = _watchers[loop] = _Watcher()
+        watcher.task = loop.create_task(watcher.poll())
+    watcher.streams += 1
+    try:
+        yield watcher
+    finally:
+        watcher.streams -= 1
+        if not watcher.streams:
+            watcher.task.cancel()
+            del _watchers[loop]
+
+
+def _message(event_id, name, data):
+    return f'id: {event_id}\nevent: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _resume_gap(last_id):
+    """True when events after last_id were already purged by the janitor"""
+    oldest = await OrderEvent.objects.order_by('pk').values_list('pk', flat=True).afirst()
+    return oldest is not None and oldest > last_id + 1
+
+
+async def stream(last_id):
+    """
+    Server-sent events after `last_id` until ORDER_FEED_MAX_SECONDS have passed;
+    the browser then reconnects with Last-Event-ID. A `reset` event means the
+    client missed more than ORDER_FEED_BACKLOG changes and should reload.
+    
+    Ids are assigned at insert, not at commit, so id 11 can become visible
+    before id 10. The cursor sent as the event id is therefore a low-water mark:
+    it only passes ids that were delivered, or that stayed missing for
+    ORDER_FEED_GAP_SECONDS (a rolled-back insert). Delivery is at-least-once.
+    """
+    loop = asyncio.get_running_loop()
+    started = last_write = loop.time()
+    yield f'retry: {settings.ORDER_FEED_RETRY_MS}\n\n'
+    
+    if last_id and await _resume_gap(last_id):
+        last_id = await alatest_event_id()
+        yield _message(last_id, 'reset', {})
+    
+    async with _watch() as watcher:
+        cursor = last_id
+        sent = set()  # ids above the cursor already delivered on this connection
+        gaps = {}  # ids above the cursor not yet visible -> when first noticed
+        while loop.time() - started < settings.ORDER_FEED_MAX_SECONDS:
+            top = max(sent, default=cursor)
+            if gaps or watcher.latest is None or watcher.latest > top:
+                events = [
+                    event async for event in OrderEvent.objects.filter(pk__gt=cursor).exclude(pk__in=sent).order_by('pk')[
+                        :settings.ORDER_FEED_BACKLOG + 1
+                    ]
+                ]
+                if len(events) > settings.ORDER_FEED_BACKLOG:
+                    cursor = await alatest_event_id()
+                    sent.clear()
+                    gaps.clear()
+                    yield _message(cursor, 'reset', {})
+                    last_write = loop.time()
+                    continue
+                
+                now = loop.time()
+                sent.update(event.pk for event in events)
+                for pk in range(cursor + 1, max(sent, default=cursor)):
+                    if pk not in sent:
+                        gaps.setdefault(pk, now)
+                for pk in [pk for pk in gaps if pk in sent]:
+                    del gaps[pk]
+                while cursor + 1 in sent or now - gaps.get(cursor + 1, now) >= settings.ORDER_FEED_GAP_SECONDS:
+                    cursor += 1
+                    sent.discard(cursor)
+                    gaps.pop(cursor, None)
+                
+                for event in events:
+                    yield _message(cursor, event.kind, event.data)
+                if events:
+                    last_write = loop.time()
+            if loop.time() - last_write >= settings.ORDER_FEED_HEARTBEAT_SECONDS:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                last_write = loop.time()
+            await watcher.wait(settings.ORDER_FEED_POLL_SECONDS)
@@ -0,0 +1,366 @@
+"""
+Similar payment receipts.
+
+Receipts from one wallet app share a layout and differ only in a few lines of
+text (amount, reference, time). No perceptual hash tells those apart from a
+re-encoded or cropped copy of one receipt: at any resolution, two receipts of
+the same template hash closer than a screenshot and its recompressed copy. So
+receipts are compared as images, among candidates an index picks out of all
+of them.
+
+Each distinct receipt file (by SHA-256) is trimmed to its content (the
+background margins removed) and stored as a THUMBNAIL_WIDTH-wide grayscale
+thumbnail; its height, indexed, stands for the content's aspect ratio. Its
+text lines are measured too: where each starts and ends across the width and
+the gap above it. Those move with the text on the line (an amount, a name, a
+reference) but not with re-encoding, rescaling or a crop, so every WINDOW
+consecutive lines, quantized and hashed, are one ReceiptBand key.
+
+Matching runs off the web workers (`manage.py match_receipts`). The
+receipt's windows, widened by LINE_TOLERANCE, are looked up in the band index
+over all receipts, leaving out those more than RECEIPT_SIMILARITY_MAX_POSTINGS
+receipts share (a template's fixed lines). Of the receipts sharing at least
+half the rest, the RECEIPT_SIMILARITY_CANDIDATES with the closest line layout
+are compared with it: aligned vertically, then pixel by pixel. Those whose
+text matches too, under RECEIPT_SIMILARITY_MAX_DIFFERENCE of the content
+differing, are stored as ReceiptMatch rows, so reads are one indexed query.
+"""
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import zlib
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, Count, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTH = 240
+# Pixels differing by more than this (of 255) are changed content, not encoding noise
+PIXEL_THRESHOLD = 64
+CHANGED = [255 if p > PIXEL_THRESHOLD else 0 for p in range(256)]
+# Vertical shifts tried when aligning two thumbnails (fraction of the height), and the overlap they must keep
+MAX_SHIFT = 0.1
+MIN_OVERLAP = 0.8
+# Rows at either end of the overlap left out of the comparison; a crop leaves partial rows there
+EDGE_ROWS = 3
+# Text lines: pixels this far from the background are ink, and runs of ink rows lower than
+# MIN_LINE_HEIGHT (thousandths of the width) are specks. Positions are quantized to LINE_STEP
+# and gaps to GAP_STEP thousandths; a copy of a receipt measures within LINE_TOLERANCE
+INK_THRESHOLD = 48
+MIN_LINE_HEIGHT = 10
+LINE_STEP = 8
+GAP_STEP = 16
+LINE_TOLERANCE = 2
+WINDOW = 3
+
+
+def content(image):
+    """Grayscale receipt trimmed to the area that differs from its background"""
+    from PIL import Image, ImageChops, ImageOps
+    image = ImageOps.exif_transpose(image).convert('L')
+    background = Image.new('L', image.size, image.getpixel((0, image.height - 1)))
+    bbox = ImageChops.difference(image, background).point(lambda p: 255 if p > 16 else 0).getbbox()
+    return image.crop(bbox) if bbox else image
+
+
+def thumbnail(image):
+    """THUMBNAIL_WIDTH-wide copy, aspect ratio kept"""
+    from PIL import Image
+    height = max(2 * EDGE_ROWS + 3, round(image.height * THUMBNAIL_WIDTH / image.width))
+    return image.resize((THUMBNAIL_WIDTH, height), Image.BOX)
+
+
+def pack_thumbnail(image):
+    """zlib-compressed pixels, a few KB for a phone screenshot"""
+    return zlib.compress(image.tobytes())
+
+
+class Thumbnail:
+    """
+    A stored thumbnail ready for comparison: its rows (less the first and
+    last), the darkest and lightest of each of those pixels and the ones above
+    and below it, and its row brightness profile for alignment
+    """
+    
+    def __init__(self, data):
+        from PIL import Image, ImageChops
+        pixels = zlib.decompress(bytes(data))
+        self.height = len(pixels) // THUMBNAIL_WIDTH
+        image = Image.frombytes('L', (THUMBNAIL_WIDTH, self.height), pixels)
+        above, self.rows, below = (image.crop((0, o, THUMBNAIL_WIDTH, self.height - 2 + o)) for o in (0, 1, 2))
+        self.low = ImageChops.darker(ImageChops.darker(above, self.rows), below)
+        self.high = ImageChops.lighter(ImageChops.lighter(above, self.rows), below)
+        self.profile = image.resize((1, self.height), Image.BOX).tobytes()
+
+
+def _offset(a, b, step=3):
+    """Vertical shift of b against a whose row brightness profiles agree best, or None"""
+    limit = int(max(a.height, b.height) * MAX_SHIFT)
+    
+    def best(shifts):
+        scored = []
+        for dy in shifts:
+            top_a, top_b = max(0, dy), max(0, -dy)
+            height = min(a.height - top_a, b.height - top_b)
+            if height < min(a.height, b.height) * MIN_OVERLAP:
+                continue
+            rows = zip(a.profile[top_a:top_a + height:2], b.profile[top_b:top_b + height:2])
+            scored.append((sum(abs(x - y) for x, y in rows) / height, dy))
+        return min(scored)[1] if scored else None
+    
+    # Every `step`th shift, then the ones around the best of those
+    coarse = best(range(-limit, limit + 1, step))
+    return None if coarse is None else best(range(coarse - step + 1, coarse + step))
+
+
+def difference(a, b):
+    """
+    Share of two aligned Thumbnails' pixels that differ: 0.0007 or less for
+    one receipt, 0.0012 or more for two. A pixel within the range of the other
+    image's pixel and its vertical neighbours is the same content resampled
+    at a slightly different offset, so it doesn't count.
+    """
+    from PIL import ImageChops
+    dy = _offset(a, b)
+    if dy is None:
+        return 1.0
+    top_a, top_b = max(0, dy) + EDGE_ROWS, max(0, -dy) + EDGE_ROWS
+    height = min(a.rows.height - top_a, b.rows.height - top_b) - EDGE_ROWS
+    if height <= 0:
+        return 1.0
+    box_a = (0, top_a, THUMBNAIL_WIDTH, top_a + height)
+    box_b = (0, top_b, THUMBNAIL_WIDTH, top_b + height)
+    rows_a, low_a, high_a = a.rows.crop(box_a), a.low.crop(box_a), a.high.crop(box_a)
+    rows_b, low_b, high_b = b.rows.crop(box_b), b.low.crop(box_b), b.high.crop(box_b)
+    outside = ImageChops.lighter(
+        ImageChops.lighter(ImageChops.subtract(rows_a, high_b), ImageChops.subtract(low_b, rows_a)),
+        ImageChops.lighter(ImageChops.subtract(rows_b, high_a), ImageChops.subtract(low_a, rows_b)),
+    )
+    return outside.point(CHANGED).histogram()[255] / (THUMBNAIL_WIDTH * height)
+
+
+def height_range(height):
+    """Thumbnail heights a receipt `height` rows tall can be aligned with"""
+    return int(height * (1 - MAX_SHIFT)), int(height / (1 - MAX_SHIFT)) + 1
+
+
+def text_lines(image):
+    """[left, right, top, bottom] of each text line of a content() image, in thousandths of its width"""
+    from PIL import Image, ImageChops
+    width, height = image.size
+    background = Image.new('L', image.size, image.getpixel((0, height - 1)))
+    ink = ImageChops.difference(image, background).point(lambda p: 255 if p > INK_THRESHOLD else 0)
+    lines, top = [], None
+    for y, inked in enumerate([*ink.getprojection()[1], 0]):
+        if inked and top is None:
+            top = y
+        elif not inked and top is not None:
+            if (y - top) * 1000 >= MIN_LINE_HEIGHT * width:
+                left, _, right, _ = ink.crop((0, top, width, y)).getbbox()
+                lines.append([round(value * 1000 / width, 1) for value in (left, right, top, y)])
+            top = None
+    return lines
+
+
+def _buckets(value, step, tolerance):
+    return {math.floor((value - tolerance) / step), math.floor((value + tolerance) / step)}
+
+
+def _windows(lines, tolerance=0):
+    """
+    ReceiptBand keys of every WINDOW consecutive text lines, a set per window;
+    with a tolerance, every key the same lines measured that much off could have
+    """
+    for i in range(len(lines) - WINDOW + 1):
+        window = lines[i:i + WINDOW]
+        parts = []
+        for j, (left, right, top, bottom) in enumerate(window):
+            parts += [_buckets(left, LINE_STEP, tolerance), _buckets(right, LINE_STEP, tolerance)]
+            if j:
+                parts.append(_buckets(top - window[j - 1][3], GAP_STEP, tolerance))
+        keys = set()
+        for buckets in itertools.product(*parts):
+            digest = hashlib.blake2b(repr(buckets).encode(), digest_size=8).digest()
+            keys.add(int.from_bytes(digest, 'big', signed=True))
+        yield keys
+
+
+def band_keys(lines):
+    """ReceiptBand keys stored for a receipt's text lines"""
+    return set().union(*_windows(lines))
+
+
+def layout_distance(a, b):
+    """
+    Mean difference between two receipts' text lines (left and right ends, gap
+    above), in thousandths of the width, leaving out the line that differs
+    most: a crop cuts into one at the edge. Lines one apart are tried too, for
+    a crop that removed a line.
+    """
+    def features(lines):
+        return [(line[0], line[1], line[2] - above[3]) for above, line in zip(lines, lines[1:])]
+    
+    a, b = features(a), features(b)
+    best = math.inf
+    for shift in (-1, 0, 1):
+        pairs = list(zip(a[max(0, shift):], b[max(0, -shift):]))
+        if len(pairs) < max(len(a), len(b)) - 2:
+            continue
+        costs = sorted(max(abs(x - y) for x, y in zip(line_a, line_b)) for line_a, line_b in pairs)[:-1]
+        if costs:
+            best = min(best, sum(costs) / len(costs))
+    return best
+
+
+def measure(image):
+    """ReceiptFingerprint fields for a receipt image"""
+    trimmed = content(image)
+    small = thumbnail(trimmed)
+    return {'thumbnail': pack_thumbnail(small), 'height': small.height, 'lines': text_lines(trimmed)}
+
+
+def candidates(fingerprint):
+    """
+    sha256 of the receipts to compare `fingerprint` with: those sharing at
+    least half its less common band windows, the RECEIPT_SIMILARITY_CANDIDATES
+    with the closest text-line layout
+    """
+    from .models import ReceiptBand, ReceiptFingerprint
+    windows = list(_windows(fingerprint.lines or [], LINE_TOLERANCE))
+    if not windows:
+        return []
+    postings = dict(ReceiptBand.objects.filter(key__in=set().union(*windows)).values_list('key').annotate(Count('id')))
+    counts = [sum(postings.get(key, 0) for key in keys) for keys in windows]
+    # A template's fixed lines are in all its receipts: look up the other windows, or the rarest
+    used = [keys for keys, count in zip(windows, counts) if count <= settings.RECEIPT_SIMILARITY_MAX_POSTINGS]
+    used = used or [windows[counts.index(min(counts))]]
+    
+    shortlist = ReceiptBand.objects.filter(key__in=set().union(*used)).exclude(
+        receipt_id=fingerprint.sha256
+    ).values('receipt_id').annotate(shared=Count('id')).filter(shared__gte=math.ceil(len(used) / 2)).values('receipt_id')
+    rows = ReceiptFingerprint.objects.filter(
+        sha256__in=shortlist, height__range=height_range(fingerprint.height)
+    ).values_list('sha256', 'lines')
+    distances = {sha256: layout_distance(fingerprint.lines, lines) for sha256, lines in rows}
+    return heapq.nsmallest(settings.RECEIPT_SIMILARITY_CANDIDATES, distances, key=distances.get)
+
+
+def match(fingerprint):
+    """
+    Compare `fingerprint` with its candidates and store the ones showing the
+    same receipt; returns [(sha256, difference)]
+    """
+    from .models import ReceiptFingerprint, ReceiptMatch
+    rows = ReceiptFingerprint.objects.filter(sha256__in=candidates(fingerprint)).exclude(
+        thumbnail=b''
+    ).values_list('sha256', 'thumbnail')
+    
+    query = Thumbnail(fingerprint.thumbnail)
+    matches = []
+    for sha256, packed in rows:
+        score = difference(query, Thumbnail(packed))
+        if score <= settings.RECEIPT_SIMILARITY_MAX_DIFFERENCE:
+            matches.append((sha256, score))
+    
+    # Both directions, so either receipt finds the other; a concurrent job may have stored them already
+    ReceiptMatch.objects.bulk_create([
+        ReceiptMatch(receipt_id=a, other_id=b, difference=score)
+        for sha256, score in matches
+        for a, b in ((fingerprint.sha256, sha256), (sha256, fingerprint.sha256))
+    ], ignore_conflicts=True)
+    ReceiptFingerprint.objects.filter(sha256=fingerprint.sha256).update(matched_at=timezone.now())
+    return matches
+
+
+def match_pending(limit=100):
+    """
+    Match receipts fingerprinted since the last pass, oldest first; returns
+    how many. Matching is idempotent, so overlapping passes only repeat work.
+    """
+    from .models import ReceiptFingerprint
+    pending = list(ReceiptFingerprint.objects.filter(
+        matched_at__isnull=True, lines__isnull=False
+    ).exclude(thumbnail=b'').order_by('created_at')[:limit])
+    for fingerprint in pending:
+        match(fingerprint)
+    return len(pending)
+
+
+def index_receipt(digest, name=None):
+    """
+    Fingerprint the stored receipt for `digest` and index its band keys unless
+    it already is; returns the row or None. match_pending() matches it later.
+    Rows from before text lines were measured are redone.
+    """
+    from PIL import Image
+    from .models import Order, ReceiptBand, ReceiptFingerprint
+    existing = ReceiptFingerprint.objects.filter(sha256=digest).first()
+    if existing and existing.thumbnail and existing.lines is not None:
+        return existing
+    
+    name = name or Order.objects.filter(receipt_sha256=digest).values_list('receipt_url', flat=True).first()
+    if not name:
+        return existing
+    try:
+        with default_storage.open(name, 'rb') as f, Image.open(f) as image:
+            fields = measure(image)
+    except Exception as e:
+        logger.warning(f'Could not fingerprint receipt {name}: {str(e)}')
+        return existing
+    
+    with transaction.atomic():
+        fingerprint, _ = ReceiptFingerprint.objects.update_or_create(
+            sha256=digest, defaults={**fields, 'matched_at': None}
+        )
+        ReceiptBand.objects.filter(receipt=fingerprint).delete()
+        ReceiptBand.objects.bulk_create([
+            ReceiptBand(receipt=fingerprint, key=key) for key in band_keys(fields['lines'])
+        ])
+    return fingerprint
+
+
+def similar(digest, limit=None):
+    """[(sha256, difference)] of other receipt files showing the same receipt, most alike first"""
+    from .models import ReceiptMatch
+    if limit is None:
+        limit = settings.RECEIPT_SIMILAR_ORDERS_LIMIT
+    return list(ReceiptMatch.objects.filter(receipt_id=digest).order_by('difference').values_list(
+        'other_id', 'difference'
+    )[:limit])
+
+
+def similar_orders(order, limit=None):
+    """
+    Other orders whose receipt is the same file (difference 0) or shows the
+    same receipt, at most `limit` (RECEIPT_SIMILAR_ORDERS_LIMIT) of them
+    """
+    from .models import Order
+    if not order.receipt_sha256:
+        return []
+    if limit is None:
+        limit = settings.RECEIPT_SIMILAR_ORDERS_LIMIT
+    
+    differences = {order.receipt_sha256: 0, **dict(similar(order.receipt_sha256, limit))}
+    # Same file first, then by how alike the receipts are
+    rank = Case(*[When(receipt_sha256=sha256, then=i) for i, sha256 in enumerate(differences)])
+    rows = Order.objects.filter(receipt_sha256__in=differences).exclude(pk=order.pk).order_by(rank, 'created_at').values(
+        'id', 'order_id', 'status', 'full_name', 'receipt_sha256', 'created_at'
+    )[:limit]
+    return [
+        {
+            'id': row['id'],
+            'order_id': row['order_id'],
+            'status': row['status'],
+            'full_name': row['full_name'],
+            'created_at': row['created_at'],
+            'difference': differences[row['receipt_sha256']],
+            'same_file': row['receipt_sha256'] == order.receipt_sha256,
+        }
+        for row in rows
+    ]
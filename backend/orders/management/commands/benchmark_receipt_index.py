@@ -0,0 +1,162 @@
+from io import BytesIO
+import random
+import statistics
+import string
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orders import fingerprints
+from orders.models import ReceiptBand, ReceiptFingerprint
+
+NAMES = ['Abebe Kebede', 'Sara Tesfaye', 'Hana Girma', 'Dawit Alemu', 'Meron Haile', 'Yonas Bekele']
+
+
+def _template(index):
+    """One wallet app's receipt screen on one phone: header colour and title, row labels, spacing, screen height"""
+    rng = random.Random(index)
+    return {
+        'colour': tuple(rng.randrange(40, 200) for _ in range(3)),
+        'title': rng.choice(['telebirr', 'CBE Birr', 'M-PESA', 'Amole', 'HelloCash', 'Awash']),
+        'labels': rng.sample(['Transaction Number', 'Transaction To', 'Transaction Time', 'Service Fee',
+                              'Reference', 'Account', 'Paid By', 'VAT'], 4),
+        'top': rng.randrange(120, 240),
+        'spacing': rng.randrange(60, 90),
+        'height': rng.choice([1280, 1340, 1520, 1600]),
+    }
+
+
+def _render(template):
+    """A 720px-wide screenshot of a receipt in `template` with a random amount, payee, reference and time"""
+    from PIL import Image, ImageDraw, ImageFont
+    large, small = ImageFont.load_default(size=30), ImageFont.load_default(size=22)
+    image = Image.new('RGB', (720, template['height']), (245, 247, 250))
+    draw = ImageDraw.Draw(image)
+    top = template['top']
+    draw.rectangle([0, 0, 720, 100], fill=template['colour'])
+    draw.text((40, 32), template['title'], fill='white', font=large)
+    draw.ellipse([300, top, 420, top + 120], fill=(40, 180, 90))
+    draw.text((220, top + 160), 'Payment Successful', fill=(20, 20, 20), font=large)
+    draw.text((250, top + 220), f'-{random.randint(10, 9999)}.00 (ETB)', fill=(20, 20, 20), font=large)
+    values = [
+        ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(10)),
+        random.choice(NAMES),
+        f'2026/{random.randint(1, 12):02d}/{random.randint(1, 28):02d} '
+        f'{random.randint(0, 23):02d}:{random.randint(0, 59):02d}:{random.randint(0, 59):02d}',
+        f'{random.randint(0, 20)}.00',
+    ]
+    for i, (label, value) in enumerate(zip(template['labels'], values)):
+        y = top + 330 + i * template['spacing']
+        draw.text((40, y), label, fill=(120, 120, 120), font=small)
+        draw.text((400, y), value, fill=(20, 20, 20), font=small)
+    bottom = template['height'] - 340
+    draw.rectangle([40, bottom, 680, bottom + 80], fill=template['colour'])
+    draw.text((300, bottom + 22), 'Finished', fill='white', font=large)
+    return image
+
+
+def _resubmitted(image):
+    """The same receipt sent again: edges cropped, rescaled and recompressed by a messaging app"""
+    from PIL import Image
+    crop = int(image.height * random.uniform(0, 0.05))
+    if random.random() < 0.5:
+        image = image.crop((0, crop, image.width, image.height))
+    else:
+        image = image.crop((0, 0, image.width, image.height - crop))
+    scale = random.uniform(0.6, 1.5)
+    image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=random.randint(40, 85))
+    return Image.open(BytesIO(buffer.getvalue()))
+
+
+def _p95(values):
+    return sorted(values)[max(0, int(len(values) * 0.95) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time receipt matching on a synthetic index of receipts from a few wallet templates, '
+        'and count resubmitted receipts found and distinct ones wrongly matched'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000, help='Fingerprints in the synthetic index')
+        parser.add_argument('--templates', type=int, default=6, help='Wallet layouts the receipts are spread over')
+        parser.add_argument('--drawn', type=int, default=1000, help='Distinct receipts drawn for the index')
+        parser.add_argument('--queries', type=int, default=40)
+        parser.add_argument('--seed', type=int, default=1)
+    
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        templates = [_template(i) for i in range(options['templates'])]
+        
+        started = time.perf_counter()
+        # Receipts that queries resubmit, and others (each stored many times) that fill the index
+        stored = [_render(random.choice(templates)) for _ in range(options['drawn'])]
+        filler = [fingerprints.measure(_render(random.choice(templates))) for _ in range(options['drawn'])]
+        self.stdout.write(f'Drew {len(stored) + len(filler)} receipts in {time.perf_counter() - started:.1f}s')
+        
+        # Everything runs inside a transaction that is rolled back, leaving the real index untouched
+        with transaction.atomic():
+            started = time.perf_counter()
+            rows = [
+                ReceiptFingerprint(sha256=f'{i:064x}', **fingerprints.measure(image))
+                for i, image in enumerate(stored)
+            ] + [
+                ReceiptFingerprint(sha256=f'{i:064x}', **random.choice(filler))
+                for i in range(len(stored), options['count'])
+            ]
+            ReceiptFingerprint.objects.bulk_create(rows, batch_size=2000)
+            ReceiptBand.objects.bulk_create((
+                ReceiptBand(receipt_id=row.sha256, key=key) for row in rows for key in fingerprints.band_keys(row.lines)
+            ), batch_size=5000)
+            self.stdout.write(f'Inserted {len(rows):,} fingerprints in {time.perf_counter() - started:.1f}s')
+            
+            # Half the queries resubmit a stored receipt, wherever it is in the index; half are
+            # new receipts of a known template
+            resubmits = random.sample(range(len(stored)), options['queries'] // 2)
+            lookups, timings, reads, candidates = [], [], [], []
+            found = tried = false_matches = 0
+            for n in range(options['queries']):
+                expected = None
+                if n % 2 == 0:
+                    index = resubmits[n // 2]
+                    expected = f'{index:064x}'
+                    image = _resubmitted(stored[index])
+                else:
+                    image = _render(random.choice(templates))
+                query = ReceiptFingerprint.objects.create(sha256=f'query-{n}', **fingerprints.measure(image))
+                ReceiptBand.objects.bulk_create([
+                    ReceiptBand(receipt=query, key=key) for key in fingerprints.band_keys(query.lines)
+                ])
+                
+                started = time.perf_counter()
+                candidates.append(len(fingerprints.candidates(query)))
+                lookups.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                matches = [sha256 for sha256, _ in fingerprints.match(query)]
+                timings.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                fingerprints.similar(query.sha256)
+                reads.append(time.perf_counter() - started)
+                
+                false_matches += sum(1 for sha256 in matches if sha256 != expected)
+                if expected:
+                    tried += 1
+                    found += expected in matches
+            
+            transaction.set_rollback(True)
+        
+        self.stdout.write(
+            f'candidates() p50={statistics.median(lookups) * 1000:.0f}ms p95={_p95(lookups) * 1000:.0f}ms, '
+            f'p50={statistics.median(candidates):,.0f} p95={_p95(candidates):,} receipts to compare '
+            f'(cap {settings.RECEIPT_SIMILARITY_CANDIDATES:,})'
+        )
+        self.stdout.write(
+            f'match()      p50={statistics.median(timings) * 1000:.0f}ms p95={_p95(timings) * 1000:.0f}ms '
+            f'(lookup and comparison, in `manage.py match_receipts`)'
+        )
+        self.stdout.write(f'similar()    p50={statistics.median(reads) * 1000:.2f}ms (admin and API reads)')
+        self.stdout.write(f'found        {found}/{tried} resubmitted receipts')
+        self.stdout.write(f'false        {false_matches} matches to a different receipt over {options["queries"]} queries')
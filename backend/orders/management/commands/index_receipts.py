@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from django.core.management.base import BaseCommand
+from django.db import connections
+from orders.fingerprints import index_receipt, match_pending
+from orders.models import Order, ReceiptFingerprint
+from orders.receipts import recompress
+
+
+def _hash_stored(name):
+    sha256 = hashlib.sha256()
+    with Order._meta.get_field('receipt_url').storage.open(name, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Hash, fingerprint and match receipts of orders created before the receipt index, optionally recompressing them'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--recompress', action='store_true', help='Also downscale oversized receipts')
+    
+    def handle(self, *args, **options):
+        pending = list(Order.objects.filter(receipt_sha256='').exclude(receipt_url='').values_list('pk', 'receipt_url'))
+        
+        def index(row):
+            pk, name = row
+            try:
+                digest = _hash_stored(name)
+                Order.objects.filter(pk=pk).update(receipt_sha256=digest)
+                return digest
+            except OSError as e:
+                self.stderr.write(f'Order {pk}: cannot read {name}: {str(e)}')
+                return None
+            finally:
+                connections.close_all()
+        
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            digests = [digest for digest in pool.map(index, pending) if digest]
+        self.stdout.write(self.style.SUCCESS(f'Indexed {len(digests)} of {len(pending)} receipts'))
+        
+        shared = Order.objects.with_receipt_duplicates().filter(receipt_duplicate_count__gt=0).count()
+        if shared:
+            self.stdout.write(self.style.WARNING(f'{shared} orders share a receipt with another order'))
+        
+        all_digests = set(Order.objects.exclude(receipt_sha256='').values_list('receipt_sha256', flat=True))
+        # Fingerprints from before text lines were measured are redone too
+        missing = all_digests - set(ReceiptFingerprint.objects.exclude(thumbnail=b'').filter(
+            lines__isnull=False
+        ).values_list('sha256', flat=True))
+        
+        def fingerprint(digest):
+            try:
+                return index_receipt(digest)
+            finally:
+                connections.close_all()
+        
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            fingerprinted = sum(1 for row in pool.map(fingerprint, missing) if row)
+        self.stdout.write(self.style.SUCCESS(f'Fingerprinted {fingerprinted} of {len(missing)} receipts'))
+        
+        matched = 0
+        while batch := match_pending():
+            matched += batch
+        self.stdout.write(self.style.SUCCESS(f'Matched {matched} receipts'))
+        
+        if options['recompress']:
+            def run(digest):
+                try:
+                    return recompress(digest)
+                finally:
+                    connections.close_all()
+            
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                recompressed = sum(1 for name in pool.map(run, all_digests) if name)
+            self.stdout.write(self.style.SUCCESS(f'Recompressed {recompressed} receipts'))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from orders.fingerprints import match_pending
+
+
+class Command(BaseCommand):
+    help = 'Compare newly fingerprinted receipts with earlier ones and record those showing the same receipt'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new receipts')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between polls in --loop mode')
+        parser.add_argument('--limit', type=int, default=100, help='Maximum receipts per pass')
+    
+    def handle(self, *args, **options):
+        while True:
+            matched = match_pending(limit=options['limit'])
+            if matched:
+                self.stdout.write(f'Matched {matched} receipts')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
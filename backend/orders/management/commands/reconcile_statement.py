@@ -0,0 +1,57 @@
+import json
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from orders.models import Order
+from orders.reconciliation import Reconciliation, StatementError
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Match pending orders against bank/wallet statement CSVs and verify the clean matches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('statements', nargs='+', help='CSV statement files')
+        parser.add_argument('--payment-method', choices=[choice for choice, _ in Order.PAYMENT_CHOICES])
+        parser.add_argument('--reference-column', help='Override the detected reference column')
+        parser.add_argument('--amount-column', help='Override the detected amount column')
+        parser.add_argument('--admin', help='Phone number of the admin recorded in the audit log')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without verifying orders')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+    
+    def handle(self, *args, **options):
+        admin = None
+        if options['admin']:
+            try:
+                admin = User.objects.get_by_phone(options['admin'])
+            except User.DoesNotExist:
+                admin = None
+            if admin is None or not admin.is_staff:
+                raise CommandError(f"No admin with phone {options['admin']}")
+        
+        reconciliation = Reconciliation(options['payment_method'])
+        for path in options['statements']:
+            try:
+                with open(path, 'rb') as f:
+                    reconciliation.feed(f, options['reference_column'], options['amount_column'])
+            except (OSError, StatementError, UnicodeDecodeError) as e:
+                raise CommandError(f'{path}: {str(e)}')
+        
+        if not options['dry_run']:
+            reconciliation.apply(admin=admin)
+        
+        report = reconciliation.report()
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        
+        self.stdout.write(
+            f"rows={report['rows']} matched={report['matched']} verified={report['verified']} "
+            f"conflicts={report['conflicts']} invalid={report['invalid_rows']} "
+            f"unmatched_rows={report['unmatched_rows']} unmatched_orders={report['unmatched_orders']}"
+        )
+        for conflict in report['conflict_details']:
+            self.stdout.write(self.style.WARNING(
+                f"row {conflict['row']} {conflict['reference']} {conflict['amount']}: "
+                f"{conflict['reason']} ({', '.join(conflict['orders'])})"
+            ))
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_order_coupon_order_discount_amount_order_subtotal"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="receipt_sha256",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=64
+            ),
+        ),
+    ]
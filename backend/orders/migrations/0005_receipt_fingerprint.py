@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_receipt_sha256"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReceiptFingerprint",
+            fields=[
+                (
+                    "sha256",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("phash", models.BigIntegerField()),
+                ("band_0", models.IntegerField(db_index=True)),
+                ("band_1", models.IntegerField(db_index=True)),
+                ("band_2", models.IntegerField(db_index=True)),
+                ("band_3", models.IntegerField(db_index=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
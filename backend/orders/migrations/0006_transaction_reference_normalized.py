@@ -0,0 +1,56 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:38
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def normalize_reference(value):
+    # Frozen copy of orders.utils.normalize_reference
+    return re.sub(r"[^0-9A-Z]", "", str(value or "").upper())
+
+
+def backfill_reference(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    batch = []
+    for order in Order.objects.only("pk", "transaction_reference").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        order.transaction_reference_normalized = normalize_reference(
+            order.transaction_reference
+        )
+        batch.append(order)
+        if len(batch) >= BATCH_SIZE:
+            Order.objects.bulk_update(batch, ["transaction_reference_normalized"])
+            batch = []
+    Order.objects.bulk_update(batch, ["transaction_reference_normalized"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("coupons", "0002_coupon_active_expiry_idx"),
+        ("orders", "0005_receipt_fingerprint"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="transaction_reference_normalized",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=200
+            ),
+        ),
+        migrations.RunPython(backfill_reference, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["transaction_reference_normalized", "payment_method"],
+                name="order_reference_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:40
+
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# PostgreSQL only: pg_trgm for name search, pattern_ops for LIKE 'prefix%' under
+# non-C collations. SQLite uses the plain B-tree indexes (orders.search).
+POSTGRES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS order_name_trgm_idx ON orders_order USING gin (full_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS order_name_upper_trgm_idx ON orders_order USING gin (UPPER(full_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS order_phone_digits_like_idx ON orders_order (phone_digits varchar_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS order_order_id_like_idx ON orders_order (order_id varchar_pattern_ops)",
+]
+
+
+def phone_digits(value):
+    # Frozen copy of orders.utils.phone_digits
+    digits = re.sub(r"\D", "", str(value or ""))
+    if digits.startswith("251"):
+        digits = digits[3:]
+    return digits.lstrip("0")
+
+
+def backfill_phone_digits(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    batch = []
+    for order in Order.objects.only("pk", "phone").iterator(chunk_size=BATCH_SIZE):
+        order.phone_digits = phone_digits(order.phone)
+        batch.append(order)
+        if len(batch) >= BATCH_SIZE:
+            Order.objects.bulk_update(batch, ["phone_digits"])
+            batch = []
+    Order.objects.bulk_update(batch, ["phone_digits"])
+
+
+def create_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for sql in POSTGRES_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in POSTGRES_INDEXES:
+        name = sql.split(" ON ")[0].split()[-1]
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_transaction_reference_normalized"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="phone_digits",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=20
+            ),
+        ),
+        migrations.RunPython(backfill_phone_digits, migrations.RunPython.noop),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
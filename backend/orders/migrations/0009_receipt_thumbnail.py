@@ -0,0 +1,86 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0008_order_event"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="receiptfingerprint",
+            name="band_0",
+        ),
+        migrations.RemoveField(
+            model_name="receiptfingerprint",
+            name="band_1",
+        ),
+        migrations.RemoveField(
+            model_name="receiptfingerprint",
+            name="band_2",
+        ),
+        migrations.RemoveField(
+            model_name="receiptfingerprint",
+            name="band_3",
+        ),
+        migrations.RemoveField(
+            model_name="receiptfingerprint",
+            name="phash",
+        ),
+        migrations.AddField(
+            model_name="receiptfingerprint",
+            name="height",
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name="receiptfingerprint",
+            name="thumbnail",
+            field=models.BinaryField(blank=True, default=b""),
+        ),
+        migrations.AlterField(
+            model_name="receiptfingerprint",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name="ReceiptMatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("difference", models.FloatField()),
+                (
+                    "other",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="orders.receiptfingerprint",
+                    ),
+                ),
+                (
+                    "receipt",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="matches",
+                        to="orders.receiptfingerprint",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="receiptmatch",
+            constraint=models.UniqueConstraint(
+                fields=("receipt", "other"), name="receipt_match_unique"
+            ),
+        ),
+    ]
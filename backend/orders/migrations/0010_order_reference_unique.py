@@ -0,0 +1,63 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:29
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    # Rejecting an order also restores its stock, so duplicates are left to an admin
+    Order = apps.get_model("orders", "Order")
+    groups = (
+        Order.objects.exclude(status="rejected")
+        .exclude(transaction_reference_normalized="")
+        .values("transaction_reference_normalized", "payment_method")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+    )
+    problems = []
+    for group in groups:
+        order_ids = (
+            Order.objects.filter(
+                transaction_reference_normalized=group[
+                    "transaction_reference_normalized"
+                ],
+                payment_method=group["payment_method"],
+            )
+            .exclude(status="rejected")
+            .values_list("order_id", flat=True)
+        )
+        problems.append(
+            f"{group['transaction_reference_normalized']} ({group['payment_method']}): "
+            f"{', '.join(order_ids)}"
+        )
+    if problems:
+        raise RuntimeError(
+            "Orders share a transaction reference; reject all but one of each before "
+            "migrating:\n" + "\n".join(problems)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("coupons", "0002_coupon_active_expiry_idx"),
+        ("orders", "0009_receipt_thumbnail"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    models.Q(("status", "rejected"), _negated=True),
+                    models.Q(("transaction_reference_normalized", ""), _negated=True),
+                ),
+                fields=("transaction_reference_normalized", "payment_method"),
+                name="order_reference_unique",
+                violation_error_message="This transaction reference has already been used for another order",
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0010_order_reference_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="receiptfingerprint",
+            name="lines",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="receiptfingerprint",
+            name="matched_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ReceiptBand",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.BigIntegerField(db_index=True)),
+                (
+                    "receipt",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bands",
+                        to="orders.receiptfingerprint",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="receiptband",
+            constraint=models.UniqueConstraint(
+                fields=("receipt", "key"), name="receipt_band_unique"
+            ),
+        ),
+    ]
@@ -1,9 +1,31 @@
-from django.db import models
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
 from django.contrib.auth import get_user_model
 from products.models import Product
+from .utils import normalize_reference, phone_digits
 
 User = get_user_model()
 
+class OrderQuerySet(models.QuerySet):
+    def with_receipt_duplicates(self):
+        """Annotate `receipt_duplicate_count`: other orders carrying the same receipt file"""
+        others = Order.objects.filter(
+            receipt_sha256=OuterRef('receipt_sha256')
+        ).exclude(pk=OuterRef('pk')).exclude(receipt_sha256='').order_by().values('receipt_sha256')
+        return self.annotate(receipt_duplicate_count=Coalesce(
+            Subquery(others.annotate(count=Count('pk')).values('count')[:1]), Value(0)
+        ))
+    
+    def with_reference(self, reference, payment_method=None):
+        """Orders paid with `reference` in any spelling; an index probe on the normalized column"""
+        orders = self.filter(transaction_reference_normalized=normalize_reference(reference))
+        if payment_method:
+            orders = orders.filter(payment_method=payment_method)
+        return orders
+
 class Order(models.Model):
     DELIVERY_CHOICES = [
         ('delivery', 'Delivery'),
@@ -26,6 +48,8 @@ class Order(models.Model):
     order_id = models.CharField(max_length=50, unique=True, editable=False)
     full_name = models.CharField(max_length=200)
     phone = models.CharField(max_length=20)
+    # phone_digits(phone): national digits, indexed for prefix search (orders.search)
+    phone_digits = models.CharField(max_length=20, blank=True, default='', db_index=True, editable=False)
     email = models.EmailField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     delivery_method = models.CharField(max_length=10, choices=DELIVERY_CHOICES)
@@ -33,7 +57,11 @@ class Order(models.Model):
     delivery_notes = models.TextField(blank=True, null=True)
     payment_method = models.CharField(max_length=10, choices=PAYMENT_CHOICES)
     transaction_reference = models.CharField(max_length=200)
+    # normalize_reference(transaction_reference), used for every duplicate check and lookup
+    transaction_reference_normalized = models.CharField(max_length=200, blank=True, default='', editable=False)
     receipt_url = models.ImageField(upload_to='receipts/')
+    # SHA-256 of the uploaded receipt (orders.receipts); equal values mean the same file was reused
+    receipt_sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True, editable=False)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     admin_note = models.TextField(blank=True, null=True)
     
@@ -46,7 +74,36 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OrderQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['transaction_reference_normalized', 'payment_method'], name='order_reference_idx'),
+        ]
+        constraints = [
+            # A reference pays for one order per payment method; rejecting an order frees it
+            models.UniqueConstraint(
+                fields=['transaction_reference_normalized', 'payment_method'],
+                condition=~models.Q(status='rejected') & ~models.Q(transaction_reference_normalized=''),
+                name='order_reference_unique',
+                violation_error_message='This transaction reference has already been used for another order',
+            ),
+        ]
+    
+    def validate_constraints(self, exclude=None):
+        # Forms leave out the derived column; it follows transaction_reference, so the reference constraint still applies
+        if exclude and 'transaction_reference' not in exclude:
+            self.transaction_reference_normalized = normalize_reference(self.transaction_reference)
+            exclude = set(exclude) - {'transaction_reference_normalized'}
+        super().validate_constraints(exclude)
+    
     def save(self, *args, **kwargs):
+        self.transaction_reference_normalized = normalize_reference(self.transaction_reference)
+        self.phone_digits = phone_digits(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = {'transaction_reference': 'transaction_reference_normalized', 'phone': 'phone_digits'}
+            kwargs['update_fields'] = {*update_fields, *(derived[f] for f in update_fields if f in derived)}
         if not self.order_id:
             from datetime import datetime
             year = datetime.now().year
@@ -62,6 +119,80 @@ class Order(models.Model):
     def __str__(self):
         return self.order_id
 
+class ReceiptFingerprint(models.Model):
+    """Content thumbnail and text lines of one distinct receipt file, compared with others by orders.fingerprints"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    thumbnail = models.BinaryField(blank=True, default=b'')
+    # Thumbnail height at the fixed thumbnail width: the content's aspect ratio
+    height = models.IntegerField(default=0, db_index=True)
+    # [left, right, top, bottom] per text line, in thousandths of the width; null before they were measured
+    lines = models.JSONField(null=True, blank=True)
+    # Null until `manage.py match_receipts` has compared it with its candidates
+    matched_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f'{self.sha256[:12]} ({self.height} rows)'
+
+class ReceiptBand(models.Model):
+    """One hashed window of a receipt's text-line layout: the index candidates are looked up in"""
+    receipt = models.ForeignKey(ReceiptFingerprint, on_delete=models.CASCADE, related_name='bands')
+    key = models.BigIntegerField(db_index=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['receipt', 'key'], name='receipt_band_unique'),
+        ]
+
+class ReceiptMatch(models.Model):
+    """Two receipt files showing the same receipt, stored once per direction"""
+    receipt = models.ForeignKey(ReceiptFingerprint, on_delete=models.CASCADE, related_name='matches')
+    other = models.ForeignKey(ReceiptFingerprint, on_delete=models.CASCADE, related_name='+')
+    difference = models.FloatField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['receipt', 'other'], name='receipt_match_unique'),
+        ]
+
+class ReplacedReceipt(models.Model):
+    """
+    A receipt file superseded by its recompressed copy (orders.receipts.recompress).
+    A checkout still in flight may have picked up the old name, so the file is only
+    deleted when the janitor purges this row, after moving such orders to the copy.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    replacement = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f'{self.name} -> {self.replacement}'
+
+
+def _delete_replaced_receipt(sender, instance, **kwargs):
+    Order.objects.filter(receipt_url=instance.name).update(receipt_url=instance.replacement)
+    name = instance.name
+    transaction.on_commit(lambda: default_storage.delete(name))
+
+post_delete.connect(_delete_replaced_receipt, sender=ReplacedReceipt, dispatch_uid='orders.delete_replaced_receipt')
+
+class OrderEvent(models.Model):
+    """Append-only change log behind the live admin order feed (orders.events); the id is the SSE event id"""
+    KIND_CHOICES = [
+        ('created', 'Created'),
+        ('status_changed', 'Status Changed'),
+        ('deleted', 'Deleted'),
+    ]
+    
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # The order's list-row fields at the time of the change, so the feed never joins
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.data.get('order_id')} {self.kind}"
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
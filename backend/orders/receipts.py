@@ -0,0 +1,180 @@
+"""
+Content-addressed payment receipt storage.
+
+Uploads are streamed to a temp file in chunks while being hashed
+(ReceiptUploadHandler), then stored as receipts/<aa>/<sha256>.<ext>, so a
+receipt submitted again, by the same or another checkout, is stored once and
+Order.receipt_sha256 indexes which orders share it. After commit, a background
+job fingerprints the receipt for `manage.py match_receipts` to compare with
+earlier ones (orders.fingerprints), then downscales oversized ones to
+RECEIPT_MAX_DIMENSION as JPEG; the janitor deletes the replaced original.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from io import BytesIO
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_DIR = 'receipts'
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ReceiptUploadHandler(TemporaryFileUploadHandler):
+    """Streams every upload to disk (never to worker memory) and hashes it on the way"""
+    
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+    
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+    
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.RECEIPT_WORKERS, thread_name_prefix='receipts')
+        return _pool
+
+
+def file_sha256(file):
+    """Hash set by ReceiptUploadHandler, or computed in chunks for files from elsewhere"""
+    digest = getattr(file, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+def receipt_name(digest, extension):
+    return f'{RECEIPT_DIR}/{digest[:2]}/{digest}.{extension}'
+
+
+def _extension(file):
+    from PIL import Image
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+    except Exception:
+        image_format = None
+    file.seek(0)
+    return EXTENSIONS.get(image_format) or os.path.splitext(file.name)[1].lstrip('.').lower() or 'bin'
+
+
+def _current_name(orders):
+    """The receipt file of one of `orders`, or the copy that replaced it"""
+    from .models import ReplacedReceipt
+    name = orders.values_list('receipt_url', flat=True).first()
+    if name:
+        # An order saved with the original while it was being recompressed
+        name = ReplacedReceipt.objects.filter(name=name).values_list('replacement', flat=True).first() or name
+    return name
+
+
+def store_receipt(file):
+    """Store an uploaded receipt once per content; returns (storage name, sha256)"""
+    from .models import Order
+    digest = file_sha256(file)
+    
+    # The index also knows where a recompressed copy of the same upload lives
+    existing = _current_name(Order.objects.filter(receipt_sha256=digest).exclude(receipt_url=''))
+    if existing and default_storage.exists(existing):
+        return existing, digest
+    
+    name = receipt_name(digest, _extension(file))
+    if not default_storage.exists(name):
+        name = default_storage.save(name, file)
+    return name, digest
+
+
+def recompress(digest):
+    """Downscale and re-encode the receipt stored for `digest`; returns the new name or None"""
+    from PIL import Image, ImageOps
+    from .models import Order, ReplacedReceipt
+    name = _current_name(Order.objects.filter(receipt_sha256=digest))
+    if not name or not default_storage.exists(name):
+        return None
+    
+    with default_storage.open(name, 'rb') as f:
+        data = f.read()
+    try:
+        image = Image.open(BytesIO(data))
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+    except Exception as e:
+        logger.warning(f'Receipt {name} is not a readable image: {str(e)}')
+        return None
+    
+    limit = settings.RECEIPT_MAX_DIMENSION
+    oversized = max(image.size) > limit
+    if not oversized and image_format == 'JPEG' and len(data) <= settings.RECEIPT_MAX_BYTES:
+        return None
+    
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    if image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        converted = image.convert('RGBA')
+        background.paste(converted, mask=converted.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.RECEIPT_JPEG_QUALITY, optimize=True)
+    if not oversized and len(buffer.getvalue()) >= len(data):
+        # e.g. a small PNG screenshot that JPEG would not shrink
+        return None
+    
+    # Still named after the uploaded bytes, so later uploads of the same file find it. An
+    # oversized JPEG already has that name: storage then picks a free one. store_receipt may
+    # have just handed the original to a checkout that hasn't committed, so the janitor
+    # deletes it later (ReplacedReceipt), moving any order still pointing at it first
+    new_name = default_storage.save(receipt_name(digest, 'jpg'), ContentFile(buffer.getvalue()))
+    with transaction.atomic():
+        Order.objects.filter(receipt_sha256=digest).update(receipt_url=new_name)
+        ReplacedReceipt.objects.update_or_create(name=name, defaults={'replacement': new_name})
+    logger.info(f'Recompressed receipt {digest[:12]}: {len(data)} -> {len(buffer.getvalue())} bytes')
+    return new_name
+
+
+def _process_in_worker(digest):
+    from .fingerprints import index_receipt
+    # Orders sharing a receipt each schedule a job; only one may rewrite the file
+    lock = f'receipt-process:{digest}'
+    if not cache.add(lock, True, timeout=300):
+        return
+    try:
+        # Fingerprint the upload as received, before it is downscaled
+        index_receipt(digest)
+        recompress(digest)
+    except Exception as e:
+        logger.error(f'Could not process receipt {digest[:12]}: {str(e)}')
+    finally:
+        cache.delete(lock)
+        connections.close_all()
+
+
+def schedule_processing(digest):
+    transaction.on_commit(lambda: _get_pool().submit(_process_in_worker, digest))
@@ -0,0 +1,175 @@
+"""
+Bank/wallet statement reconciliation.
+
+Pending orders are the build side of a hash join keyed on the normalized
+transaction reference; statement CSV rows are streamed through it one at a
+time, so memory is bounded by the number of pending orders, not by the
+statement. A row whose reference and amount match exactly one pending order
+is a clean match; everything ambiguous is reported as a conflict and left for
+an admin. Clean matches are verified in bulk with an AuditLog entry and a
+live-feed event (orders.events) each.
+"""
+from collections import defaultdict
+import csv
+from decimal import Decimal, InvalidOperation
+import io
+import re
+
+from django.db import transaction
+from django.utils import timezone
+
+from .events import record_status_changes
+from .models import AuditLog, Order
+from .utils import normalize_reference
+
+REFERENCE_COLUMNS = ['transaction_reference', 'reference', 'reference no', 'reference number', 'ref',
+                     'transaction id', 'transaction number', 'txn id', 'receipt no']
+AMOUNT_COLUMNS = ['amount', 'credit', 'credit amount', 'credited amount', 'paid amount']
+MAX_REPORTED_CONFLICTS = 1000
+APPLY_BATCH_SIZE = 500
+
+
+class StatementError(ValueError):
+    pass
+
+
+def parse_amount(value):
+    """'ETB 1,250.00' -> Decimal('1250.00'); None when unparseable"""
+    cleaned = re.sub(r'[^0-9.\-]', '', str(value or ''))
+    try:
+        return Decimal(cleaned).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+
+
+def _find_column(fieldnames, wanted, candidates):
+    normalized = {name.strip().lower().replace('_', ' '): name for name in fieldnames if name}
+    for candidate in ([wanted] if wanted else candidates):
+        name = normalized.get(candidate.strip().lower().replace('_', ' '))
+        if name:
+            return name
+    raise StatementError(f'Statement has no {wanted or candidates[0]} column (columns: {", ".join(fieldnames)})')
+
+
+def open_statement(file):
+    """Text stream over an uploaded or opened binary file, without reading it into memory"""
+    # Django's UploadedFile wraps the real file object
+    return io.TextIOWrapper(getattr(file, 'file', file), encoding='utf-8-sig', newline='')
+
+
+class Reconciliation:
+    def __init__(self, payment_method=None):
+        self.payment_method = payment_method
+        self.rows = 0
+        self.invalid_rows = 0
+        self.unmatched_rows = 0
+        self.matches = {}  # order pk -> statement row number
+        self.conflicts = []
+        self.conflict_count = 0
+        self.conflicted_orders = set()
+        self.verified = 0
+        self._build()
+    
+    def _build(self):
+        """Hash table: normalized reference -> [(pk, order_id, total_amount)] for pending orders"""
+        self.index = defaultdict(list)
+        self.order_count = 0
+        orders = Order.objects.filter(status='pending')
+        if self.payment_method:
+            orders = orders.filter(payment_method=self.payment_method)
+        for pk, order_id, key, total in orders.values_list(
+            'pk', 'order_id', 'transaction_reference_normalized', 'total_amount'
+        ).iterator(chunk_size=2000):
+            self.order_count += 1
+            if key:
+                self.index[key].append((pk, order_id, total.quantize(Decimal('0.01'))))
+    
+    def _conflict(self, row_number, reference, amount, reason, orders):
+        self.conflict_count += 1
+        self.conflicted_orders.update(pk for pk, _, _ in orders)
+        if len(self.conflicts) < MAX_REPORTED_CONFLICTS:
+            self.conflicts.append({
+                'row': row_number,
+                'reference': reference,
+                'amount': str(amount) if amount is not None else None,
+                'reason': reason,
+                'orders': [order_id for _, order_id, _ in orders],
+            })
+    
+    def feed(self, file, reference_column=None, amount_column=None):
+        """Probe the index with every row of one CSV statement"""
+        reader = csv.DictReader(open_statement(file))
+        if not reader.fieldnames:
+            raise StatementError('Statement is empty')
+        reference_column = _find_column(reader.fieldnames, reference_column, REFERENCE_COLUMNS)
+        amount_column = _find_column(reader.fieldnames, amount_column, AMOUNT_COLUMNS)
+        
+        # Row 1 is the header
+        for row_number, row in enumerate(reader, start=2):
+            self.rows += 1
+            reference = row.get(reference_column)
+            key = normalize_reference(reference)
+            amount = parse_amount(row.get(amount_column))
+            if not key or amount is None:
+                self.invalid_rows += 1
+                continue
+            
+            candidates = self.index.get(key)
+            if not candidates:
+                self.unmatched_rows += 1
+                continue
+            if len(candidates) > 1:
+                self._conflict(row_number, reference, amount, 'reference used by several orders', candidates)
+                continue
+            
+            pk, order_id, total = candidates[0]
+            if total != amount:
+                self._conflict(row_number, reference, amount, f'amount differs from order total {total}', candidates)
+            elif pk in self.matches:
+                self._conflict(row_number, reference, amount, f'also paid on row {self.matches[pk]}', candidates)
+            else:
+                self.matches[pk] = row_number
+    
+    @property
+    def clean_matches(self):
+        return [pk for pk in self.matches if pk not in self.conflicted_orders]
+    
+    def apply(self, admin=None, note='Matched against payment statement'):
+        """Verify clean matches that are still pending; returns how many were verified"""
+        pks = self.clean_matches
+        for start in range(0, len(pks), APPLY_BATCH_SIZE):
+            with transaction.atomic():
+                # Re-check under lock: an admin may have handled some orders meanwhile
+                pending = list(Order.objects.select_for_update().filter(
+                    pk__in=pks[start:start + APPLY_BATCH_SIZE], status='pending'
+                ).values_list('pk', flat=True))
+                Order.objects.filter(pk__in=pending).update(
+                    status='verified', admin_note=note, updated_at=timezone.now()
+                )
+                AuditLog.objects.bulk_create([
+                    AuditLog(
+                        order_id=pk,
+                        admin=admin,
+                        action='Order Verified',
+                        previous_status='pending',
+                        new_status='verified',
+                        note=f'{note} (row {self.matches[pk]})',
+                    )
+                    for pk in pending
+                ])
+                record_status_changes(pending, 'pending')
+            self.verified += len(pending)
+        return self.verified
+    
+    def report(self):
+        return {
+            'rows': self.rows,
+            'matched': len(self.clean_matches),
+            'verified': self.verified,
+            'conflicts': self.conflict_count,
+            'invalid_rows': self.invalid_rows,
+            'unmatched_rows': self.unmatched_rows,
+            'unmatched_orders': self.order_count - len(self.conflicted_orders | set(self.matches)),
+            'conflict_details': self.conflicts,
+            'conflict_details_truncated': self.conflict_count > len(self.conflicts),
+        }
@@ -1,7 +1,13 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from .models import Order, OrderItem, AuditLog
+from .fingerprints import similar_orders
+from .receipts import schedule_processing, store_receipt
+from .utils import normalize_reference
 from products.serializers import ProductSerializer
 
+REFERENCE_USED = 'This transaction reference has already been used for another order'
+
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
@@ -13,6 +19,8 @@ class OrderItemSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     coupon_code = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    receipt_duplicate_count = serializers.SerializerMethodField()
+    similar_receipts = serializers.SerializerMethodField()
     
     class Meta:
         model = Order
@@ -20,19 +28,64 @@ class OrderSerializer(serializers.ModelSerializer):
                   'delivery_method', 'selected_date', 'delivery_notes', 
                   'payment_method', 'transaction_reference', 'receipt_url',
                   'status', 'admin_note', 'subtotal', 'discount_amount', 
-                  'total_amount', 'coupon_code', 'items', 'created_at']
+                  'total_amount', 'coupon_code', 'items', 'receipt_sha256', 'receipt_duplicate_count',
+                  'similar_receipts', 'created_at']
         read_only_fields = ['order_id', 'status', 'admin_note', 'subtotal', 
                            'discount_amount', 'total_amount', 'created_at']
     
+    def get_receipt_duplicate_count(self, obj):
+        # Annotated on the admin order list/detail only
+        return getattr(obj, 'receipt_duplicate_count', None)
+    
+    def get_similar_receipts(self, obj):
+        # Only on the admin order detail: one indexed lookup per order
+        if not self.context.get('similar_receipts'):
+            return None
+        return similar_orders(obj)
+    
+    def validate_transaction_reference(self, value):
+        if not normalize_reference(value):
+            raise serializers.ValidationError('Enter the transaction reference from your payment receipt')
+        return value
+    
+    def validate(self, attrs):
+        reference = attrs.get('transaction_reference')
+        if reference and self.instance is None:
+            # One probe of the (reference, payment method) index; rejected orders free their reference
+            used = Order.objects.with_reference(reference, attrs.get('payment_method')).exclude(status='rejected')
+            if used.exists():
+                raise serializers.ValidationError(
+                    {'transaction_reference': REFERENCE_USED}
+                )
+        return attrs
+    
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         coupon_code = validated_data.pop('coupon_code', None)
         
-        order = Order.objects.create(**validated_data)
+        receipt = validated_data.get('receipt_url')
+        if receipt:
+            # Stored once per content under receipts/<aa>/<sha256>.<ext>
+            validated_data['receipt_url'], validated_data['receipt_sha256'] = store_receipt(receipt)
+        
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(**validated_data)
+        except IntegrityError:
+            # A concurrent checkout took the reference after validate() checked it
+            if not Order.objects.with_reference(
+                validated_data['transaction_reference'], validated_data.get('payment_method')
+            ).exclude(status='rejected').exists():
+                raise
+            raise serializers.ValidationError(
+                {'transaction_reference': REFERENCE_USED}
+            )
         
         for item_data in items_data:
             OrderItem.objects.create(order=order, **item_data)
         
+        if order.receipt_sha256:
+            schedule_processing(order.receipt_sha256)
         return order
 
 class OrderTrackingSerializer(serializers.ModelSerializer):
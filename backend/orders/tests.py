@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, timedelta
+from io import BytesIO
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from maintenance.retention import REGISTRY
+from . import events
+from .models import Order, OrderEvent
+from .receipts import recompress, store_receipt
+
+User = get_user_model()
+
+
+@override_settings(ORDER_FEED_POLL_SECONDS=0.05, ORDER_FEED_MAX_SECONDS=0.6, ORDER_FEED_HEARTBEAT_SECONDS=60)
+class OrderFeedTests(TestCase):
+    def setUp(self):
+        cache.delete(events.LATEST_EVENT_KEY)
+    
+    async def test_streams_share_one_poller(self):
+        polls = 0
+        latest_event_id = events.alatest_event_id
+        
+        async def counted():
+            nonlocal polls
+            polls += 1
+            return await latest_event_id()
+        
+        async def consume():
+            return [message async for message in events.stream(0) if message.startswith('id:')]
+        
+        async def publish():
+            await asyncio.sleep(0.2)
+            await OrderEvent.objects.acreate(kind='created', data={'id': 1})
+            # What the commit hook does for a write path
+            await cache.adelete(events.LATEST_EVENT_KEY)
+        
+        with patch.object(events, 'alatest_event_id', counted):
+            *received, _ = await asyncio.gather(*[consume() for _ in range(10)], publish())
+        
+        for messages in received:
+            self.assertEqual(len(messages), 1)
+            self.assertIn('event: created', messages[0])
+        # About one poll per interval for the process, not one per stream
+        self.assertLess(polls, 20)
+        self.assertEqual(events._watchers, {})
+
+
+class ReceiptRecompressTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = override_settings(MEDIA_ROOT=media, RECEIPT_MAX_DIMENSION=100)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create(phone='+251911000001', username='buyer')
+        buffer = BytesIO()
+        Image.new('RGB', (300, 200), (200, 30, 30)).save(buffer, 'PNG')
+        self.upload = buffer.getvalue()
+    
+    def store(self):
+        return store_receipt(ContentFile(self.upload, name='receipt.png'))
+    
+    def order(self, name, digest):
+        return Order.objects.create(
+            user=self.user, full_name='Buyer', phone='+251911000001', delivery_method='pickup',
+            selected_date=date.today(), payment_method='cbe', transaction_reference=f'FT{Order.objects.count()}',
+            receipt_url=name, receipt_sha256=digest, total_amount=100
+        )
+    
+    def test_original_outlives_checkouts_that_picked_it_up(self):
+        original, digest = self.store()
+        first = self.order(original, digest)
+        # A checkout stores the same file and commits only after the recompression
+        in_flight, _ = self.store()
+        self.assertEqual(in_flight, original)
+        
+        copy = recompress(digest)
+        self.assertTrue(copy.endswith('.jpg'))
+        first.refresh_from_db()
+        self.assertEqual(first.receipt_url.name, copy)
+        late = self.order(in_flight, digest)
+        self.assertTrue(default_storage.exists(original))
+        self.assertEqual(self.store()[0], copy)
+        self.assertIsNone(recompress(digest))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            REGISTRY['replaced_receipts'].purge(100, now=timezone.now() + timedelta(days=2))
+        late.refresh_from_db()
+        self.assertEqual(late.receipt_url.name, copy)
+        self.assertFalse(default_storage.exists(original))
+        self.assertTrue(default_storage.exists(copy))
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import OrderViewSet
+from .async_views import order_feed
 
 router = DefaultRouter()
 router.register(r'', OrderViewSet, basename='order')
 
 urlpatterns = [
+    path('events/', order_feed, name='order-events'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,12 @@
+import re
+
+def normalize_reference(value):
+    """Case- and punctuation-insensitive form: ' ft-23.ab9 ' and 'FT23AB9' agree"""
+    return re.sub(r'[^0-9A-Z]', '', str(value or '').upper())
+
+def phone_digits(value):
+    """National significant digits of an Ethiopian number: '0911 234 567' and '+251911234567' agree"""
+    digits = re.sub(r'\D', '', str(value or ''))
+    if digits.startswith('251'):
+        digits = digits[3:]
+    return digits.lstrip('0')
@@ -1,17 +1,25 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db.models import Q, F
-from django.db import transaction
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
 from .models import Order, AuditLog
-from .serializers import OrderSerializer, OrderTrackingSerializer, AuditLogSerializer
+from .serializers import OrderSerializer, OrderTrackingSerializer, AuditLogSerializer, REFERENCE_USED
+from .events import record as record_event
+from .receipts import ReceiptUploadHandler
+from .reconciliation import Reconciliation, StatementError
+from .search import OrderSearchFilter
+from .utils import normalize_reference
 from products.models import Product
+from wishlist.restock import record_restock
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [OrderSearchFilter, filters.OrderingFilter]
     search_fields = ['order_id', 'full_name', 'phone']
     ordering_fields = ['created_at', 'total_amount']
     
@@ -27,7 +35,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         # Admin sees all orders
         if user.is_staff:
-            queryset = Order.objects.all().order_by('-created_at')
+            queryset = Order.objects.with_receipt_duplicates().order_by('-created_at')
             
             # Apply filters
             status_filter = self.request.query_params.get('status', None)
@@ -43,17 +51,32 @@ class OrderViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(created_at__gte=date_from)
             if date_to:
                 queryset = queryset.filter(created_at__lte=date_to)
+            if self.request.query_params.get('shared_receipt') == 'true':
+                queryset = queryset.filter(receipt_duplicate_count__gt=0)
             
             return queryset
         
         # Regular users see only their orders
         return Order.objects.filter(user=user).order_by('-created_at')
     
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        record_event(instance, 'deleted', instance.status)
+        instance.delete()
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Admins reviewing an order see other orders with the same or a near-identical receipt
+        context['similar_receipts'] = self.action == 'retrieve' and self.request.user.is_staff
+        return context
+    
     @transaction.atomic
     def create(self, request):
         """
         Create order with stock validation and coupon support
         """
+        # Receipts are streamed to disk and hashed as they arrive
+        request._request.upload_handlers = [ReceiptUploadHandler(request._request)]
         items_data = request.data.get('items', [])
         coupon_code = request.data.get('coupon_code', '').strip()
         
@@ -92,8 +115,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         total_amount = subtotal - discount_amount
         
         # Create order
-        order_data = request.data.copy()
-        order_data.pop('coupon_code', None)
+        # Not request.data.copy(): that deep-copies the streamed receipt, whose temp file can't be copied
+        order_data = {key: value for key, value in request.data.items() if key != 'coupon_code'}
         order_data['subtotal'] = subtotal
         order_data['discount_amount'] = discount_amount
         order_data['total_amount'] = total_amount
@@ -115,6 +138,8 @@ class OrderViewSet(viewsets.ModelViewSet):
             if coupon:
                 coupon.use()
             
+            record_event(order, 'created')
+            
             return Response(
                 OrderSerializer(order).data,
                 status=status.HTTP_201_CREATED
@@ -131,13 +156,34 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = OrderTrackingSerializer(orders, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def by_reference(self, request):
+        """
+        Exact-match lookup of the orders paid with a transaction reference, in any spelling
+        Query: reference (required), payment_method (optional)
+        """
+        reference = request.query_params.get('reference', '')
+        if not normalize_reference(reference):
+            return Response({'error': 'reference is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        orders = Order.objects.with_reference(
+            reference, request.query_params.get('payment_method')
+        ).with_receipt_duplicates().order_by('-created_at')
+        serializer = self.get_serializer(orders, many=True)
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def verify(self, request, pk=None):
         order = self.get_object()
         previous_status = order.status
         order.status = 'verified'
         order.admin_note = request.data.get('note', '')
-        order.save()
+        try:
+            with transaction.atomic():
+                order.save()
+        except IntegrityError:
+            # A rejected order whose reference another order has since used
+            return Response({'error': REFERENCE_USED}, status=status.HTTP_400_BAD_REQUEST)
         
         AuditLog.objects.create(
             order=order,
@@ -147,6 +193,7 @@ class OrderViewSet(viewsets.ModelViewSet):
             new_status='verified',
             note=order.admin_note
         )
+        record_event(order, 'status_changed', previous_status)
         
         return Response({'message': 'Order verified successfully'})
     
@@ -162,9 +209,11 @@ class OrderViewSet(viewsets.ModelViewSet):
         with transaction.atomic():
             for item in order.items.all():
                 product = Product.objects.select_for_update().get(id=item.product.id)
+                previous_stock, previous_available = product.stock, product.is_available
                 product.stock += item.quantity
                 product.is_available = True
                 product.save()
+                record_restock(product, previous_stock, previous_available)
         
         AuditLog.objects.create(
             order=order,
@@ -174,9 +223,42 @@ class OrderViewSet(viewsets.ModelViewSet):
             new_status='rejected',
             note=order.admin_note
         )
+        record_event(order, 'status_changed', previous_status)
         
         return Response({'message': 'Order rejected and stock restored'})
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser], parser_classes=[MultiPartParser])
+    def reconcile(self, request):
+        """
+        Match pending orders against payment statement CSVs and verify the clean matches
+        Fields: statement (one or more CSV files), payment_method, reference_column,
+        amount_column (optional overrides), dry_run=true to only report
+        """
+        # Statements can be large: stream them to disk instead of memory
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+        statements = request.FILES.getlist('statement')
+        if not statements:
+            return Response({'error': 'No statement uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        payment_method = request.data.get('payment_method') or None
+        if payment_method and payment_method not in dict(Order.PAYMENT_CHOICES):
+            return Response({'error': 'Invalid payment method'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        reconciliation = Reconciliation(payment_method)
+        try:
+            for statement in statements:
+                reconciliation.feed(
+                    statement,
+                    reference_column=request.data.get('reference_column') or None,
+                    amount_column=request.data.get('amount_column') or None
+                )
+        except (StatementError, UnicodeDecodeError) as e:
+            return Response({'error': f'Could not read statement: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.data.get('dry_run') != 'true':
+            reconciliation.apply(admin=request.user)
+        return Response(reconciliation.report())
+    
     @action(detail=True, methods=['get'], permission_classes=[IsAdminUser])
     def audit_logs(self, request, pk=None):
         order = self.get_object()
@@ -0,0 +1,77 @@
+"""
+Async version of the public catalog list for the ASGI deployment.
+ProductViewSet stays the sync path (and the only one for admins and writes).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from config.throttling import AnonymousIPThrottle
+from .filters import filter_products, order_products, parse_ordering
+from .models import Product
+from .serializers import ProductSerializer
+
+# Like APIView.throttle_classes; shares the anon counters with the DRF views
+throttle_classes = [AnonymousIPThrottle]
+
+
+async def _throttled(request):
+    """A 429 response when any throttle refuses the request, else None"""
+    for throttle in [throttle_class() for throttle_class in throttle_classes]:
+        # Throttle counters may live in the database cache, so they are read off the event loop
+        if not await sync_to_async(throttle.allow_request)(request, None):
+            wait = throttle.wait()
+            response = JsonResponse(
+                {'detail': f'Request was throttled. Expected available in {int(wait)} seconds.'}, status=429
+            )
+            response['Retry-After'] = str(int(wait))
+            return response
+    return None
+
+
+def _page_url(request, page):
+    url = request.build_absolute_uri()
+    return remove_query_param(url, 'page') if page == 1 else replace_query_param(url, 'page', page)
+
+
+@require_GET
+async def product_list(request):
+    """
+    Available products with the same filters and ordering as ProductViewSet for
+    anonymous users, a page at a time ({count, next, previous, results})
+    """
+    throttled = await _throttled(request)
+    if throttled:
+        return throttled
+    
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', settings.PRODUCT_LIST_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+    page_size = min(max(page_size, 1), settings.PRODUCT_LIST_MAX_PAGE_SIZE)
+    
+    queryset = Product.objects.filter(is_available=True).select_related(
+        'category', 'rating_summary'
+    ).prefetch_related('sizes', 'images')
+    try:
+        queryset = filter_products(queryset, request.GET)
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+    queryset = order_products(queryset, parse_ordering(request.GET.get('ordering')))
+    
+    count = await queryset.acount()
+    if page < 1 or (page - 1) * page_size >= max(count, 1):
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+    
+    products = [product async for product in queryset[(page - 1) * page_size:page * page_size]]
+    # Everything the serializer touches is selected or prefetched, so this does no I/O
+    data = ProductSerializer(products, many=True, context={'request': request}).data
+    return JsonResponse({
+        'count': count,
+        'next': _page_url(request, page + 1) if page * page_size < count else None,
+        'previous': _page_url(request, page - 1) if page > 1 else None,
+        'results': data,
+    })
@@ -0,0 +1,91 @@
+"""
+Catalog filters shared by ProductViewSet and the async list (products.async_views),
+so both answer the same query string with the same products in the same order.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Coalesce, Round
+from rest_framework.exceptions import ValidationError
+
+ORDERING_FIELDS = ['price', 'created_at', 'stock', 'rating', 'review_count']
+DEFAULT_ORDERING = ['-created_at']
+# Rating aliases onto the denormalized rating summary
+RATING_FIELDS = {
+    'rating': 'rating_summary__average_rating',
+    'review_count': 'rating_summary__review_count',
+}
+
+
+def filter_products(queryset, params):
+    """
+    Apply the catalog query parameters (category, size, color, min_rating, min_reviews, search)
+    Raises ValidationError (a 400) for a min_rating that is not a number from 0 to 5
+    """
+    category = params.get('category', None)
+    if category:
+        queryset = queryset.filter(category__slug=category)
+    
+    # Filter by size
+    size = params.get('size', None)
+    if size:
+        queryset = queryset.filter(sizes__size=size.upper()).distinct()
+    
+    # Filter by color
+    color = params.get('color', None)
+    if color:
+        queryset = queryset.filter(color__icontains=color)
+    
+    # Filter by rating (e.g. min_rating=4 for "4★ and up")
+    min_rating = params.get('min_rating', None)
+    if min_rating:
+        try:
+            min_rating = float(min_rating)
+        except ValueError:
+            min_rating = None
+        # float() also accepts 'nan' and 'inf'
+        if min_rating is None or not math.isfinite(min_rating) or not 0 <= min_rating <= 5:
+            raise ValidationError({'min_rating': 'Enter a number from 0 to 5.'})
+        # Against the rating as displayed: ProductSerializer rounds to one decimal, unreviewed products show 0
+        queryset = queryset.alias(displayed_rating=Coalesce(
+            Round('rating_summary__average_rating', 1), Value(0.0), output_field=FloatField()
+        )).filter(displayed_rating__gte=min_rating)
+    
+    min_reviews = params.get('min_reviews', None)
+    if min_reviews:
+        try:
+            queryset = queryset.filter(rating_summary__review_count__gte=int(min_reviews))
+        except ValueError:
+            pass
+    
+    # Search by name
+    search = params.get('search', None)
+    if search:
+        queryset = queryset.filter(
+            Q(name__icontains=search) |
+            Q(description__icontains=search) |
+            Q(color__icontains=search)
+        )
+    
+    return queryset
+
+
+def parse_ordering(value):
+    """`ordering` query parameter -> valid fields, or DEFAULT_ORDERING"""
+    fields = [field.strip() for field in (value or '').split(',') if field.strip()]
+    fields = [field for field in fields if field.lstrip('-') in ORDERING_FIELDS]
+    return fields or DEFAULT_ORDERING
+
+
+def order_products(queryset, ordering):
+    """Order by `ordering`, keeping unreviewed products (no summary row) last for the rating aliases"""
+    expressions = []
+    for field in ordering:
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        if name in RATING_FIELDS:
+            expression = F(RATING_FIELDS[name])
+            expressions.append(expression.desc(nulls_last=True) if descending else expression.asc(nulls_last=True))
+        else:
+            expressions.append(field)
+    return queryset.order_by(*expressions)
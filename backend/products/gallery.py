@@ -0,0 +1,100 @@
+"""
+Bulk gallery uploads.
+
+Files are validated and written to storage on a thread pool (Pillow's decoder
+and the storage backend both release the GIL), then inserted with one
+bulk_create and one UPDATE for the primary flag instead of a save() per image.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Max, Value, When
+
+from . import images
+from .models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+
+def _store(uploaded):
+    """Validate one upload and save it; returns (stored_name, error)"""
+    from PIL import Image
+    if uploaded.size > settings.PRODUCT_IMAGE_MAX_BYTES:
+        return None, f'File is larger than {settings.PRODUCT_IMAGE_MAX_BYTES // (1024 * 1024)}MB'
+    try:
+        with Image.open(uploaded) as image:
+            image_format = image.format
+            image.verify()
+    except Exception:
+        return None, 'Upload a valid image. The file you uploaded was either not an image or a corrupted image.'
+    if image_format not in ALLOWED_FORMATS:
+        return None, f'Unsupported image format {image_format}'
+    
+    uploaded.seek(0)
+    field = ProductImage._meta.get_field('image')
+    try:
+        return field.storage.save(field.generate_filename(None, uploaded.name), uploaded), None
+    except Exception as e:
+        logger.error(f'Could not store gallery image {uploaded.name}: {str(e)}')
+        return None, 'Could not store file'
+
+
+def bulk_add_images(product, files, alt_texts=None, primary_index=None):
+    """
+    Add `files` to the product's gallery; returns one result dict per file, in order
+    primary_index picks the new primary image, otherwise the first upload becomes
+    primary only when the product has none
+    """
+    alt_texts = alt_texts or []
+    with ThreadPoolExecutor(max_workers=settings.GALLERY_UPLOAD_WORKERS) as pool:
+        stored = list(pool.map(_store, files))
+    
+    results = []
+    rows = []
+    for index, (uploaded, (name, error)) in enumerate(zip(files, stored)):
+        if error:
+            results.append({'file': uploaded.name, 'status': 'error', 'error': error})
+            continue
+        results.append({'file': uploaded.name, 'status': 'created'})
+        rows.append((index, ProductImage(
+            product=product,
+            image=name,
+            alt_text=(alt_texts[index] if index < len(alt_texts) else '')[:200],
+        )))
+    if not rows:
+        return results
+    
+    try:
+        with transaction.atomic():
+            next_order = (product.images.aggregate(last=Max('order'))['last'] or 0) + 1
+            for offset, (_, image) in enumerate(rows):
+                image.order = next_order + offset
+            created = ProductImage.objects.bulk_create([image for _, image in rows])
+            
+            primary = next((image for index, image in rows if index == primary_index), None)
+            if primary is None and not product.images.filter(is_primary=True).exists():
+                primary = created[0]
+            if primary is not None:
+                # One UPDATE instead of ProductImage.save()'s unset-then-save per row
+                product.images.update(is_primary=Case(
+                    When(pk=primary.pk, then=Value(True)), default=Value(False)
+                ))
+                primary.is_primary = True
+            
+            for image in created:
+                images.schedule(image)
+    except Exception:
+        # Nothing references the stored files if the insert failed
+        for _, image in rows:
+            image.image.storage.delete(image.image.name)
+        raise
+    
+    by_index = dict(rows)
+    for index, result in enumerate(results):
+        if index in by_index:
+            result['image'] = by_index[index]
+    return results
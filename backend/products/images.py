@@ -0,0 +1,195 @@
+"""
+Responsive derivatives for product photos.
+
+Each uploaded original gets thumb/card/detail renditions in WebP and JPEG,
+named after the SHA-256 of the original so the URLs never change for the same
+bytes and can be cached forever. Encoding runs on a small thread pool after the
+transaction that set a new image commits (DerivativesMixin), not on every save.
+
+The queue itself is in memory, but what it owes is in the database: a row
+whose derivatives['source'] isn't its current image is pending, and one whose
+build failed records {'source', 'error'}. `manage.py build_image_derivatives`
+picks up pending rows (after a restart, say) and, with --retry-failed, failed ones.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from io import BytesIO
+import logging
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# name -> maximum width in pixels
+SIZES = {
+    'thumb': 200,
+    'card': 480,
+    'detail': 1200,
+}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+DERIVATIVE_DIR = 'products/derivatives'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                thread_name_prefix='image-derivatives'
+            )
+        return _pool
+
+
+def needs_derivatives(instance):
+    """The image has neither derivatives nor a recorded failure"""
+    return bool(instance.image) and instance.derivatives.get('source') != instance.image.name
+
+
+def build_failed(instance):
+    return bool(instance.image) and instance.derivatives.get('source') == instance.image.name and \
+        'error' in instance.derivatives
+
+
+def _image_name(instance):
+    # Read without the descriptor so a deferred image isn't loaded
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value)
+
+
+class DerivativesMixin:
+    """
+    For models with `image` and `derivatives`: queue derivatives after a save
+    that set a new image, not after every save (e.g. stock updates at checkout)
+    """
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_image = _image_name(instance)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # A deferred image that was never assigned can't have changed
+        changed = 'image' in self.__dict__ and _image_name(self) != getattr(self, '_stored_image', None)
+        super().save(*args, **kwargs)
+        self._stored_image = _image_name(self)
+        if changed and needs_derivatives(self):
+            schedule(self)
+
+
+def _render(image, width, options):
+    from PIL import Image
+    rendition = image
+    if image.width > width:
+        height = round(image.height * width / image.width)
+        rendition = image.resize((width, height), Image.LANCZOS)
+    if options['format'] == 'JPEG' and rendition.mode != 'RGB':
+        # JPEG has no alpha channel: flatten onto white rather than black
+        background = Image.new('RGB', rendition.size, (255, 255, 255))
+        converted = rendition.convert('RGBA')
+        background.paste(converted, mask=converted.getchannel('A'))
+        rendition = background
+    buffer = BytesIO()
+    rendition.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def build_derivatives(field_file):
+    """Encode every size/format for one original; returns the map stored on the model"""
+    from PIL import Image, ImageOps
+    storage = field_file.storage
+    with field_file.open('rb') as f:
+        original = f.read()
+    digest = hashlib.sha256(original).hexdigest()[:16]
+    
+    image = ImageOps.exif_transpose(Image.open(BytesIO(original)))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    
+    sizes = {}
+    seen_widths = set()
+    for size_name, max_width in SIZES.items():
+        width = min(max_width, image.width)
+        # Never upscale: sizes beyond the original collapse into the first one that reaches it
+        if width in seen_widths:
+            continue
+        seen_widths.add(width)
+        
+        entry = {'width': width}
+        for extension, options in FORMATS.items():
+            name = f'{DERIVATIVE_DIR}/{digest}-{size_name}.{extension}'
+            # Content-addressed: the same bytes always produce the same file
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(_render(image, width, options)))
+            entry[extension] = name
+        sizes[size_name] = entry
+    
+    return {'source': field_file.name, 'hash': digest, 'sizes': sizes}
+
+
+def process(model_label, pk, force=False):
+    """Build and store derivatives for one row; safe to run twice"""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not instance.image:
+        return False
+    if not force and not needs_derivatives(instance):
+        return False
+    
+    source = instance.image.name
+    try:
+        derivatives = build_derivatives(instance.image)
+    except Exception as e:
+        logger.error(f'Could not build derivatives for {model_label} {pk} ({source}): {str(e)}')
+        # Recorded so later saves don't retry it; build_image_derivatives --retry-failed does
+        derivatives = {'source': source, 'error': str(e)[:500]}
+    
+    # update() rather than save(): skips the save() hook and only writes if the image is unchanged
+    model.objects.filter(pk=pk, image=source).update(derivatives=derivatives)
+    return 'error' not in derivatives
+
+
+def _process_in_worker(model_label, pk):
+    try:
+        process(model_label, pk)
+    finally:
+        # Pool threads get their own connections; don't leave them open between jobs
+        connections.close_all()
+
+
+def schedule(instance):
+    """Queue derivative generation once the current transaction commits"""
+    model_label = instance._meta.label
+    pk = instance.pk
+    transaction.on_commit(lambda: _get_pool().submit(_process_in_worker, model_label, pk))
+
+
+def srcset(derivatives, request=None, storage=None):
+    """{'webp': 'url 200w, url 480w', 'jpeg': ...} or None until derivatives exist"""
+    sizes = derivatives.get('sizes') if derivatives else None
+    if not sizes:
+        return None
+    if storage is None:
+        from django.core.files.storage import default_storage as storage
+    
+    result = {}
+    for extension in FORMATS:
+        candidates = []
+        for entry in sorted(sizes.values(), key=lambda entry: entry['width']):
+            url = storage.url(entry[extension])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            candidates.append(f"{url} {entry['width']}w")
+        result[extension] = ', '.join(candidates)
+    return result
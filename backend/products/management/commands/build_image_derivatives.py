@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from products import images
+from products.models import Product, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Build responsive image derivatives for existing product photos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Images encoded in parallel')
+        parser.add_argument('--force', action='store_true', help='Rebuild even when derivatives are current')
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry images whose build failed')
+    
+    def handle(self, *args, **options):
+        jobs = []
+        for model in (Product, ProductImage):
+            for instance in model.objects.exclude(image='').only('pk', 'image', 'derivatives').iterator():
+                retry = options['retry_failed'] and images.build_failed(instance)
+                if options['force'] or retry or images.needs_derivatives(instance):
+                    jobs.append((model._meta.label, instance.pk, options['force'] or retry))
+        
+        if not jobs:
+            self.stdout.write('All product images already have derivatives')
+            return
+        
+        def run(job):
+            try:
+                model_label, pk, force = job
+                return images.process(model_label, pk, force=force)
+            finally:
+                connections.close_all()
+        
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            built = sum(pool.map(run, jobs))
+        
+        failed = len(jobs) - built
+        self.stdout.write(self.style.SUCCESS(f'Built derivatives for {built} images'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} images skipped or failed, see the log'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_productimage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
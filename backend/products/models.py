@@ -1,4 +1,5 @@
 from django.db import models
+from . import images
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -11,7 +12,7 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class Product(models.Model):
+class Product(images.DerivativesMixin, models.Model):
     SIZE_CHOICES = [
         ('S', 'Small'),
         ('M', 'Medium'),
@@ -24,6 +25,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     image = models.ImageField(upload_to='products/')  # Keep for backward compatibility
+    # Responsive renditions of `image`, filled in by products.images after upload
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
     stock = models.IntegerField(default=0)
     is_available = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
@@ -52,9 +55,10 @@ class ProductSize(models.Model):
     def __str__(self):
         return f'{self.product.name} - {self.get_size_display()}'
 
-class ProductImage(models.Model):
+class ProductImage(images.DerivativesMixin, models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/gallery/')
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
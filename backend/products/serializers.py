@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Product, Category, ProductSize, ProductImage
+from .images import srcset
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,17 +15,45 @@ class ProductSizeSerializer(serializers.ModelSerializer):
         fields = ['id', 'size', 'size_display', 'stock']
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text', 'is_primary', 'order']
+        fields = ['id', 'image', 'srcset', 'alt_text', 'is_primary', 'order']
+    
+    def get_srcset(self, obj):
+        return srcset(obj.derivatives, self.context.get('request'), obj.image.storage)
 
 class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     sizes = ProductSizeSerializer(many=True, read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
+    average_rating = serializers.SerializerMethodField()
+    review_count = serializers.SerializerMethodField()
+    is_wishlisted = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = ['id', 'name', 'slug', 'description', 'price', 'category', 
-                  'image', 'images', 'stock', 'is_available', 'is_featured', 'color', 
-                  'sizes', 'created_at']
+                  'image', 'srcset', 'images', 'stock', 'is_available', 'is_featured', 'color', 
+                  'sizes', 'average_rating', 'review_count', 'is_wishlisted', 'created_at']
+    
+    def get_average_rating(self, obj):
+        # rating_summary is select_related by the catalog views; missing means no reviews
+        summary = getattr(obj, 'rating_summary', None)
+        return round(summary.average_rating, 1) if summary else 0
+    
+    def get_review_count(self, obj):
+        summary = getattr(obj, 'rating_summary', None)
+        return summary.review_count if summary else 0
+    
+    def get_is_wishlisted(self, obj):
+        # Annotated on catalog views for authenticated users; every product nested in a wishlist row is
+        if self.context.get('wishlisted'):
+            return True
+        return getattr(obj, 'is_wishlisted', False)
+    
+    def get_srcset(self, obj):
+        # None until the background worker has built the derivatives; clients fall back to `image`
+        return srcset(obj.derivatives, self.context.get('request'), obj.image.storage)
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from products.models import Category, Product
+from reviews.models import Review
+
+User = get_user_model()
+
+
+class MinRatingFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Scrunchies', slug='scrunchies')
+        self.products = {
+            slug: Product.objects.create(
+                name=slug, slug=slug, description='', price=100, category=category, image=f'products/{slug}.jpg'
+            )
+            for slug in ['unrated', 'average', 'rounds-up']
+        }
+        users = [User.objects.create(phone=f'+25191100000{i}', username=f'user{i}') for i in range(20)]
+        # 3.5, and 79 / 20 = 3.95, shown as 4.0
+        for user, rating in zip(users, [4, 3]):
+            Review.objects.create(user=user, product=self.products['average'], rating=rating, comment='')
+        for user, rating in zip(users, [4] * 19 + [3]):
+            Review.objects.create(user=user, product=self.products['rounds-up'], rating=rating, comment='')
+    
+    def slugs(self, url, min_rating):
+        response = self.client.get(url, {'min_rating': min_rating})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        # The async list is paginated, ProductViewSet is not
+        return {product['slug'] for product in (data['results'] if isinstance(data, dict) else data)}
+    
+    def test_compares_the_displayed_rating(self):
+        for url in ['/api/products/', '/api/products/async/']:
+            self.assertEqual(self.slugs(url, '4'), {'rounds-up'})
+            self.assertEqual(self.slugs(url, '3.5'), {'average', 'rounds-up'})
+            self.assertEqual(self.slugs(url, '0'), set(self.products))
+    
+    def test_rejects_invalid_values(self):
+        for url in ['/api/products/', '/api/products/async/']:
+            for value in ['nan', 'inf', '-1', '5.5', 'four']:
+                response = self.client.get(url, {'min_rating': value})
+                self.assertEqual(response.status_code, 400, (url, value))
+                self.assertIn('min_rating', response.json())
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ProductViewSet, CategoryViewSet
+from .async_views import product_list
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'', ProductViewSet, basename='product')
 
 urlpatterns = [
+    path('async/', product_list, name='product-list-async'),
     path('', include(router.urls)),
 ]
@@ -1,11 +1,18 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Exists, OuterRef
 from .models import Product, Category, ProductSize
-from .serializers import ProductSerializer, CategorySerializer
+from wishlist.models import Wishlist
+from wishlist.restock import record_restock
+from .serializers import ProductSerializer, CategorySerializer, ProductImageSerializer
+from .filters import DEFAULT_ORDERING, ORDERING_FIELDS, filter_products, order_products
+from .gallery import bulk_add_images
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
@@ -17,14 +24,26 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAdminUser()]
 
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that maps rating aliases onto the denormalized rating summary,
+    keeping unreviewed products (no summary row) at the end
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        return order_products(queryset, ordering)
+
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     lookup_field = 'slug'
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.SearchFilter, ProductOrderingFilter]
     search_fields = ['name', 'description', 'color']
-    ordering_fields = ['price', 'created_at', 'stock']
-    ordering = ['-created_at']
+    ordering_fields = ORDERING_FIELDS
+    ordering = DEFAULT_ORDERING
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'featured']:
@@ -39,38 +58,60 @@ class ProductViewSet(viewsets.ModelViewSet):
             # Customers see only available products
             queryset = Product.objects.filter(is_available=True)
         
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__slug=category)
+        queryset = queryset.select_related('category', 'rating_summary').prefetch_related('sizes', 'images')
         
-        # Filter by size
-        size = self.request.query_params.get('size', None)
-        if size:
-            queryset = queryset.filter(sizes__size=size.upper()).distinct()
+        # Heart icons for authenticated users in one EXISTS subquery
+        if self.request.user.is_authenticated:
+            queryset = queryset.annotate(is_wishlisted=Exists(
+                Wishlist.objects.filter(user=self.request.user, product=OuterRef('pk'))
+            ))
         
-        # Filter by color
-        color = self.request.query_params.get('color', None)
-        if color:
-            queryset = queryset.filter(color__icontains=color)
-        
-        # Search by name
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(color__icontains=search)
-            )
-        
-        return queryset
+        return filter_products(queryset, self.request.query_params)
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured products"""
-        featured_products = Product.objects.filter(is_featured=True, is_available=True)
+        featured_products = Product.objects.filter(
+            is_featured=True, is_available=True
+        ).select_related('category', 'rating_summary')
         serializer = self.get_serializer(featured_products, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['post'], url_path='images/bulk', parser_classes=[MultiPartParser])
+    def bulk_images(self, request, slug=None):
+        """
+        Add many gallery images in one multipart request
+        Fields: images (repeated files), alt_text (repeated, optional, by position), primary (index, optional)
+        """
+        # Stream every file to a temp file instead of holding the whole batch in memory
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+        product = self.get_object()
+        files = request.FILES.getlist('images')
+        if not files:
+            return Response({'error': 'No images uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(files) > settings.GALLERY_UPLOAD_MAX_FILES:
+            return Response(
+                {'error': f'At most {settings.GALLERY_UPLOAD_MAX_FILES} images per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        primary = request.data.get('primary')
+        try:
+            primary = int(primary) if primary not in (None, '') else None
+        except ValueError:
+            return Response({'error': 'primary must be an index'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = bulk_add_images(product, files, request.data.getlist('alt_text'), primary)
+        for result in results:
+            if 'image' in result:
+                result['image'] = ProductImageSerializer(result['image'], context={'request': request}).data
+        
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response(
+            {'created': created, 'failed': len(results) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+    
     @transaction.atomic
     def update(self, request, *args, **kwargs):
         """
@@ -78,6 +119,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         """
         instance = self.get_object()
         old_stock = instance.stock
+        old_available = instance.is_available
         
         serializer = self.get_serializer(instance, data=request.data, partial=kwargs.get('partial', False))
         if serializer.is_valid():
@@ -91,6 +133,9 @@ class ProductViewSet(viewsets.ModelViewSet):
                 product.is_available = True
                 product.save()
             
+            # Queue back-in-stock notifications for wishlist holders
+            record_restock(product, old_stock, old_available)
+            
             return Response(serializer.data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
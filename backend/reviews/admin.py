@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Review
+from .models import Review, ProductRatingSummary
 
 
 @admin.register(Review)
@@ -9,3 +9,10 @@ class ReviewAdmin(admin.ModelAdmin):
     search_fields = ['user__phone', 'product__name', 'comment']
     raw_id_fields = ['user', 'product', 'order_item']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(ProductRatingSummary)
+class ProductRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ['product', 'review_count', 'average_rating', 'updated_at']
+    raw_id_fields = ['product']
+    readonly_fields = ['review_count', 'rating_sum', 'star_1', 'star_2', 'star_3', 'star_4', 'star_5', 'updated_at']
@@ -0,0 +1,25 @@
+"""
+Async versions of read-heavy review endpoints for the ASGI deployment.
+The DRF views in views.py remain the sync path.
+"""
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from .models import ProductRatingSummary
+
+
+@require_GET
+async def product_stats(request):
+    """Get review statistics for a product"""
+    product_id = request.GET.get('product_id')
+    if not product_id:
+        return JsonResponse({'error': 'product_id is required'}, status=400)
+    
+    summary = await ProductRatingSummary.objects.filter(product_id=product_id).afirst()
+    if summary is None:
+        summary = ProductRatingSummary(product_id=product_id)
+    
+    return JsonResponse({
+        'average_rating': round(summary.average_rating, 1),
+        'total_reviews': summary.review_count,
+        'distribution': summary.distribution
+    })
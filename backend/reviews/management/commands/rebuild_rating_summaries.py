@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from reviews.models import ProductRatingSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized product rating summaries from the Review table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='*', type=int, help='Only rebuild these products')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report summaries that disagree with the Review table; fail if any do')
+        parser.add_argument('--drifted', action='store_true', help='Only rebuild summaries that disagree')
+    
+    def handle(self, *args, **options):
+        product_ids = options['product_ids'] or None
+        if options['check'] or options['drifted']:
+            product_ids = ProductRatingSummary.drifted(product_ids)
+            if options['check']:
+                if product_ids:
+                    raise CommandError(f'{len(product_ids)} rating summaries have drifted: products {product_ids}')
+                self.stdout.write(self.style.SUCCESS('Rating summaries match the reviews'))
+                return
+            if not product_ids:
+                self.stdout.write(self.style.SUCCESS('No rating summaries have drifted'))
+                return
+        count = ProductRatingSummary.rebuild(product_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rating summaries'))
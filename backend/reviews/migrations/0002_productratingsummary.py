@@ -0,0 +1,62 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    Review = apps.get_model("reviews", "Review")
+    ProductRatingSummary = apps.get_model("reviews", "ProductRatingSummary")
+    rows = (
+        Review.objects.values("product_id")
+        .annotate(
+            review_count=models.Count("id"),
+            rating_sum=models.Sum("rating"),
+            **{
+                f"star_{star}": models.Count("id", filter=models.Q(rating=star))
+                for star in range(1, 6)
+            },
+        )
+        .order_by("product_id")
+    )
+    ProductRatingSummary.objects.bulk_create(
+        [ProductRatingSummary(**row) for row in rows], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_productimage"),
+        ("reviews", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRatingSummary",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="rating_summary",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("review_count", models.IntegerField(default=0)),
+                ("rating_sum", models.IntegerField(default=0)),
+                ("star_1", models.IntegerField(default=0)),
+                ("star_2", models.IntegerField(default=0)),
+                ("star_3", models.IntegerField(default=0)),
+                ("star_4", models.IntegerField(default=0)),
+                ("star_5", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Product rating summaries",
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:14
+
+from django.db import migrations, models
+
+
+def backfill_average_rating(apps, schema_editor):
+    ProductRatingSummary = apps.get_model("reviews", "ProductRatingSummary")
+    ProductRatingSummary.objects.filter(review_count__gt=0).update(
+        average_rating=models.ExpressionWrapper(
+            models.F("rating_sum") * 1.0 / models.F("review_count"),
+            output_field=models.FloatField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_productimage"),
+        ("reviews", "0002_productratingsummary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productratingsummary",
+            name="average_rating",
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddIndex(
+            model_name="productratingsummary",
+            index=models.Index(
+                fields=["review_count"], name="rating_summary_count_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_average_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_order_coupon_order_discount_amount_order_subtotal"),
+        ("products", "0003_productimage"),
+        ("reviews", "0003_productratingsummary_average_rating"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "-created_at"], name="review_product_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "rating"], name="review_product_rating_idx"
+            ),
+        ),
+    ]
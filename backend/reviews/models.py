@@ -1,10 +1,26 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from products.models import Product
 from orders.models import OrderItem
 
 
+class ReviewQuerySet(models.QuerySet):
+    def with_verified_purchase(self):
+        """Annotate the verified purchase badge in SQL instead of walking order_item.order"""
+        return self.annotate(
+            verified_purchase=models.Case(
+                models.When(order_item__order__status='verified', then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            )
+        )
+    
+    def for_listing(self):
+        return self.select_related('user').with_verified_purchase()
+
+
 class Review(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -14,9 +30,15 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ReviewQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['user', 'product']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='review_product_created_idx'),
+            models.Index(fields=['product', 'rating'], name='review_product_rating_idx'),
+        ]
     
     def __str__(self):
         return f'{self.user.phone} - {self.product.name} ({self.rating}★)'
@@ -24,4 +46,138 @@ class Review(models.Model):
     @property
     def is_verified_purchase(self):
         """Check if this review is from a verified purchase"""
+        # Prefer the SQL annotation from ReviewQuerySet.with_verified_purchase
+        if 'verified_purchase' in self.__dict__:
+            return self.verified_purchase
         return self.order_item is not None and self.order_item.order.status == 'verified'
+    
+    def save(self, *args, **kwargs):
+        # One transaction with the rating summary update (the post_save receiver below)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ProductRatingSummary(models.Model):
+    """Denormalized per-product rating counters, updated incrementally by the Review signal receivers"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary')
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    star_1 = models.IntegerField(default=0)
+    star_2 = models.IntegerField(default=0)
+    star_3 = models.IntegerField(default=0)
+    star_4 = models.IntegerField(default=0)
+    star_5 = models.IntegerField(default=0)
+    average_rating = models.FloatField(default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Product rating summaries'
+        indexes = [
+            models.Index(fields=['review_count'], name='rating_summary_count_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.product_id} - {self.average_rating:.1f}★ ({self.review_count})'
+    
+    @property
+    def distribution(self):
+        return {str(star): getattr(self, f'star_{star}') for star in range(5, 0, -1)}
+    
+    @staticmethod
+    def average_expression():
+        """SQL expression recomputing average_rating from the stored counters"""
+        return models.Case(
+            models.When(
+                review_count__gt=0,
+                then=models.ExpressionWrapper(
+                    models.F('rating_sum') * 1.0 / models.F('review_count'),
+                    output_field=models.FloatField(),
+                ),
+            ),
+            default=models.Value(0.0),
+            output_field=models.FloatField(),
+        )
+    
+    @classmethod
+    def _apply(cls, product_id, rating, delta):
+        # Only adding creates a summary: when a product is deleted, its summary may go before its reviews
+        if delta > 0:
+            cls.objects.get_or_create(product_id=product_id)
+        summary = cls.objects.filter(product_id=product_id)
+        summary.update(**{
+            'review_count': models.F('review_count') + delta,
+            'rating_sum': models.F('rating_sum') + delta * rating,
+            f'star_{rating}': models.F(f'star_{rating}') + delta,
+        })
+        summary.update(average_rating=cls.average_expression())
+    
+    @classmethod
+    def add_rating(cls, product_id, rating):
+        cls._apply(product_id, rating, 1)
+    
+    @classmethod
+    def remove_rating(cls, product_id, rating):
+        cls._apply(product_id, rating, -1)
+    
+    @classmethod
+    def recount(cls, product_ids=None):
+        """Unsaved summaries counted from the Review table, for products with reviews"""
+        reviews = Review.objects.all()
+        if product_ids is not None:
+            reviews = reviews.filter(product_id__in=product_ids)
+        rows = reviews.values('product_id').annotate(
+            review_count=models.Count('id'),
+            rating_sum=models.Sum('rating'),
+            **{f'star_{star}': models.Count('id', filter=models.Q(rating=star)) for star in range(1, 6)}
+        ).order_by('product_id')
+        return [cls(average_rating=row['rating_sum'] / row['review_count'], **row) for row in rows]
+    
+    @classmethod
+    def drifted(cls, product_ids=None):
+        """Ids of products whose stored summary disagrees with the Review table"""
+        fields = ['review_count', 'rating_sum', *(f'star_{star}' for star in range(1, 6))]
+        expected = {summary.product_id: [getattr(summary, f) for f in fields] for summary in cls.recount(product_ids)}
+        stored = cls.objects.all()
+        if product_ids is not None:
+            stored = stored.filter(product_id__in=product_ids)
+        stored = {row[0]: list(row[1:]) for row in stored.values_list('product_id', *fields)}
+        # A summary left at zero for a product without reviews is fine
+        empty = [0] * len(fields)
+        return sorted(
+            product_id for product_id in expected.keys() | stored.keys()
+            if expected.get(product_id, empty) != stored.get(product_id, empty)
+        )
+    
+    @classmethod
+    def rebuild(cls, product_ids=None):
+        """Recompute summaries from the Review table; returns the number of summaries written"""
+        summaries = cls.recount(product_ids)
+        with transaction.atomic():
+            stale = cls.objects.all()
+            if product_ids is not None:
+                stale = stale.filter(product_id__in=product_ids)
+            stale.delete()
+            cls.objects.bulk_create(summaries, batch_size=500)
+        return len(summaries)
+
+
+# Receivers rather than Review.save/delete, so queryset deletes (the admin's delete action,
+# CASCADE from a User or Product) keep the summaries in step too. QuerySet.update() still
+# bypasses them: `manage.py rebuild_rating_summaries` repairs any drift.
+def _remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+
+def _count_saved_rating(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if previous:
+        ProductRatingSummary.remove_rating(*previous)
+    ProductRatingSummary.add_rating(instance.product_id, instance.rating)
+
+def _uncount_deleted_rating(sender, instance, **kwargs):
+    ProductRatingSummary.remove_rating(instance.product_id, instance.rating)
+
+pre_save.connect(_remember_previous_rating, sender=Review, dispatch_uid='reviews.remember_previous_rating')
+post_save.connect(_count_saved_rating, sender=Review, dispatch_uid='reviews.count_saved_rating')
+post_delete.connect(_uncount_deleted_rating, sender=Review, dispatch_uid='reviews.uncount_deleted_rating')
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.db.models import Exists, OuterRef, Subquery
 from .models import Review
 from orders.models import OrderItem
+from products.models import Product
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -13,25 +15,37 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def validate(self, data):
+        # Purchase checks only apply when creating a review, so it stays on the product they were made for
+        if self.instance is not None:
+            if 'product' in data and data['product'].pk != self.instance.product_id:
+                raise serializers.ValidationError({'product': 'A review cannot be moved to another product.'})
+            return data
+        
         user = self.context['request'].user
         product = data.get('product')
         
+        # Check for an existing review and a verified purchase in one query
+        checks = Product.objects.filter(pk=product.pk).values(
+            already_reviewed=Exists(Review.objects.filter(user=user, product=OuterRef('pk'))),
+            verified_order_item_id=Subquery(
+                OrderItem.objects.filter(
+                    order__user=user,
+                    order__status='verified',
+                    product=OuterRef('pk')
+                ).values('id')[:1]
+            ),
+        ).first()
+        
         # Check if user already reviewed this product
-        if Review.objects.filter(user=user, product=product).exists():
+        if checks['already_reviewed']:
             raise serializers.ValidationError('You have already reviewed this product.')
         
         # Check if user has a verified order with this product
-        verified_order_item = OrderItem.objects.filter(
-            order__user=user,
-            order__status='verified',
-            product=product
-        ).first()
-        
-        if not verified_order_item:
+        if not checks['verified_order_item_id']:
             raise serializers.ValidationError('You can only review products you have purchased.')
         
         # Store the order_item for verified purchase badge
-        data['order_item'] = verified_order_item
+        data['order_item_id'] = checks['verified_order_item_id']
         
         return data
     
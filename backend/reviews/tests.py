@@ -0,0 +1,128 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from .models import ProductRatingSummary, Review
+
+User = get_user_model()
+
+
+class ReviewTestCase(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Scrunchies', slug='scrunchies')
+        self.product = Product.objects.create(
+            name='Silk', slug='silk', description='', price=100, category=category, image='products/silk.jpg'
+        )
+        self.other_product = Product.objects.create(
+            name='Velvet', slug='velvet', description='', price=100, category=category, image='products/velvet.jpg'
+        )
+        self.users = [User.objects.create(phone=f'+25191100000{i}', username=f'user{i}') for i in range(3)]
+    
+    def review(self, user, rating, product=None):
+        return Review.objects.create(user=user, product=product or self.product, rating=rating, comment='')
+    
+    def assertSummary(self, product, review_count, average, **stars):
+        summary = ProductRatingSummary.objects.get(product=product)
+        self.assertEqual(summary.review_count, review_count)
+        self.assertAlmostEqual(summary.average_rating, average)
+        for star in range(1, 6):
+            self.assertEqual(getattr(summary, f'star_{star}'), stars.get(f'star_{star}', 0))
+
+
+class RatingSummaryTests(ReviewTestCase):
+    def test_create_update_and_delete(self):
+        first = self.review(self.users[0], 5)
+        self.review(self.users[1], 3)
+        self.assertSummary(self.product, 2, 4.0, star_5=1, star_3=1)
+        
+        first.rating = 4
+        first.save()
+        self.assertSummary(self.product, 2, 3.5, star_4=1, star_3=1)
+        
+        first.product = self.other_product
+        first.save()
+        self.assertSummary(self.product, 1, 3.0, star_3=1)
+        self.assertSummary(self.other_product, 1, 4.0, star_4=1)
+        
+        first.delete()
+        self.assertSummary(self.other_product, 0, 0.0)
+    
+    def test_queryset_delete(self):
+        for user, rating in zip(self.users, [5, 4, 1]):
+            self.review(user, rating)
+        Review.objects.filter(rating__gte=4).delete()
+        self.assertSummary(self.product, 1, 1.0, star_1=1)
+    
+    def test_user_delete_cascades(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 2)
+        self.users[0].delete()
+        self.assertSummary(self.product, 1, 2.0, star_2=1)
+    
+    def test_product_delete_cascades(self):
+        self.review(self.users[0], 5)
+        product_id = self.product.pk
+        self.product.delete()
+        self.assertFalse(ProductRatingSummary.objects.filter(product_id=product_id).exists())
+        # Foreign keys are checked at commit, which TestCase never reaches
+        connection.check_constraints()
+    
+    def test_rebuild_repairs_drift(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 3, product=self.other_product)
+        # update() bypasses the receivers
+        Review.objects.filter(product=self.product).update(rating=1)
+        self.assertEqual(ProductRatingSummary.drifted(), [self.product.pk])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rating_summaries', check=True, stdout=StringIO())
+        
+        out = StringIO()
+        call_command('rebuild_rating_summaries', drifted=True, stdout=out)
+        self.assertIn('Rebuilt 1 rating summaries', out.getvalue())
+        self.assertSummary(self.product, 1, 1.0, star_1=1)
+        self.assertEqual(ProductRatingSummary.drifted(), [])
+
+
+class ReviewAPITests(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.author, self.stranger = self.users[:2]
+        for product in (self.product, self.other_product):
+            order = Order.objects.create(
+                user=self.author, full_name='Author', phone=self.author.phone, receipt_url='receipts/r.jpg',
+                total_amount=100, selected_date=timezone.now().date(), status='verified'
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=100)
+        self.client.force_authenticate(self.author)
+        response = self.client.post('/api/reviews/', {'product': self.product.pk, 'rating': 4, 'comment': 'Nice'})
+        self.assertEqual(response.status_code, 201)
+        self.url = f"/api/reviews/{response.data['id']}/"
+    
+    def test_author_can_edit_and_delete(self):
+        response = self.client.patch(self.url, {'rating': 5, 'product': self.product.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertSummary(self.product, 1, 5.0, star_5=1)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+    
+    def test_product_cannot_change(self):
+        # Even to a product the author did buy
+        response = self.client.patch(self.url, {'product': self.other_product.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('product', response.data)
+        self.assertSummary(self.product, 1, 4.0, star_4=1)
+    
+    def test_other_users_cannot_edit_or_delete(self):
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.client.patch(self.url, {'rating': 1}).status_code, 404)
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+        self.assertSummary(self.product, 1, 4.0, star_4=1)
+        # Reading stays public
+        self.assertEqual(self.client.get(self.url).status_code, 200)
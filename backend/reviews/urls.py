@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ReviewViewSet
+from .async_views import product_stats
 
 router = DefaultRouter()
 router.register(r'', ReviewViewSet, basename='review')
 
 urlpatterns = [
+    path('async/product_stats/', product_stats, name='review-product-stats-async'),
     path('', include(router.urls)),
 ]
@@ -1,20 +1,41 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
-from django.db.models import Avg
-from .models import Review
+from .models import Review, ProductRatingSummary
 from .serializers import ReviewSerializer
 
 
+class ReviewCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    
+    # ?sort=newest|highest|lowest
+    sort_orderings = {
+        'newest': ('-created_at', '-id'),
+        'highest': ('-rating', '-created_at', '-id'),
+        'lowest': ('rating', '-created_at', '-id'),
+    }
+    
+    def get_ordering(self, request, queryset, view):
+        return self.sort_orderings.get(request.query_params.get('sort'), self.ordering)
+
+
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewCursorPagination
     
     def get_queryset(self):
-        queryset = Review.objects.all()
+        queryset = Review.objects.for_listing()
         product_id = self.request.query_params.get('product_id')
         if product_id:
             queryset = queryset.filter(product_id=product_id)
+        # Only the author may edit or delete a review; anyone else gets a 404
+        if self.action in ['update', 'partial_update', 'destroy']:
+            queryset = queryset.filter(user_id=self.request.user.pk)
         return queryset
     
     def get_permissions(self):
@@ -29,23 +50,12 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if not product_id:
             return Response({'error': 'product_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        reviews = Review.objects.filter(product_id=product_id)
-        stats = reviews.aggregate(
-            average_rating=Avg('rating'),
-            total_reviews=models.Count('id')
-        )
-        
-        # Rating distribution
-        distribution = {
-            '5': reviews.filter(rating=5).count(),
-            '4': reviews.filter(rating=4).count(),
-            '3': reviews.filter(rating=3).count(),
-            '2': reviews.filter(rating=2).count(),
-            '1': reviews.filter(rating=1).count(),
-        }
+        summary = ProductRatingSummary.objects.filter(product_id=product_id).first()
+        if summary is None:
+            summary = ProductRatingSummary(product_id=product_id)
         
         return Response({
-            'average_rating': round(stats['average_rating'] or 0, 1),
-            'total_reviews': stats['total_reviews'],
-            'distribution': distribution
+            'average_rating': round(summary.average_rating, 1),
+            'total_reviews': summary.review_count,
+            'distribution': summary.distribution
         })
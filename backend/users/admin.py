@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, OTP
+from django.utils import timezone
+from .models import User, OTP, SMSOutbox
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -25,8 +26,21 @@ class UserAdmin(BaseUserAdmin):
 
 @admin.register(OTP)
 class OTPAdmin(admin.ModelAdmin):
-    list_display = ['user', 'code', 'purpose', 'attempts', 'is_used', 'created_at', 'expires_at']
+    list_display = ['user', 'code', 'purpose', 'is_used', 'created_at', 'expires_at']
     list_filter = ['purpose', 'is_used']
     search_fields = ['user__phone', 'code']
     readonly_fields = ['created_at']
     ordering = ['-created_at']
+
+@admin.register(SMSOutbox)
+class SMSOutboxAdmin(admin.ModelAdmin):
+    list_display = ['phone', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['phone', 'provider_id']
+    readonly_fields = ['created_at', 'sent_at', 'claimed_at', 'claim_token', 'provider_id', 'last_error']
+    actions = ['requeue']
+    
+    def requeue(self, request, queryset):
+        updated = queryset.filter(status='dead').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} messages requeued.')
+    requeue.short_description = 'Requeue dead-lettered messages'
@@ -0,0 +1,78 @@
+"""
+JWT authentication that trusts signed claims instead of loading the user row.
+
+Tokens issued by ClaimsTokenObtainPairSerializer carry phone, is_staff,
+is_active and the user's token version. request.user is then a User instance
+built from those claims with every other field deferred, so ORM filters and
+FK assignments work without a query, and any other attribute is loaded on
+first access. Tokens are revoked instantly by bumping User.token_version,
+which is checked against a cached copy rather than the user table.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.base import DEFERRED
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+CLAIM_FIELDS = ['phone', 'is_staff', 'is_active']
+VERSION_CLAIM = 'ver'
+VERSION_CACHE_TIMEOUT = 60 * 60
+
+
+def _version_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        cache.set(_version_key(user_id), version, timeout=VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def set_token_version(user_id, version):
+    cache.set(_version_key(user_id), version, timeout=VERSION_CACHE_TIMEOUT)
+
+
+def clear_token_version(user_id):
+    """Drop the cached version so the next request re-reads it (None once the user is deleted)"""
+    cache.delete(_version_key(user_id))
+
+
+def add_claims(token, user):
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+def user_from_claims(user_id, validated_token):
+    """A User instance with claim fields populated and all other fields deferred"""
+    values = {field.attname: DEFERRED for field in User._meta.concrete_fields}
+    values['id'] = user_id
+    for field in CLAIM_FIELDS:
+        values[field] = validated_token[field]
+    return User.from_db('default', list(values), list(values.values()))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            # Tokens issued before claims were embedded: fall back to the database
+            return super().get_user(validated_token)
+        
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        current_version = get_token_version(user_id)
+        if current_version is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if validated_token[VERSION_CLAIM] != current_version:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        
+        return user_from_claims(user_id, validated_token)
@@ -0,0 +1,118 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import io
+import socket
+import statistics
+import threading
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.views import APIView
+from products import async_views
+from products.models import Product
+from users.sms import HTTPBackend
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare sync workers with the ASGI event loop while SMS sends wait on a slow upstream: '
+        'read-request latency and total time for the same mixed load'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--upstream-latency', type=float, default=0.5, help='Seconds the fake provider waits')
+        parser.add_argument('--sends', type=int, default=40, help='SMS sends in the load')
+        parser.add_argument('--reads', type=int, default=200, help='product_stats/catalog requests in the load')
+        parser.add_argument('--workers', type=int, default=4, help='Sync worker threads (gunicorn --workers)')
+        parser.add_argument('--port', type=int, default=8026)
+    
+    def handle(self, *args, **options):
+        self.start_upstream(options['port'], options['upstream_latency'])
+        product = Product.objects.first()
+        product_id = product.pk if product else 0
+        
+        original = APIView.throttle_classes, async_views.throttle_classes
+        # Throttling would cap the measured rate, so it is disabled for the run
+        APIView.throttle_classes = async_views.throttle_classes = []
+        try:
+            with override_settings(SMS_HTTP_URL=f"http://127.0.0.1:{options['port']}/"):
+                sync_result = self.run_sync(product_id, options)
+                async_result = asyncio.run(self.run_async(product_id, options))
+        finally:
+            APIView.throttle_classes, async_views.throttle_classes = original
+        
+        self.stdout.write(
+            f"{options['sends']} sends at {options['upstream_latency']}s upstream latency + "
+            f"{options['reads']} reads"
+        )
+        for label, (elapsed, latencies) in [('sync', sync_result), ('asgi', async_result)]:
+            latencies.sort()
+            self.stdout.write(
+                f'{label:<5} total={elapsed:.2f}s read p50={statistics.median(latencies) * 1000:.0f}ms '
+                f'p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms'
+            )
+    
+    def start_upstream(self, port, latency):
+        thread = threading.Thread(
+            target=call_command,
+            args=('fake_sms_server',),
+            kwargs={'port': port, 'latency': latency, 'quiet': True, 'stdout': io.StringIO()},
+            daemon=True
+        )
+        thread.start()
+        for _ in range(50):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f'Fake SMS server did not start on port {port}')
+    
+    def read_paths(self, prefix_stats, prefix_catalog, product_id, count):
+        return [
+            f'{prefix_stats}?product_id={product_id}' if i % 2 else prefix_catalog
+            for i in range(count)
+        ]
+    
+    def run_sync(self, product_id, options):
+        """Sends and reads share a fixed pool, like requests queued on sync workers"""
+        backend = HTTPBackend()
+        client = Client(SERVER_NAME='localhost')
+        paths = self.read_paths('/api/reviews/product_stats/', '/api/products/', product_id, options['reads'])
+        latencies = []
+        
+        def read(path, queued):
+            client.get(path)
+            latencies.append(time.perf_counter() - queued)
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            # Queue time counts towards latency, as it would behind a busy worker
+            for i in range(options['sends']):
+                pool.submit(backend.send, f'+2519{i:08d}', 'benchmark')
+            for path in paths:
+                pool.submit(read, path, time.perf_counter())
+        return time.perf_counter() - started, latencies
+    
+    async def run_async(self, product_id, options):
+        """The same load on one event loop: sends await the upstream without holding a worker"""
+        backend = HTTPBackend()
+        client = AsyncClient(SERVER_NAME='localhost')
+        paths = self.read_paths('/api/reviews/async/product_stats/', '/api/products/async/', product_id, options['reads'])
+        latencies = []
+        
+        async def read(path):
+            queued = time.perf_counter()
+            await client.get(path)
+            latencies.append(time.perf_counter() - queued)
+        
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(
+                *(backend.asend(f'+2519{i:08d}', 'benchmark') for i in range(options['sends'])),
+                *(read(path) for path in paths)
+            )
+        finally:
+            await backend.aclose()
+        return time.perf_counter() - started, latencies
@@ -0,0 +1,62 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.authentication import StatelessJWTAuthentication
+from users.serializers import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec for authenticated endpoints with and without the stateless JWT fast path'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--path', action='append', help='Endpoint to hit (repeatable)')
+    
+    def handle(self, *args, **options):
+        paths = options['path'] or ['/api/wishlist/ids/', '/api/orders/my_orders/']
+        
+        # Everything runs inside a transaction that is rolled back, leaving no benchmark user behind
+        with transaction.atomic():
+            user = User.objects.create_user(phone='+251900000000', username='benchmark', password='benchmark')
+            token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}', SERVER_NAME='localhost')
+            
+            original = APIView.authentication_classes, APIView.throttle_classes
+            # Throttling would cap the measured rate, so it is disabled for the run
+            APIView.throttle_classes = []
+            try:
+                for label, auth_class in [('database', JWTAuthentication), ('stateless', StatelessJWTAuthentication)]:
+                    APIView.authentication_classes = [auth_class]
+                    for path in paths:
+                        self.run(client, label, path, options['requests'])
+            finally:
+                APIView.authentication_classes, APIView.throttle_classes = original
+                transaction.set_rollback(True)
+    
+    def run(self, client, label, path, count):
+        client.get(path)  # warm up
+        queries = []
+        
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+        
+        # request_started resets connection.queries, so count with an execute wrapper instead
+        with connection.execute_wrapper(count_queries):
+            client.get(path)
+        
+        started = time.perf_counter()
+        for _ in range(count):
+            response = client.get(path)
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(
+            f'{label:<10} {path:<28} status={response.status_code} '
+            f'queries/request={len(queries)} {count / elapsed:,.0f} req/s'
+        )
@@ -0,0 +1,62 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand
+
+
+def build_server(port=8025, latency=0, failure_rate=0, on_message=None):
+    """
+    The stand-in provider, not yet serving; port 0 picks a free one
+    (server.server_address). on_message(payload) is called for each accepted message.
+    """
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if latency:
+                time.sleep(latency)
+            if random.random() < failure_rate:
+                self._reply(503, {'error': 'simulated outage'})
+                return
+            if on_message:
+                on_message(payload)
+            self._reply(201, {'sid': f'SM{uuid.uuid4().hex}'})
+        
+        def _reply(self, code, data):
+            body = json.dumps(data).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return ThreadingHTTPServer(('127.0.0.1', port), Handler)
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMS provider stand-in for users.sms.HTTPBackend (development and load tests)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8025)
+        parser.add_argument('--latency', type=float, default=0, help='Seconds to wait before answering')
+        parser.add_argument('--failure-rate', type=float, default=0, help='Fraction of requests answered with 503')
+        parser.add_argument('--quiet', action='store_true', help='Do not print received messages')
+    
+    def handle(self, *args, **options):
+        def on_message(payload):
+            self.stdout.write(f"{payload.get('to')}: {payload.get('body')}")
+        
+        server = build_server(
+            options['port'], options['latency'], options['failure_rate'],
+            on_message=None if options['quiet'] else on_message
+        )
+        self.stdout.write(f"Fake SMS server listening on http://127.0.0.1:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
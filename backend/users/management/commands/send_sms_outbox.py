@@ -0,0 +1,44 @@
+import asyncio
+import time
+from django.core.management.base import BaseCommand
+from users import sms
+from users.outbox import adrain, drain
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued SMS messages from the outbox'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep draining until interrupted')
+        parser.add_argument('--interval', type=float, default=1, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel provider requests per batch')
+        parser.add_argument('--async', dest='use_async', action='store_true',
+                            help='Send from an event loop instead of a thread pool')
+    
+    def handle(self, *args, **options):
+        if options['use_async']:
+            asyncio.run(self.run_async(options))
+            return
+        
+        while True:
+            metrics = drain(batch_size=options['batch_size'], concurrency=options['concurrency'])
+            if metrics.attempted:
+                self.stdout.write(f'{metrics} backend={sms.get_backend().stats()}')
+            if not options['loop']:
+                break
+            if not metrics.attempted:
+                time.sleep(options['interval'])
+    
+    async def run_async(self, options):
+        try:
+            while True:
+                metrics = await adrain(batch_size=options['batch_size'], concurrency=options['concurrency'])
+                if metrics.attempted:
+                    self.stdout.write(f'{metrics} backend={sms.get_backend().stats()}')
+                if not options['loop']:
+                    break
+                if not metrics.attempted:
+                    await asyncio.sleep(options['interval'])
+        finally:
+            await sms.aclose()
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_sms_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:22
+
+import phonenumbers
+import users.models
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def normalize_phone(value):
+    # Frozen copy of users.utils.normalize_phone
+    value = str(value or "").strip()
+    candidates = [value]
+    if value.isdigit():
+        candidates.append(f"+{value}")
+    for candidate in candidates:
+        try:
+            parsed = phonenumbers.parse(candidate, "ET")
+        except phonenumbers.NumberParseException:
+            continue
+        if phonenumbers.is_valid_number(parsed):
+            return phonenumbers.format_number(
+                parsed, phonenumbers.PhoneNumberFormat.E164
+            )
+    return None
+
+
+def merge_duplicates(apps, survivor, duplicates):
+    """Move a duplicate account's data onto the survivor and deactivate it"""
+    User = apps.get_model("users", "User")
+    Order = apps.get_model("orders", "Order")
+    Review = apps.get_model("reviews", "Review")
+    Wishlist = apps.get_model("wishlist", "Wishlist")
+
+    duplicate_ids = [user.pk for user in duplicates]
+    Order.objects.filter(user_id__in=duplicate_ids).update(user_id=survivor.pk)
+
+    # Reviews and wishlist entries are unique per (user, product); keep the survivor's
+    reviewed = Review.objects.filter(user_id=survivor.pk).values("product_id")
+    Review.objects.filter(user_id__in=duplicate_ids).exclude(
+        product_id__in=reviewed
+    ).update(user_id=survivor.pk)
+    wished = Wishlist.objects.filter(user_id=survivor.pk).values("product_id")
+    Wishlist.objects.filter(user_id__in=duplicate_ids).exclude(
+        product_id__in=wished
+    ).update(user_id=survivor.pk)
+
+    User.objects.filter(pk__in=duplicate_ids).update(phone_e164=None, is_active=False)
+
+
+def backfill_phone_e164(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    seen = {}
+    duplicates = {}
+
+    # Prefer active, verified, older accounts as the canonical owner of a number
+    users = User.objects.order_by(
+        "-is_active", "-is_phone_verified", "date_joined", "pk"
+    ).only("pk", "phone")
+    batch = []
+    for user in users.iterator(chunk_size=BATCH_SIZE):
+        normalized = normalize_phone(user.phone)
+        if normalized is None:
+            continue
+        if normalized in seen:
+            duplicates.setdefault(normalized, []).append(user)
+            continue
+        seen[normalized] = user
+        user.phone_e164 = normalized
+        batch.append(user)
+        if len(batch) >= BATCH_SIZE:
+            User.objects.bulk_update(batch, ["phone_e164"])
+            batch = []
+    User.objects.bulk_update(batch, ["phone_e164"])
+
+    for normalized, extra in duplicates.items():
+        merge_duplicates(apps, seen[normalized], extra)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_token_version"),
+        ("orders", "0003_order_coupon_order_discount_amount_order_subtotal"),
+        ("reviews", "0004_review_listing_indexes"),
+        ("wishlist", "0002_restock_notifications"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="phone_e164",
+            field=models.CharField(
+                blank=True, editable=False, max_length=20, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="user",
+            name="phone_e164",
+            field=models.CharField(
+                blank=True, editable=False, max_length=20, null=True, unique=True
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_phone_e164"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="otp",
+            name="attempts",
+        ),
+    ]
@@ -1,28 +1,93 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+from django.db import models, transaction
+from django.db.models.signals import post_delete
 from django.utils import timezone
+from .utils import normalize_phone
 import random
 import string
 
+class UserManager(BaseUserManager):
+    def get_by_phone(self, phone):
+        """Look a user up by any spelling of their phone number via the E.164 index"""
+        normalized = normalize_phone(phone)
+        if normalized:
+            return self.get(phone_e164=normalized)
+        return self.get(phone=phone)
+
 class User(AbstractUser):
+    # Changing any of these revokes the user's tokens: their claims (or the password) are stale
+    AUTH_FIELDS = ['password', 'is_staff', 'is_superuser', 'is_active']
+    
     phone = models.CharField(max_length=20, unique=True)
+    # Canonical E.164 form of phone, used for every lookup; NULL for unparseable legacy values
+    phone_e164 = models.CharField(max_length=20, unique=True, null=True, blank=True, editable=False)
     email = models.EmailField(blank=True, null=True)
     is_phone_verified = models.BooleanField(default=False)
+    token_version = models.IntegerField(default=0)
+    
+    objects = UserManager()
     
     USERNAME_FIELD = 'phone'
     REQUIRED_FIELDS = ['username']
     
     def __str__(self):
         return self.phone
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._auth_state = instance._get_auth_state()
+        return instance
+    
+    def _get_auth_state(self):
+        # Deferred fields are absent from __dict__ and are left out
+        return {field: self.__dict__[field] for field in self.AUTH_FIELDS if field in self.__dict__}
+    
+    def save(self, *args, **kwargs):
+        self.phone_e164 = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            update_fields = kwargs['update_fields'] = {*update_fields, 'phone_e164'}
+        
+        saved = self.AUTH_FIELDS if update_fields is None else update_fields
+        previous = getattr(self, '_auth_state', {})
+        revoke = self.pk is not None and any(
+            field in saved and self.__dict__.get(field, value) != value for field, value in previous.items()
+        )
+        if revoke:
+            self.token_version = models.F('token_version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        
+        super().save(*args, **kwargs)
+        self._auth_state = self._get_auth_state()
+        if revoke:
+            from .authentication import clear_token_version
+            self.refresh_from_db(fields=['token_version'])
+            transaction.on_commit(lambda: clear_token_version(self.pk))
+    
+    def revoke_tokens(self):
+        """Invalidate every JWT issued so far for this user"""
+        from .authentication import set_token_version
+        User.objects.filter(pk=self.pk).update(token_version=models.F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        set_token_version(self.pk, self.token_version)
+
+def _clear_deleted_token_version(sender, instance, **kwargs):
+    from .authentication import clear_token_version
+    user_id = instance.pk  # the collector clears pk after the signal
+    transaction.on_commit(lambda: clear_token_version(user_id))
+
+post_delete.connect(_clear_deleted_token_version, sender=User, dispatch_uid='users.clear_deleted_token_version')
 
 class OTP(models.Model):
+    """Audit trail of issued codes (OTP_AUDIT_ENABLED); codes and attempts are checked by users.otp_store"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='otps')
     code = models.CharField(max_length=6)
     purpose = models.CharField(max_length=20, choices=[
         ('registration', 'Registration'),
         ('password_reset', 'Password Reset'),
     ])
-    attempts = models.IntegerField(default=0)
     is_used = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
@@ -34,28 +99,38 @@ class OTP(models.Model):
     def generate_code():
         return ''.join(random.choices(string.digits, k=6))
     
-    def is_valid(self):
-        if self.is_used:
-            return False
-        if self.attempts >= 3:
-            return False
-        if timezone.now() > self.expires_at:
-            return False
-        return True
-    
-    def verify(self, code):
-        self.attempts += 1
-        self.save()
-        
-        if not self.is_valid():
-            return False
-        
-        if self.code == code:
-            self.is_used = True
-            self.save()
-            return True
-        
-        return False
-    
     class Meta:
         ordering = ['-created_at']
+
+class SMSOutbox(models.Model):
+    """Outgoing SMS written alongside the row that triggered it, drained by `manage.py send_sms_outbox`"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead Letter'),
+    ]
+    
+    phone = models.CharField(max_length=20)
+    body = models.TextField()
+    kind = models.CharField(max_length=30, default='otp')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    provider_id = models.CharField(max_length=100, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        verbose_name = 'SMS outbox message'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_outbox_due_idx'),
+            models.Index(fields=['claim_token'], name='sms_outbox_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.phone} - {self.kind} ({self.status})'
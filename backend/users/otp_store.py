@@ -0,0 +1,90 @@
+"""
+Cache-backed OTP store.
+
+Codes live in the cache as keyed HMACs with the cache's native TTL. Each
+attempt claims the next numbered slot with cache.add, which is atomic on every
+backend (Redis SET NX, and an INSERT for DatabaseCache, where incr is a
+non-atomic get-then-set), so parallel guesses can't exceed OTP_MAX_ATTEMPTS.
+Slots are keyed by a per-code nonce, so a new code starts with fresh attempts.
+The OTP table is kept as an optional audit trail of issued codes
+(settings.OTP_AUDIT_ENABLED), written in the issuing transaction; the cache is
+only written once that transaction commits.
+"""
+import hashlib
+import hmac
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+
+from .models import OTP
+
+# verify() outcomes
+VERIFIED = 'verified'
+INVALID = 'invalid'
+MISSING = 'missing'
+LOCKED = 'locked'
+
+
+def _code_key(phone, purpose):
+    return f'otp:{purpose}:{phone}'
+
+
+def _attempt_key(phone, purpose, nonce, attempt):
+    return f'otp-attempt:{purpose}:{phone}:{nonce}:{attempt}'
+
+
+def _digest(phone, purpose, code):
+    message = f'{phone}:{purpose}:{code}'.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def issue(user, purpose):
+    """Generate a code for user/purpose, replacing any outstanding one; returns the plain code"""
+    code = OTP.generate_code()
+    ttl = settings.OTP_EXPIRY_MINUTES * 60
+    entry = {'digest': _digest(user.phone, purpose, code), 'nonce': secrets.token_hex(8)}
+    code_key = _code_key(user.phone, purpose)
+    transaction.on_commit(lambda: cache.set(code_key, entry, timeout=ttl))
+    
+    if settings.OTP_AUDIT_ENABLED:
+        OTP.objects.create(
+            user=user,
+            code='*' * len(code),
+            purpose=purpose,
+            expires_at=timezone.now() + timedelta(seconds=ttl)
+        )
+    return code
+
+
+def _claim_attempt(phone, purpose, nonce):
+    """Number of this attempt (1-based), or None once every attempt is taken"""
+    ttl = settings.OTP_EXPIRY_MINUTES * 60
+    for attempt in range(1, settings.OTP_MAX_ATTEMPTS + 1):
+        if cache.add(_attempt_key(phone, purpose, nonce, attempt), True, timeout=ttl):
+            return attempt
+    return None
+
+
+def verify(phone, purpose, code):
+    """Returns (outcome, attempts_left); a verified code is consumed"""
+    code_key = _code_key(phone, purpose)
+    entry = cache.get(code_key)
+    if entry is None:
+        return MISSING, 0
+    
+    attempt = _claim_attempt(phone, purpose, entry['nonce'])
+    if attempt is None:
+        return LOCKED, 0
+    attempts_left = settings.OTP_MAX_ATTEMPTS - attempt
+    
+    if hmac.compare_digest(entry['digest'], _digest(phone, purpose, code)):
+        cache.delete(code_key)
+        return VERIFIED, attempts_left
+    
+    if attempts_left == 0:
+        return LOCKED, 0
+    return INVALID, attempts_left
@@ -0,0 +1,173 @@
+"""
+Transactional SMS outbox.
+
+Views enqueue messages in the same transaction as the OTP (or other) row that
+triggered them; `manage.py send_sms_outbox` drains the table with a reused
+provider client, retrying failures with exponential backoff and moving
+messages that keep failing to the dead letter state. `adrain` is the asyncio
+variant: provider calls overlap on one event loop instead of a thread pool.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import asyncio
+import logging
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SMSOutbox
+from . import sms
+from .sms import CIRCUIT_OPEN
+from .utils import send_sms
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_sms(phone, body, kind='otp'):
+    """Queue an SMS; call inside the transaction that creates the triggering row"""
+    message = SMSOutbox.objects.create(phone=phone, body=body, kind=kind)
+    if settings.SMS_OUTBOX_INLINE:
+        # Development convenience: deliver right after commit instead of waiting for a worker
+        transaction.on_commit(lambda: drain(ids=[message.pk]))
+    return message
+
+
+class OutboxMetrics:
+    """Delivery counters for one drain pass"""
+    
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.deferred = 0
+        self.latency_total = 0.0
+    
+    @property
+    def attempted(self):
+        return self.sent + self.retried + self.dead + self.deferred
+    
+    @property
+    def average_latency_ms(self):
+        return (self.latency_total / self.attempted * 1000) if self.attempted else 0
+    
+    def __str__(self):
+        return (f'sent={self.sent} retried={self.retried} dead={self.dead} deferred={self.deferred} '
+                f'avg_latency={self.average_latency_ms:.0f}ms')
+
+
+def claim_batch(batch_size, ids=None):
+    """Atomically claim due messages for this worker; returns the claimed rows"""
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.SMS_OUTBOX_LEASE_SECONDS)
+    due = SMSOutbox.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) |
+        Q(status='sending', claimed_at__lt=lease_expired)
+    )
+    if ids is not None:
+        due = due.filter(pk__in=ids)
+    candidate_ids = list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size])
+    if not candidate_ids:
+        return []
+    
+    token = uuid.uuid4().hex
+    # Re-apply the due filter so rows taken by another worker in the meantime are skipped
+    due.filter(pk__in=candidate_ids).update(status='sending', claim_token=token, claimed_at=now)
+    return list(SMSOutbox.objects.filter(claim_token=token))
+
+
+def _send(sender, message):
+    started = time.monotonic()
+    try:
+        success, result = sender(message.phone, message.body)
+    except Exception as e:
+        success, result = False, str(e)
+    return message, success, result, time.monotonic() - started
+
+
+async def _asend(sender, message):
+    started = time.monotonic()
+    try:
+        success, result = await sender(message.phone, message.body)
+    except Exception as e:
+        success, result = False, str(e)
+    return message, success, result, time.monotonic() - started
+
+
+def _record(message, success, result, metrics):
+    message.claim_token = ''
+    if result == CIRCUIT_OPEN:
+        # Provider known to be down: wait for the breaker without spending an attempt
+        message.status = 'pending'
+        message.next_attempt_at = timezone.now() + timedelta(seconds=settings.SMS_CIRCUIT_RESET_SECONDS)
+        metrics.deferred += 1
+        message.save(update_fields=['status', 'claim_token', 'next_attempt_at'])
+        return
+    
+    message.attempts += 1
+    if success:
+        message.status = 'sent'
+        message.provider_id = str(result)[:100]
+        message.sent_at = timezone.now()
+        metrics.sent += 1
+    elif message.attempts >= settings.SMS_OUTBOX_MAX_ATTEMPTS:
+        message.status = 'dead'
+        message.last_error = str(result)
+        metrics.dead += 1
+        logger.error(f'SMS {message.pk} to {message.phone} dead-lettered: {result}')
+    else:
+        backoff = settings.SMS_OUTBOX_BACKOFF_SECONDS * (2 ** (message.attempts - 1))
+        message.status = 'pending'
+        message.last_error = str(result)
+        message.next_attempt_at = timezone.now() + timedelta(seconds=backoff)
+        metrics.retried += 1
+    message.save(update_fields=[
+        'status', 'attempts', 'claim_token', 'provider_id', 'sent_at', 'last_error', 'next_attempt_at'
+    ])
+
+
+def drain(batch_size=100, concurrency=1, sender=None, ids=None):
+    """Deliver one batch of due messages; returns OutboxMetrics"""
+    sender = sender or send_sms
+    metrics = OutboxMetrics()
+    messages = claim_batch(batch_size, ids=ids)
+    if not messages:
+        return metrics
+    
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda message: _send(sender, message), messages))
+    else:
+        results = [_send(sender, message) for message in messages]
+    
+    _record_all(results, metrics)
+    return metrics
+
+
+async def adrain(batch_size=100, concurrency=10, sender=None, ids=None):
+    """Async drain(); `sender` is a coroutine function, defaulting to sms.asend"""
+    sender = sender or sms.asend
+    metrics = OutboxMetrics()
+    messages = await sync_to_async(claim_batch)(batch_size, ids=ids)
+    if not messages:
+        return metrics
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def send_one(message):
+        async with semaphore:
+            return await _asend(sender, message)
+    
+    results = await asyncio.gather(*(send_one(message) for message in messages))
+    await sync_to_async(_record_all)(results, metrics)
+    return metrics
+
+
+def _record_all(results, metrics):
+    for message, success, result, latency in results:
+        metrics.latency_total += latency
+        _record(message, success, result, metrics)
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication import add_claims
 from .models import OTP
-import phonenumbers
 
 User = get_user_model()
 
@@ -15,14 +16,19 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def validate_phone(self, value):
         # Normalize phone number to international format
+        import phonenumbers
         try:
             parsed = phonenumbers.parse(value, 'ET')
             if not phonenumbers.is_valid_number(parsed):
                 raise serializers.ValidationError('Invalid phone number')
             formatted = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-            return formatted
         except phonenumbers.NumberParseException:
             raise serializers.ValidationError('Invalid phone number format')
+        
+        # Catches legacy accounts stored in another format ("0929...", "251929...")
+        if User.objects.filter(phone_e164=formatted).exists():
+            raise serializers.ValidationError('A user with this phone number already exists.')
+        return formatted
     
     def validate(self, data):
         if data['password'] != data['password_confirm']:
@@ -67,3 +73,10 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'phone', 'first_name', 'last_name', 'email', 'is_phone_verified', 'date_joined']
         read_only_fields = ['id', 'is_phone_verified', 'date_joined']
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Embed the claims StatelessJWTAuthentication needs to skip the user query"""
+    
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
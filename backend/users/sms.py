@@ -0,0 +1,278 @@
+"""
+Pluggable SMS transport.
+
+settings.SMS_BACKEND selects the backend class. Every backend is wrapped in a
+circuit breaker so an upstream outage fails fast instead of tying up workers,
+and keeps per-backend latency/error counters. `asend` is the non-blocking
+variant used by ASGI views and the async outbox drain.
+"""
+from functools import lru_cache
+import asyncio
+import json
+import logging
+import threading
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_OPEN = 'circuit open'
+
+
+class CircuitBreaker:
+    """
+    Open after `failure_threshold` consecutive failures, probe again after `reset_timeout` seconds.
+    Half-open lets a single probe through; everyone else is rejected until it succeeds
+    (closed) or fails (open again). A probe that never reports back (e.g. a cancelled
+    asend) is given up after another `reset_timeout`.
+    """
+    
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+    
+    def allow(self):
+        state = self.state
+        if state != 'half-open':
+            return state == 'closed'
+        # Claimed under the lock so concurrent callers can't all become the probe
+        with self._lock:
+            now = time.monotonic()
+            if self.probe_started is not None and now - self.probe_started < self.reset_timeout:
+                return False
+            self.probe_started = now
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probe_started = None
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class BaseSMSBackend:
+    """Subclasses implement _send(phone_number, body) -> provider message id, raising on failure"""
+    
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            settings.SMS_CIRCUIT_FAILURE_THRESHOLD,
+            settings.SMS_CIRCUIT_RESET_SECONDS
+        )
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self._lock = threading.Lock()
+        self._async_clients = weakref.WeakKeyDictionary()
+    
+    def send(self, phone_number, body):
+        """Returns (success, message_id_or_error) like the legacy helpers"""
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            return False, CIRCUIT_OPEN
+        
+        started = time.monotonic()
+        try:
+            message_id = self._send(phone_number, body)
+        except Exception as e:
+            return self._failed(phone_number, e, started)
+        return self._succeeded(phone_number, message_id, started)
+    
+    async def asend(self, phone_number, body):
+        """Async send(); same return value and breaker/counter bookkeeping"""
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            return False, CIRCUIT_OPEN
+        
+        started = time.monotonic()
+        try:
+            message_id = await self._asend(phone_number, body)
+        except Exception as e:
+            return self._failed(phone_number, e, started)
+        return self._succeeded(phone_number, message_id, started)
+    
+    def _failed(self, phone_number, e, started):
+        self.breaker.record_failure()
+        with self._lock:
+            self.failed += 1
+            self.latency_total += time.monotonic() - started
+        logger.error(f'{type(self).__name__} failed to send SMS to {phone_number}: {str(e)}')
+        return False, str(e)
+    
+    def _succeeded(self, phone_number, message_id, started):
+        self.breaker.record_success()
+        with self._lock:
+            self.sent += 1
+            self.latency_total += time.monotonic() - started
+        logger.info(f'SMS sent to {phone_number}: {message_id}')
+        return True, message_id
+    
+    def _send(self, phone_number, body):
+        raise NotImplementedError
+    
+    async def _asend(self, phone_number, body):
+        # Backends without a native async client fall back to a worker thread
+        return await sync_to_async(self._send, thread_sensitive=False)(phone_number, body)
+    
+    def _loop_local(self, factory):
+        """One async client per event loop; aiohttp sessions cannot cross loops"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = factory()
+        return client
+    
+    async def aclose(self):
+        """Close the async client opened on the running loop, if any"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await self._aclose_client(client)
+    
+    async def _aclose_client(self, client):
+        pass
+    
+    def stats(self):
+        attempted = self.sent + self.failed
+        return {
+            'backend': type(self).__name__,
+            'sent': self.sent,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'circuit': self.breaker.state,
+            'avg_latency_ms': round(self.latency_total / attempted * 1000, 1) if attempted else 0,
+        }
+
+
+class TwilioBackend(BaseSMSBackend):
+    """Twilio REST API over one pooled HTTP session with bounded timeouts"""
+    
+    def __init__(self):
+        super().__init__()
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+        self.client = Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=TwilioHttpClient(pool_connections=True, timeout=settings.SMS_TIMEOUT_SECONDS)
+        )
+    
+    def _send(self, phone_number, body):
+        message = self.client.messages.create(
+            body=body,
+            from_=settings.TWILIO_PHONE_NUMBER,
+            to=phone_number
+        )
+        return message.sid
+    
+    async def _asend(self, phone_number, body):
+        client = self._loop_local(self._async_client)
+        message = await client.messages.create_async(
+            body=body,
+            from_=settings.TWILIO_PHONE_NUMBER,
+            to=phone_number
+        )
+        return message.sid
+    
+    def _async_client(self):
+        from twilio.http.async_http_client import AsyncTwilioHttpClient
+        from twilio.rest import Client
+        return Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=AsyncTwilioHttpClient(timeout=settings.SMS_TIMEOUT_SECONDS)
+        )
+    
+    async def _aclose_client(self, client):
+        await client.http_client.close()
+
+
+class ConsoleBackend(BaseSMSBackend):
+    """For development/testing - just log the message"""
+    
+    def _send(self, phone_number, body):
+        logger.info(f'TEST SMS for {phone_number}: {body}')
+        print(f'\n=== TEST SMS ===')
+        print(f'Phone: {phone_number}')
+        print(f'Body: {body}')
+        print(f'================\n')
+        return 'test'
+
+
+class HTTPBackend(BaseSMSBackend):
+    """
+    POST {"to", "from", "body"} as JSON to SMS_HTTP_URL; pairs with
+    `manage.py fake_sms_server` as a local stand-in for load tests
+    """
+    
+    def __init__(self):
+        super().__init__()
+        import requests
+        self.session = requests.Session()
+    
+    def _send(self, phone_number, body):
+        response = self.session.post(
+            settings.SMS_HTTP_URL,
+            data=json.dumps({'to': phone_number, 'from': settings.TWILIO_PHONE_NUMBER, 'body': body}),
+            headers={'Content-Type': 'application/json'},
+            timeout=settings.SMS_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        return response.json().get('sid', '')
+    
+    async def _asend(self, phone_number, body):
+        import aiohttp
+        session = self._loop_local(lambda: aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=settings.SMS_TIMEOUT_SECONDS)
+        ))
+        async with session.post(
+            settings.SMS_HTTP_URL,
+            json={'to': phone_number, 'from': settings.TWILIO_PHONE_NUMBER, 'body': body}
+        ) as response:
+            response.raise_for_status()
+            return (await response.json()).get('sid', '')
+    
+    async def _aclose_client(self, client):
+        await client.close()
+
+
+@lru_cache(maxsize=None)
+def get_backend(path=None):
+    """Process-wide backend instance so clients, sessions and breaker state are shared"""
+    return import_string(path or settings.SMS_BACKEND)()
+
+
+def send(phone_number, body):
+    return get_backend().send(phone_number, body)
+
+
+async def asend(phone_number, body):
+    return await get_backend().asend(phone_number, body)
+
+
+async def aclose():
+    await get_backend().aclose()
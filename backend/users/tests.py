@@ -0,0 +1,204 @@
+from datetime import timedelta
+import threading
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from config.throttling import OTPRateThrottle
+from . import sms
+from .management.commands.fake_sms_server import build_server
+from .models import SMSOutbox
+from .outbox import claim_batch, drain, enqueue_sms
+
+
+@override_settings(
+    SMS_BACKEND='users.sms.HTTPBackend',
+    SMS_OUTBOX_INLINE=False,
+    SMS_OUTBOX_MAX_ATTEMPTS=3,
+    SMS_OUTBOX_BACKOFF_SECONDS=10,
+    SMS_OUTBOX_LEASE_SECONDS=120,
+    SMS_CIRCUIT_FAILURE_THRESHOLD=5,
+    SMS_CIRCUIT_RESET_SECONDS=30,
+)
+class OutboxTestCase(TestCase):
+    """Drains the outbox through HTTPBackend against `manage.py fake_sms_server`"""
+    failure_rate = 0
+    
+    def setUp(self):
+        self.received = []
+        server = build_server(port=0, failure_rate=self.failure_rate, on_message=self.received.append)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        
+        url = override_settings(SMS_HTTP_URL=f'http://127.0.0.1:{server.server_address[1]}/')
+        url.enable()
+        self.addCleanup(url.disable)
+        # A fresh backend per test: it holds the breaker and reads its settings once
+        sms.get_backend.cache_clear()
+        self.addCleanup(sms.get_backend.cache_clear)
+    
+    def assertDueIn(self, message, seconds):
+        remaining = (message.next_attempt_at - timezone.now()).total_seconds()
+        self.assertAlmostEqual(remaining, seconds, delta=5)
+    
+    def make_due(self):
+        SMSOutbox.objects.filter(status='pending').update(next_attempt_at=timezone.now())
+
+
+class ClaimTests(OutboxTestCase):
+    def test_claims_only_due_messages_once(self):
+        due = enqueue_sms('+251911000001', 'due')
+        later = enqueue_sms('+251911000002', 'later')
+        SMSOutbox.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        
+        claimed = claim_batch(10)
+        self.assertEqual([message.pk for message in claimed], [due.pk])
+        self.assertEqual(claimed[0].status, 'sending')
+        self.assertTrue(claimed[0].claim_token)
+        self.assertEqual(claim_batch(10), [])
+    
+    def test_reclaims_after_the_lease_expires(self):
+        message = enqueue_sms('+251911000001', 'stuck')
+        claim_batch(10)
+        SMSOutbox.objects.filter(pk=message.pk).update(claimed_at=timezone.now() - timedelta(seconds=121))
+        
+        claimed = claim_batch(10)
+        self.assertEqual([m.pk for m in claimed], [message.pk])
+    
+    def test_batch_size_and_ids(self):
+        messages = [enqueue_sms(f'+25191100000{i}', str(i)) for i in range(3)]
+        self.assertEqual([m.pk for m in claim_batch(10, ids=[messages[1].pk])], [messages[1].pk])
+        self.assertEqual(len(claim_batch(1)), 1)
+
+
+class DeliveryTests(OutboxTestCase):
+    def test_sends_through_the_provider(self):
+        message = enqueue_sms('+251911000001', 'Your code is 123456')
+        
+        metrics = drain()
+        self.assertEqual((metrics.sent, metrics.attempted), (1, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'sent')
+        self.assertEqual(message.attempts, 1)
+        self.assertTrue(message.provider_id.startswith('SM'))
+        self.assertIsNotNone(message.sent_at)
+        self.assertEqual(message.claim_token, '')
+        self.assertEqual(self.received, [{'to': '+251911000001', 'from': self.received[0]['from'],
+                                          'body': 'Your code is 123456'}])
+    
+    def test_concurrent_drain(self):
+        for i in range(6):
+            enqueue_sms(f'+25191100000{i}', str(i))
+        self.assertEqual(drain(concurrency=3).sent, 6)
+        self.assertEqual(sorted(payload['body'] for payload in self.received), [str(i) for i in range(6)])
+
+
+class FailureTests(OutboxTestCase):
+    failure_rate = 1
+    
+    def test_retries_with_exponential_backoff(self):
+        message = enqueue_sms('+251911000001', 'retry')
+        
+        self.assertEqual(drain().retried, 1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('503', message.last_error)
+        self.assertDueIn(message, 10)
+        # Not due yet, so a second pass leaves it alone
+        self.assertEqual(drain().attempted, 0)
+        
+        self.make_due()
+        drain()
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertDueIn(message, 20)
+    
+    def test_dead_letters_after_max_attempts(self):
+        message = enqueue_sms('+251911000001', 'dead')
+        for _ in range(3):
+            self.make_due()
+            drain()
+        
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('dead', 3))
+        self.assertIn('503', message.last_error)
+        self.make_due()
+        self.assertEqual(drain().attempted, 0)
+    
+    @override_settings(SMS_CIRCUIT_FAILURE_THRESHOLD=2)
+    def test_defers_without_spending_attempts_while_the_circuit_is_open(self):
+        messages = [enqueue_sms(f'+25191100000{i}', str(i)) for i in range(4)]
+        
+        metrics = drain()
+        self.assertEqual((metrics.retried, metrics.deferred), (2, 2))
+        self.assertEqual(sms.get_backend().breaker.state, 'open')
+        deferred = SMSOutbox.objects.filter(pk__in=[m.pk for m in messages], attempts=0)
+        self.assertEqual(deferred.count(), 2)
+        for message in deferred:
+            self.assertEqual(message.status, 'pending')
+            self.assertEqual(message.last_error, '')
+            self.assertDueIn(message, 30)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'throttle-tests'}})
+class OTPThrottleTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+    
+    def request(self):
+        return Request(APIRequestFactory().post('/api/auth/send-otp/', REMOTE_ADDR='10.0.0.1'))
+    
+    def test_limits_sequential_requests(self):
+        allowed = [OTPRateThrottle().allow_request(self.request(), None) for _ in range(7)]
+        self.assertEqual(allowed, [True] * 5 + [False] * 2)
+        throttle = OTPRateThrottle()
+        self.assertFalse(throttle.allow_request(self.request(), None))
+        self.assertGreater(throttle.wait(), 0)
+    
+    def test_concurrent_requests_cannot_exceed_the_limit(self):
+        # Every request reads the window before any of them is counted, as parallel requests would;
+        # an incr-based counter would let all of them through
+        throttles = [OTPRateThrottle() for _ in range(8)]
+        with patch.object(throttles[0].cache, 'get_many', return_value={}):
+            allowed = [throttle.allow_request(self.request(), None) for throttle in throttles]
+        self.assertEqual(allowed.count(True), 5)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def open_breaker(self):
+        breaker = sms.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        return breaker
+    
+    def cool_down(self, breaker):
+        breaker.opened_at -= 30
+        self.assertEqual(breaker.state, 'half-open')
+    
+    def test_half_open_lets_one_probe_through(self):
+        breaker = self.open_breaker()
+        self.cool_down(breaker)
+        self.assertEqual([breaker.allow() for _ in range(5)], [True] + [False] * 4)
+        
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.cool_down(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(all(breaker.allow() for _ in range(5)))
+    
+    def test_gives_up_on_a_probe_that_never_reports_back(self):
+        breaker = self.open_breaker()
+        self.cool_down(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.probe_started -= 30
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
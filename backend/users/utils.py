@@ -1,41 +1,50 @@
 from django.conf import settings
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
+from . import sms
 import logging
 
 logger = logging.getLogger(__name__)
 
+def normalize_phone(value, region='ET'):
+    """
+    Canonical E.164 form of a phone number ("0929...", "251929..." and "+251929..." agree)
+    Returns None when the value is not a valid number
+    """
+    # Imported on first use: models import this module, and the metadata tables are large
+    import phonenumbers
+    value = str(value or '').strip()
+    candidates = [value]
+    if value.isdigit():
+        # "251929..." without the plus is a national-format miss; retry as international
+        candidates.append(f'+{value}')
+    
+    for candidate in candidates:
+        try:
+            parsed = phonenumbers.parse(candidate, region)
+        except phonenumbers.NumberParseException:
+            continue
+        if phonenumbers.is_valid_number(parsed):
+            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    return None
+
+def otp_message(otp_code):
+    return f'Your verification code is: {otp_code}. Valid for {settings.OTP_EXPIRY_MINUTES} minutes. Do not share this code.'
+
+def send_sms(phone_number, body):
+    """
+    Send an SMS through the configured backend (settings.SMS_BACKEND)
+    Returns (success, message_id_or_error)
+    """
+    return sms.send(phone_number, body)
+
 def send_otp_sms(phone_number, otp_code):
     """
-    Send OTP via Twilio SMS
+    Send OTP via SMS
     The sender will appear as +251929509800 if configured in Twilio
     """
-    try:
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        
-        message = client.messages.create(
-            body=f'Your verification code is: {otp_code}. Valid for 5 minutes. Do not share this code.',
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
-        
-        logger.info(f'OTP sent to {phone_number}: {message.sid}')
-        return True, message.sid
-        
-    except TwilioRestException as e:
-        logger.error(f'Failed to send OTP to {phone_number}: {str(e)}')
-        return False, str(e)
-    except Exception as e:
-        logger.error(f'Unexpected error sending OTP: {str(e)}')
-        return False, str(e)
+    return send_sms(phone_number, otp_message(otp_code))
 
 def send_test_otp(phone_number, otp_code):
     """
     For development/testing - just log the OTP
     """
-    logger.info(f'TEST OTP for {phone_number}: {otp_code}')
-    print(f'\n=== TEST OTP ===')
-    print(f'Phone: {phone_number}')
-    print(f'Code: {otp_code}')
-    print(f'================\n')
-    return True, 'test'
+    return sms.get_backend('users.sms.ConsoleBackend').send(phone_number, otp_message(otp_code))
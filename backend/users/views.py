@@ -2,58 +2,38 @@ from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.throttling import AnonRateThrottle
-from rest_framework_simplejwt.tokens import RefreshToken
+from config.throttling import OTPRateThrottle, OTPPhoneThrottle
 from django.contrib.auth import get_user_model
-from django.utils import timezone
-from datetime import timedelta
-from .models import OTP
+from django.db import transaction
+from . import otp_store
 from .serializers import (
     UserRegistrationSerializer, OTPVerificationSerializer,
-    OTPRequestSerializer, PasswordResetSerializer, UserSerializer
+    OTPRequestSerializer, PasswordResetSerializer, UserSerializer,
+    ClaimsTokenObtainPairSerializer
 )
-from .utils import send_otp_sms, send_test_otp
+from .outbox import enqueue_sms
+from .utils import otp_message
 from django.conf import settings
 
 User = get_user_model()
 
-class OTPRateThrottle(AnonRateThrottle):
-    rate = '5/hour'  # Max 5 OTP requests per hour per IP
-
 @api_view(['POST'])
 @permission_classes([AllowAny])
-@throttle_classes([OTPRateThrottle])
+@throttle_classes([OTPRateThrottle, OTPPhoneThrottle])
 def register(request):
     """
     Register a new user and send OTP
     """
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
-        
-        # Generate OTP
-        otp_code = OTP.generate_code()
-        expires_at = timezone.now() + timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
-        
-        otp = OTP.objects.create(
-            user=user,
-            code=otp_code,
-            purpose='registration',
-            expires_at=expires_at
-        )
-        
-        # Send OTP via SMS
-        # Use send_test_otp for development, send_otp_sms for production
-        if settings.DEBUG:
-            success, message_id = send_test_otp(user.phone, otp_code)
-        else:
-            success, message_id = send_otp_sms(user.phone, otp_code)
-        
-        if not success:
-            return Response(
-                {'error': 'Failed to send OTP. Please try again.'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        with transaction.atomic():
+            user = serializer.save()
+            
+            # Generate OTP
+            otp_code = otp_store.issue(user, 'registration')
+            
+            # Queue the SMS in the same transaction; the outbox worker delivers it
+            enqueue_sms(user.phone, otp_message(otp_code))
         
         return Response({
             'message': 'Registration successful. OTP sent to your phone.',
@@ -77,44 +57,34 @@ def verify_otp(request):
     code = serializer.validated_data['code']
     
     try:
-        user = User.objects.get(phone=phone)
+        user = User.objects.get_by_phone(phone)
     except User.DoesNotExist:
         return Response(
             {'error': 'User not found'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get latest unused OTP
-    otp = user.otps.filter(
-        purpose='registration',
-        is_used=False
-    ).first()
+    outcome, attempts_left = otp_store.verify(user.phone, 'registration', code)
     
-    if not otp:
+    if outcome == otp_store.MISSING:
         return Response(
-            {'error': 'No valid OTP found. Please request a new one.'},
+            {'error': 'No valid OTP found or OTP expired. Please request a new one.'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    if not otp.is_valid():
-        if otp.attempts >= 3:
-            return Response(
-                {'error': 'Maximum attempts exceeded. Please request a new OTP.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        if timezone.now() > otp.expires_at:
-            return Response(
-                {'error': 'OTP expired. Please request a new one.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    if outcome == otp_store.LOCKED:
+        return Response(
+            {'error': 'Maximum attempts exceeded. Please request a new OTP.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    if otp.verify(code):
+    if outcome == otp_store.VERIFIED:
         user.is_active = True
         user.is_phone_verified = True
         user.save()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsTokenObtainPairSerializer.get_token(user)
         
         return Response({
             'message': 'Phone verified successfully',
@@ -123,7 +93,6 @@ def verify_otp(request):
             'user': UserSerializer(user).data
         }, status=status.HTTP_200_OK)
     
-    attempts_left = 3 - otp.attempts
     return Response(
         {'error': f'Invalid OTP. {attempts_left} attempts remaining.'},
         status=status.HTTP_400_BAD_REQUEST
@@ -131,7 +100,7 @@ def verify_otp(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
-@throttle_classes([OTPRateThrottle])
+@throttle_classes([OTPRateThrottle, OTPPhoneThrottle])
 def request_otp(request):
     """
     Request new OTP (for password reset or resend)
@@ -144,35 +113,19 @@ def request_otp(request):
     purpose = serializer.validated_data['purpose']
     
     try:
-        user = User.objects.get(phone=phone)
+        user = User.objects.get_by_phone(phone)
     except User.DoesNotExist:
         return Response(
             {'error': 'User not found'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Generate new OTP
-    otp_code = OTP.generate_code()
-    expires_at = timezone.now() + timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
-    
-    otp = OTP.objects.create(
-        user=user,
-        code=otp_code,
-        purpose=purpose,
-        expires_at=expires_at
-    )
-    
-    # Send OTP
-    if settings.DEBUG:
-        success, message_id = send_test_otp(user.phone, otp_code)
-    else:
-        success, message_id = send_otp_sms(user.phone, otp_code)
-    
-    if not success:
-        return Response(
-            {'error': 'Failed to send OTP. Please try again.'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    with transaction.atomic():
+        # Generate new OTP
+        otp_code = otp_store.issue(user, purpose)
+        
+        # Queue the SMS in the same transaction; the outbox worker delivers it
+        enqueue_sms(user.phone, otp_message(otp_code))
     
     return Response({
         'message': 'OTP sent successfully',
@@ -194,34 +147,30 @@ def reset_password(request):
     new_password = serializer.validated_data['new_password']
     
     try:
-        user = User.objects.get(phone=phone)
+        user = User.objects.get_by_phone(phone)
     except User.DoesNotExist:
         return Response(
             {'error': 'User not found'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get latest unused password reset OTP
-    otp = user.otps.filter(
-        purpose='password_reset',
-        is_used=False
-    ).first()
+    outcome, attempts_left = otp_store.verify(user.phone, 'password_reset', code)
     
-    if not otp or not otp.is_valid():
+    if outcome in (otp_store.MISSING, otp_store.LOCKED):
         return Response(
             {'error': 'Invalid or expired OTP'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    if otp.verify(code):
+    if outcome == otp_store.VERIFIED:
         user.set_password(new_password)
         user.save()
+        user.revoke_tokens()
         
         return Response({
             'message': 'Password reset successfully'
         }, status=status.HTTP_200_OK)
     
-    attempts_left = 3 - otp.attempts
     return Response(
         {'error': f'Invalid OTP. {attempts_left} attempts remaining.'},
         status=status.HTTP_400_BAD_REQUEST
@@ -243,7 +192,7 @@ def login(request):
         )
     
     try:
-        user = User.objects.get(phone=phone)
+        user = User.objects.get_by_phone(phone)
     except User.DoesNotExist:
         return Response(
             {'error': 'Invalid credentials'},
@@ -263,7 +212,7 @@ def login(request):
         )
     
     # Generate JWT tokens
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsTokenObtainPairSerializer.get_token(user)
     
     return Response({
         'access': str(refresh.access_token),
@@ -276,4 +225,5 @@ class CurrentUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     
     def get_object(self):
-        return self.request.user
+        # request.user only carries token claims; load the full row for profile reads/updates
+        return User.objects.get(pk=self.request.user.pk)
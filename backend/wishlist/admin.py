@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Wishlist
+from .models import Wishlist, RestockEvent
 
 
 @admin.register(Wishlist)
@@ -8,3 +8,11 @@ class WishlistAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['user__phone', 'product__name']
     raw_id_fields = ['user', 'product']
+
+
+@admin.register(RestockEvent)
+class RestockEventAdmin(admin.ModelAdmin):
+    list_display = ['product', 'created_at', 'processed_at', 'notified_count']
+    list_filter = ['processed_at']
+    raw_id_fields = ['product']
+    readonly_fields = ['created_at', 'claimed_at', 'processed_at', 'notified_count', 'last_error']
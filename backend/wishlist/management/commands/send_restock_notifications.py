@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from wishlist.restock import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Send back-in-stock notifications to users who wishlisted restocked products'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between polls in --loop mode')
+        parser.add_argument('--limit', type=int, default=100, help='Maximum events per pass')
+    
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_events(limit=options['limit'])
+            if processed:
+                self.stdout.write(f'Processed {processed} restock events')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wishlist", "0002_restock_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restockevent",
+            name="last_error",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
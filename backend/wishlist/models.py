@@ -14,3 +14,41 @@ class Wishlist(models.Model):
     
     def __str__(self):
         return f'{self.user.phone} - {self.product.name}'
+
+
+class RestockEvent(models.Model):
+    """A product going from out of stock back to available, queued for wishlist fanout"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='restock_events')
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    notified_count = models.IntegerField(default=0)
+    # Why the last fanout attempt failed; the event is retried once its claim lease expires
+    last_error = models.TextField(blank=True, default='')
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['claimed_at', 'created_at'], name='restock_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.product.name} restocked at {self.created_at}'
+
+
+class RestockNotification(models.Model):
+    """One delivered back-in-stock message; used for de-duplication and per-user rate limits"""
+    event = models.ForeignKey(RestockEvent, on_delete=models.CASCADE, related_name='notifications')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='restock_notifications')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    sent_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['event', 'user']
+        indexes = [
+            models.Index(fields=['user', 'sent_at'], name='restock_notif_user_idx'),
+            models.Index(fields=['product', 'user', 'sent_at'], name='restock_notif_product_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user.phone} - {self.product.name}'
@@ -0,0 +1,172 @@
+"""
+Back-in-stock notifications for wishlisted products.
+
+Write paths call record_restock() inside their transaction when a product goes
+from out of stock to available. The send_restock_notifications worker drains
+pending events and fans out to wishlist holders in bounded batches.
+"""
+from datetime import timedelta
+from itertools import islice
+import logging
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Wishlist, RestockEvent, RestockNotification
+
+logger = logging.getLogger(__name__)
+
+
+def record_restock(product, previous_stock, previous_available=True):
+    """Queue a restock event if the product just became purchasable again"""
+    was_out_of_stock = previous_stock <= 0 or not previous_available
+    if was_out_of_stock and product.stock > 0 and product.is_available:
+        return RestockEvent.objects.create(product=product)
+    return None
+
+
+def get_sender():
+    return import_string(settings.RESTOCK_NOTIFICATION_SENDER)()
+
+
+class ConsoleSender:
+    """Log messages instead of sending them (development)"""
+    
+    def send(self, phone_number, body):
+        logger.info(f'RESTOCK SMS for {phone_number}: {body}')
+        print(f'[restock] {phone_number}: {body}')
+        return True, 'console'
+
+
+class FileSender:
+    """Append messages to RESTOCK_NOTIFICATION_FILE, one per line (tests and local runs)"""
+    
+    def send(self, phone_number, body):
+        with open(settings.RESTOCK_NOTIFICATION_FILE, 'a', encoding='utf-8') as f:
+            f.write(f'{phone_number}\t{body}\n')
+        return True, 'file'
+
+
+class SMSSender:
+    """Queue messages on the SMS outbox; the outbox worker delivers them"""
+    
+    def send(self, phone_number, body):
+        from users.outbox import enqueue_sms
+        message = enqueue_sms(phone_number, body, kind='restock')
+        return True, message.pk
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _excluded_users(product_id, user_ids, now):
+    """Users already told about this product recently, or over their daily limit"""
+    dedup_since = now - timedelta(hours=settings.RESTOCK_DEDUP_HOURS)
+    recently_notified = RestockNotification.objects.filter(
+        product_id=product_id,
+        user_id__in=user_ids,
+        sent_at__gte=dedup_since
+    ).values_list('user_id', flat=True)
+    
+    over_limit = RestockNotification.objects.filter(
+        user_id__in=user_ids,
+        sent_at__gte=now - timedelta(days=1)
+    ).values('user_id').annotate(
+        sent=Count('id')
+    ).filter(sent__gte=settings.RESTOCK_USER_DAILY_LIMIT).values_list('user_id', flat=True)
+    
+    return set(recently_notified) | set(over_limit)
+
+
+class LeaseLost(Exception):
+    """The event's claim lease expired and another worker claimed it"""
+
+
+def renew_claim(event):
+    """
+    Move the event's claim forward, guarded on the claim this worker holds;
+    raises LeaseLost if another worker has since claimed it
+    """
+    now = timezone.now()
+    renewed = RestockEvent.objects.filter(
+        pk=event.pk, claimed_at=event.claimed_at, processed_at__isnull=True
+    ).update(claimed_at=now)
+    if not renewed:
+        raise LeaseLost(f'Restock event {event.pk} was claimed by another worker')
+    event.claimed_at = now
+
+
+def process_event(event, sender):
+    """
+    Fan out one claimed event to wishlist holders; returns messages sent.
+    The claim is renewed after every batch, so a long fanout keeps its lease.
+    """
+    product = event.product
+    body = f'Good news! {product.name} is back in stock. Grab it before it sells out again.'
+    holders = Wishlist.objects.filter(
+        product=product,
+        user__is_active=True
+    ).select_related('user').order_by('id').iterator(chunk_size=settings.RESTOCK_BATCH_SIZE)
+    
+    sent = 0
+    for batch in _chunks(holders, settings.RESTOCK_BATCH_SIZE):
+        excluded = _excluded_users(product.id, [item.user_id for item in batch], timezone.now())
+        delivered = []
+        for item in batch:
+            if item.user_id in excluded:
+                continue
+            success, _ = sender.send(item.user.phone, body)
+            if success:
+                delivered.append(RestockNotification(event=event, user_id=item.user_id, product=product))
+        RestockNotification.objects.bulk_create(delivered, ignore_conflicts=True)
+        sent += len(delivered)
+        renew_claim(event)
+    return sent
+
+
+def process_pending_events(limit=100, sender=None):
+    """
+    Claim and process pending restock events; safe to run from several workers.
+    An event claimed by a worker that died, or whose fanout failed, is claimed
+    again once RESTOCK_CLAIM_LEASE_SECONDS have passed without its claim being
+    renewed; users its batches already recorded as notified are skipped by
+    the de-duplication window.
+    """
+    sender = sender or get_sender()
+    lease_expired = timezone.now() - timedelta(seconds=settings.RESTOCK_CLAIM_LEASE_SECONDS)
+    due = RestockEvent.objects.filter(
+        Q(claimed_at__isnull=True) |
+        Q(processed_at__isnull=True, claimed_at__lt=lease_expired)
+    )
+    pending = list(due.select_related('product')[:limit])
+    
+    processed = 0
+    for event in pending:
+        # Claim atomically, re-applying the due filter, so concurrent workers never fan out the same event twice
+        event.claimed_at = timezone.now()
+        claimed = due.filter(pk=event.pk).update(claimed_at=event.claimed_at)
+        if not claimed:
+            continue
+        
+        try:
+            event.notified_count = process_event(event, sender)
+        except LeaseLost as e:
+            logger.warning(str(e))
+            continue
+        except Exception as e:
+            # Recorded, and left claimed for a retry after the lease; the other events still go out
+            logger.exception(f'Restock event {event.pk} failed')
+            RestockEvent.objects.filter(pk=event.pk, claimed_at=event.claimed_at).update(last_error=str(e))
+            continue
+        
+        RestockEvent.objects.filter(pk=event.pk, claimed_at=event.claimed_at).update(
+            notified_count=event.notified_count, processed_at=timezone.now(), last_error=''
+        )
+        logger.info(f'Restock event {event.pk}: notified {event.notified_count} users')
+        processed += 1
+    return processed
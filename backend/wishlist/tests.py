@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from products.models import Category, Product
+from .models import RestockEvent, RestockNotification, Wishlist
+from .restock import process_pending_events
+
+User = get_user_model()
+
+
+class RecordingSender:
+    def __init__(self, fail_for=None, on_send=None):
+        self.sent = []
+        self.fail_for = fail_for
+        self.on_send = on_send
+    
+    def send(self, phone_number, body):
+        if self.fail_for and self.fail_for in body:
+            raise ConnectionError('provider down')
+        self.sent.append(phone_number)
+        if self.on_send:
+            self.on_send()
+        return True, 'test'
+
+
+@override_settings(RESTOCK_BATCH_SIZE=2, RESTOCK_CLAIM_LEASE_SECONDS=600)
+class ProcessPendingEventsTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Scrunchies', slug='scrunchies')
+        self.products = [
+            Product.objects.create(name=name, slug=name.lower(), description='', price=100,
+                                   category=category, image='products/p.jpg', stock=5)
+            for name in ['Silk', 'Velvet']
+        ]
+        users = [User.objects.create(phone=f'+25191100000{i}', username=f'user{i}') for i in range(5)]
+        for product in self.products:
+            Wishlist.objects.bulk_create([Wishlist(user=user, product=product) for user in users])
+        self.events = [RestockEvent.objects.create(product=product) for product in self.products]
+    
+    def test_notifies_every_holder_in_batches(self):
+        sender = RecordingSender()
+        self.assertEqual(process_pending_events(sender=sender), 2)
+        self.assertEqual(len(sender.sent), 10)
+        for event in self.events:
+            event.refresh_from_db()
+            self.assertEqual(event.notified_count, 5)
+            self.assertIsNotNone(event.processed_at)
+    
+    def test_a_failing_event_does_not_stop_the_others(self):
+        sender = RecordingSender(fail_for='Silk')
+        with self.assertLogs('wishlist.restock', 'ERROR'):
+            self.assertEqual(process_pending_events(sender=sender), 1)
+        failed, done = RestockEvent.objects.get(pk=self.events[0].pk), RestockEvent.objects.get(pk=self.events[1].pk)
+        self.assertIsNone(failed.processed_at)
+        self.assertIn('provider down', failed.last_error)
+        self.assertIsNotNone(done.processed_at)
+        
+        # Retried once the lease has expired
+        RestockEvent.objects.filter(pk=failed.pk).update(claimed_at=timezone.now() - timedelta(seconds=601))
+        self.assertEqual(process_pending_events(sender=RecordingSender()), 1)
+        failed.refresh_from_db()
+        self.assertIsNotNone(failed.processed_at)
+        self.assertEqual(failed.last_error, '')
+    
+    def test_renews_the_lease_after_each_batch(self):
+        RestockEvent.objects.filter(pk=self.events[1].pk).delete()
+        claims = []
+        sender = RecordingSender(on_send=lambda: claims.append(
+            RestockEvent.objects.values_list('claimed_at', flat=True).get(pk=self.events[0].pk)
+        ))
+        process_pending_events(sender=sender)
+        # Two per batch of two, then the last one
+        self.assertEqual(len(set(claims)), 3)
+    
+    def test_stops_when_another_worker_reclaims_the_event(self):
+        RestockEvent.objects.filter(pk=self.events[1].pk).delete()
+        event = self.events[0]
+        
+        def reclaim():
+            # Another worker takes over, as if this one had stalled past the lease
+            RestockEvent.objects.filter(pk=event.pk).update(claimed_at=timezone.now() + timedelta(seconds=1))
+        
+        sender = RecordingSender(on_send=reclaim)
+        with self.assertLogs('wishlist.restock', 'WARNING'):
+            self.assertEqual(process_pending_events(sender=sender), 0)
+        # Only the first batch went out; the rest is left to the new claim holder
+        self.assertEqual(len(sender.sent), 2)
+        event.refresh_from_db()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(RestockNotification.objects.filter(event=event).count(), 2)
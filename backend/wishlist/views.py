@@ -1,8 +1,12 @@
+import hashlib
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.utils.http import parse_etags, quote_etag
+from products.models import Product
 from .models import Wishlist
-from .serializers import WishlistSerializer
+from .serializers import WishlistSerializer, WishlistBulkSerializer
 
 
 class WishlistViewSet(viewsets.ModelViewSet):
@@ -10,7 +14,15 @@ class WishlistViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
+        return Wishlist.objects.filter(user=self.request.user).select_related(
+            'product__category', 'product__rating_summary'
+        ).prefetch_related('product__sizes', 'product__images')
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Products nested in the user's own wishlist rows are wishlisted by definition
+        context['wishlisted'] = True
+        return context
     
     def create(self, request, *args, **kwargs):
         # Check if already in wishlist
@@ -21,3 +33,43 @@ class WishlistViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         return super().create(request, *args, **kwargs)
+    
+    @action(detail=False, methods=['get'])
+    def ids(self, request):
+        """Compact list of wishlisted product ids for rendering product grids"""
+        product_ids = list(
+            Wishlist.objects.filter(user=request.user).order_by('product_id').values_list('product_id', flat=True)
+        )
+        etag = quote_etag(hashlib.md5(','.join(map(str, product_ids)).encode()).hexdigest())
+        
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        return Response({'product_ids': product_ids}, headers={'ETag': etag})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_add(self, request):
+        """Add several products to the wishlist in one insert"""
+        serializer = WishlistBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        product_ids = list(
+            Product.objects.filter(id__in=serializer.validated_data['product_ids']).values_list('id', flat=True)
+        )
+        Wishlist.objects.bulk_create(
+            [Wishlist(user=request.user, product_id=product_id) for product_id in product_ids],
+            ignore_conflicts=True
+        )
+        return Response({'product_ids': product_ids}, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_remove(self, request):
+        """Remove several products from the wishlist in one delete"""
+        serializer = WishlistBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        deleted, _ = Wishlist.objects.filter(
+            user=request.user,
+            product_id__in=serializer.validated_data['product_ids']
+        ).delete()
+        return Response({'removed': deleted})
@@ -8,13 +8,13 @@ export default function Layout() {
   const navigate = useNavigate()
   const itemCount = useCartStore(state => state.getItemCount())
   const { isAuthenticated, user, logout } = useAuthStore()
-  const { items: wishlistItems, fetchWishlist } = useWishlistStore()
+  const { productIds: wishlistIds, fetchIds } = useWishlistStore()
   
   useEffect(() => {
     if (isAuthenticated) {
-      fetchWishlist()
+      fetchIds()
     }
-  }, [isAuthenticated, fetchWishlist])
+  }, [isAuthenticated, fetchIds])
   
   const handleLogout = () => {
     logout()
@@ -85,9 +85,9 @@ export default function Layout() {
                   >
                     <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M4.318 6.318a4.5 4.5 0 000 6.364L12 20.364l7.682-7.682a4.5 4.5 0 00-6.364-6.364L12 7.636l-1.318-1.318a4.5 4.5 0 00-6.364 0z" />
                   </svg>
-                  {wishlistItems.length > 0 && (
+                  {wishlistIds.length > 0 && (
                     <span className="absolute -top-2 -right-2 bg-accent-400 text-dark text-xs font-bold rounded-full w-5 h-5 flex items-center justify-center animate-pulse">
-                      {wishlistItems.length}
+                      {wishlistIds.length}
                     </span>
                   )}
                 </Link>
@@ -52,6 +52,9 @@ export const productsAPI = {
     headers: { 'Content-Type': 'multipart/form-data' }
   }),
   delete: (slug) => api.delete(`/products/${slug}/`),
+  bulkUploadImages: (slug, data) => api.post(`/products/${slug}/images/bulk/`, data, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  }),
 }
 
 export const ordersAPI = {
@@ -70,6 +73,7 @@ export const ordersAPI = {
       headers: { 'Content-Type': 'multipart/form-data' }
     })
   },
+  get: (id) => api.get(`/orders/${id}/`),
   getMyOrders: () => api.get('/orders/my_orders/'),
   getAll: (params) => api.get('/orders/', { params }),
   verify: (id, note) => api.post(`/orders/${id}/verify/`, { note }),
@@ -77,12 +81,74 @@ export const ordersAPI = {
   delete: (id) => api.delete(`/orders/${id}/`),
   getStats: () => api.get('/orders/stats/'),
   getAuditLogs: (id) => api.get(`/orders/${id}/audit_logs/`),
+  findByReference: (reference, payment_method) => api.get('/orders/by_reference/', { params: { reference, payment_method } }),
+  reconcile: (data) => api.post('/orders/reconcile/', data, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  }),
+  // Live admin feed (server-sent events). EventSource can't send the bearer token,
+  // so this reads the stream with fetch and reconnects with Last-Event-ID.
+  // onEvent(type, data) gets created / status_changed / deleted / reset. onOpen() runs on each
+  // (re)connect; onError(error) on each failure, with error.status for HTTP errors. After a
+  // 401/403 it stops retrying (the token is no longer valid). Returns a stop function.
+  subscribe: (onEvent, { onOpen = () => {}, onError = () => {} } = {}) => {
+    const controller = new AbortController()
+    let lastEventId = null
+    let retry = 3000
+    
+    const connect = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const headers = { Authorization: `Bearer ${localStorage.getItem('token')}` }
+          if (lastEventId) headers['Last-Event-ID'] = lastEventId
+          const response = await fetch(`${baseURL}/orders/events/`, { headers, signal: controller.signal })
+          if (!response.ok) {
+            const error = new Error(`Order feed failed with ${response.status}`)
+            error.status = response.status
+            throw error
+          }
+          onOpen()
+          
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+          let buffer = ''
+          for (;;) {
+            const { value, done } = await reader.read()
+            if (done) break
+            buffer += value
+            let end
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+              const message = { event: 'message', data: '' }
+              buffer.slice(0, end).split('\n').forEach(line => {
+                const [field, ...rest] = line.split(':')
+                const text = rest.join(':').replace(/^ /, '')
+                if (field === 'id') lastEventId = text
+                else if (field === 'event') message.event = text
+                else if (field === 'data') message.data += text
+                else if (field === 'retry') retry = Number(text) || retry
+              })
+              buffer = buffer.slice(end + 2)
+              if (message.data) onEvent(message.event, JSON.parse(message.data))
+            }
+          }
+        } catch (error) {
+          if (controller.signal.aborted) return
+          onError(error)
+          if (error.status === 401 || error.status === 403) return
+        }
+        await new Promise(resolve => setTimeout(resolve, retry))
+      }
+    }
+    connect()
+    return () => controller.abort()
+  },
 }
 
 export const wishlistAPI = {
   getAll: () => api.get('/wishlist/'),
   add: (product_id) => api.post('/wishlist/', { product_id }),
   remove: (id) => api.delete(`/wishlist/${id}/`),
+  getIds: () => api.get('/wishlist/ids/'),
+  bulkAdd: (product_ids) => api.post('/wishlist/bulk_add/', { product_ids }),
+  bulkRemove: (product_ids) => api.post('/wishlist/bulk_remove/', { product_ids }),
 }
 
 export const reviewsAPI = {
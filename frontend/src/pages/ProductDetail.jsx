@@ -19,13 +19,13 @@ export default function ProductDetail() {
   
   const addItem = useCartStore(state => state.addItem)
   const { isAuthenticated } = useAuthStore()
-  const { addToWishlist, removeFromWishlist, isInWishlist, getWishlistItemId, fetchWishlist } = useWishlistStore()
+  const { addToWishlist, removeFromWishlist, isInWishlist, fetchIds } = useWishlistStore()
   
   useEffect(() => {
     if (isAuthenticated) {
-      fetchWishlist()
+      fetchIds()
     }
-  }, [isAuthenticated, fetchWishlist])
+  }, [isAuthenticated, fetchIds])
   
   useEffect(() => {
     productsAPI.getBySlug(slug).then(res => {
@@ -40,7 +40,7 @@ export default function ProductDetail() {
       
       // Fetch reviews
       reviewsAPI.getByProduct(res.data.id).then(reviewRes => {
-        setReviews(reviewRes.data)
+        setReviews(reviewRes.data.results)
       }).catch(err => console.error('Failed to fetch reviews:', err))
       
       // Fetch review stats
@@ -86,8 +86,7 @@ export default function ProductDetail() {
     }
     
     if (isInWishlist(product.id)) {
-      const itemId = getWishlistItemId(product.id)
-      const success = await removeFromWishlist(itemId)
+      const success = await removeFromWishlist(product.id)
       if (success) {
         toast.success('Removed from wishlist')
       }
@@ -15,15 +15,15 @@ export default function Products() {
   const [loading, setLoading] = useState(true)
   
   const { isAuthenticated } = useAuthStore()
-  const { items: wishlistItems, addToWishlist, removeFromWishlist, isInWishlist, getWishlistItemId, fetchWishlist } = useWishlistStore()
+  const { addToWishlist, removeFromWishlist, isInWishlist, fetchIds } = useWishlistStore()
   
   const sizes = ['S', 'M', 'L']
   
   useEffect(() => {
     if (isAuthenticated) {
-      fetchWishlist()
+      fetchIds()
     }
-  }, [isAuthenticated, fetchWishlist])
+  }, [isAuthenticated, fetchIds])
   
   useEffect(() => {
     Promise.all([
@@ -69,8 +69,7 @@ export default function Products() {
     }
     
     if (isInWishlist(product.id)) {
-      const itemId = getWishlistItemId(product.id)
-      const success = await removeFromWishlist(itemId)
+      const success = await removeFromWishlist(product.id)
       if (success) {
         toast.success('Removed from wishlist')
       }
@@ -13,8 +13,8 @@ export default function Wishlist() {
     fetchWishlist()
   }, [fetchWishlist])
   
-  const handleRemove = async (itemId) => {
-    const success = await removeFromWishlist(itemId)
+  const handleRemove = async (productId) => {
+    const success = await removeFromWishlist(productId)
     if (success) {
       toast.success('Removed from wishlist')
     } else {
@@ -93,7 +93,7 @@ export default function Wishlist() {
                 </button>
                 
                 <button
-                  onClick={() => handleRemove(item.id)}
+                  onClick={() => handleRemove(item.product.id)}
                   className="p-2 rounded-lg bg-red-50 text-red-600 hover:bg-red-100 transition-colors"
                   title="Remove from wishlist"
                 >
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { ordersAPI } from '../../lib/api'
 import toast from 'react-hot-toast'
@@ -13,15 +13,79 @@ export default function AdminDashboard() {
   const [adminNote, setAdminNote] = useState('')
   const [loading, setLoading] = useState(true)
   
+  const filtersRef = useRef(filters)
+  
   useEffect(() => {
+    filtersRef.current = filters
     loadData()
   }, [filters])
   
+  // Live updates from the order feed instead of polling; rows are upserted by id,
+  // so events for changes this page made itself are harmless
+  useEffect(() => {
+    let statsTimer = null
+    const refreshStats = () => {
+      clearTimeout(statsTimer)
+      statsTimer = setTimeout(async () => {
+        try {
+          const statsRes = await ordersAPI.getStats()
+          setStats(statsRes.data)
+        } catch (error) {
+          // The next event or reload will retry
+        }
+      }, 500)
+    }
+    const matchesFilters = (order) => {
+      const { status, payment_method } = filtersRef.current
+      return (!status || order.status === status) && (!payment_method || order.payment_method === payment_method)
+    }
+    
+    // While the feed is down, fall back to reloading periodically
+    let fallbackTimer = null
+    const onOpen = () => {
+      clearInterval(fallbackTimer)
+      fallbackTimer = null
+    }
+    const onError = (error) => {
+      if (error.status === 401 || error.status === 403) {
+        // Expired session: loadData's request goes through the usual 401 handling
+        loadData()
+        return
+      }
+      if (!fallbackTimer) fallbackTimer = setInterval(loadData, 30000)
+    }
+    
+    const stop = ordersAPI.subscribe(async (type, data) => {
+      if (type === 'reset') {
+        loadData()
+        return
+      }
+      refreshStats()
+      if (type === 'deleted' || !matchesFilters(data)) {
+        setOrders(current => current.filter(order => order.id !== data.id))
+      } else {
+        try {
+          const { data: order } = await ordersAPI.get(data.id)
+          setOrders(current => current.some(row => row.id === order.id)
+            ? current.map(row => row.id === order.id ? order : row)
+            : [order, ...current])
+        } catch (error) {
+          // Deleted in the meantime
+        }
+      }
+    }, { onOpen, onError })
+    return () => {
+      stop()
+      clearTimeout(statsTimer)
+      clearInterval(fallbackTimer)
+    }
+  }, [])
+  
   const loadData = async () => {
     try {
       const [statsRes, ordersRes] = await Promise.all([
         ordersAPI.getStats(),
-        ordersAPI.getAll(filters)
+        ordersAPI.getAll(filtersRef.current)
       ])
       setStats(statsRes.data)
       setOrders(ordersRes.data.results || ordersRes.data)
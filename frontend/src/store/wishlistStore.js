@@ -2,14 +2,30 @@ import { create } from 'zustand'
 import { wishlistAPI } from '../lib/api'
 
 const useWishlistStore = create((set, get) => ({
+  // Full wishlist rows, for the wishlist page
   items: [],
+  // Wishlisted product ids, for hearts and the header count (GET /wishlist/ids/)
+  productIds: [],
   loading: false,
   
+  fetchIds: async () => {
+    try {
+      const response = await wishlistAPI.getIds()
+      set({ productIds: response.data.product_ids })
+    } catch (error) {
+      console.error('Failed to fetch wishlist:', error)
+    }
+  },
+  
   fetchWishlist: async () => {
     try {
       set({ loading: true })
       const response = await wishlistAPI.getAll()
-      set({ items: response.data, loading: false })
+      set({
+        items: response.data,
+        productIds: response.data.map(item => item.product.id),
+        loading: false
+      })
     } catch (error) {
       console.error('Failed to fetch wishlist:', error)
       set({ loading: false })
@@ -19,7 +35,10 @@ const useWishlistStore = create((set, get) => ({
   addToWishlist: async (product) => {
     try {
       const response = await wishlistAPI.add(product.id)
-      set(state => ({ items: [...state.items, response.data] }))
+      set(state => ({
+        items: [...state.items, response.data],
+        productIds: [...state.productIds, product.id]
+      }))
       return true
     } catch (error) {
       console.error('Failed to add to wishlist:', error)
@@ -27,11 +46,12 @@ const useWishlistStore = create((set, get) => ({
     }
   },
   
-  removeFromWishlist: async (wishlistItemId) => {
+  removeFromWishlist: async (productId) => {
     try {
-      await wishlistAPI.remove(wishlistItemId)
+      await wishlistAPI.bulkRemove([productId])
       set(state => ({
-        items: state.items.filter(item => item.id !== wishlistItemId)
+        items: state.items.filter(item => item.product.id !== productId),
+        productIds: state.productIds.filter(id => id !== productId)
       }))
       return true
     } catch (error) {
@@ -41,15 +61,10 @@ const useWishlistStore = create((set, get) => ({
   },
   
   isInWishlist: (productId) => {
-    return get().items.some(item => item.product.id === productId)
-  },
-  
-  getWishlistItemId: (productId) => {
-    const item = get().items.find(item => item.product.id === productId)
-    return item?.id
+    return get().productIds.includes(productId)
   },
   
-  clearWishlist: () => set({ items: [] }),
+  clearWishlist: () => set({ items: [], productIds: [] }),
 }))
 
 export default useWishlistStore